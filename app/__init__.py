@@ -0,0 +1,5 @@
+import os
+
+def running_in_lambda() -> bool:
+    """True inside an AWS Lambda execution environment, which always sets AWS_LAMBDA_FUNCTION_NAME."""
+    return bool(os.getenv('AWS_LAMBDA_FUNCTION_NAME'))
@@ -0,0 +1,377 @@
+"""Admission queue and waitlist for registrations.
+
+With ``ADMISSION_QUEUE=sqs`` a registration is stored as QUEUED, put on an
+SQS queue and answered with 202 straight away. A worker (``AdmissionWorker``
+in a long-running server, ``handle_sqs_event`` behind an SQS-triggered
+Lambda) admits each event's requests in arrival order with one transaction
+per chunk, paced to the write capacity of the registration table. Requests
+that find the event full are WAITLISTED in EVENT_WAITLIST_TABLE and promoted
+in order when seats are released.
+"""
+import os
+import json
+import asyncio
+from collections import Counter, defaultdict
+from uuid import uuid4
+from datetime import datetime
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from .db import (
+    get_sqs, run_io, registration_requests_table, event_waitlist_table, batch_get_items, AWS_BACKEND
+)
+from .cache import get_event_item
+from .models.models import RegistrationStatus
+from .registrations import BulkOutcome, bulk_update_event_status
+from .analytics import apply_deltas, report_aggregate_error
+from .notifications import notification_outbox, send_registration_confirmation
+from .throttling import TokenBucket, capacity_tracker
+
+ADMISSION_QUEUE = os.getenv('ADMISSION_QUEUE', 'off')  # 'off' or 'sqs'
+ADMISSION_QUEUE_URL = os.getenv(
+    'ADMISSION_QUEUE_URL', 'local://registration-admission.fifo' if AWS_BACKEND == 'local' else None
+)
+ADMISSION_BATCH_SIZE = int(os.getenv('ADMISSION_BATCH_SIZE', '10'))  # ReceiveMessage limit
+ADMISSION_WAIT_SECONDS = int(os.getenv('ADMISSION_WAIT_SECONDS', '1'))
+ADMISSION_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv('ADMISSION_VISIBILITY_TIMEOUT_SECONDS', '30'))
+ADMISSION_WRITE_UNITS_PER_SECOND = float(os.getenv('ADMISSION_WRITE_UNITS_PER_SECOND', '0'))  # 0 = provisioned WCU
+
+# A transactional write costs two write units per item
+TRANSACT_WRITE_UNITS = 2
+
+def admission_enabled() -> bool:
+    return ADMISSION_QUEUE == 'sqs' and bool(ADMISSION_QUEUE_URL)
+
+def waitlist_key(request: dict) -> str:
+    return f"{request['created_at']}#{request['id']}"
+
+# Queue
+
+async def _send(message: dict):
+    kwargs = {'QueueUrl': ADMISSION_QUEUE_URL, 'MessageBody': json.dumps(message)}
+    if ADMISSION_QUEUE_URL.endswith('.fifo'):
+        # One message group per event keeps each event's arrivals in order
+        kwargs['MessageGroupId'] = message['event_id']
+        kwargs['MessageDeduplicationId'] = message.get('request_id') or uuid4().hex
+    await run_io(get_sqs().send_message, **kwargs)
+
+async def enqueue_registration(request: dict):
+    await _send({'type': 'admit', 'event_id': request['event_id'], 'request_id': request['id']})
+
+async def request_promotion(event_id: str):
+    """Ask the worker to fill seats that were just released from the waitlist."""
+    if not admission_enabled():
+        return
+    try:
+        await _send({'type': 'promote', 'event_id': event_id})
+    except Exception as e:
+        print(f"Error requesting waitlist promotion for event {event_id}: {str(e)}")
+
+# Worker
+
+class _AdmissionBudget(TokenBucket):
+    """Write units per second for admissions; the registration table's provisioned WCU by default."""
+
+    def rate(self):
+        return self._rate or capacity_tracker.provisioned(registration_requests_table.name, 'write')
+
+admission_budget = _AdmissionBudget(ADMISSION_WRITE_UNITS_PER_SECOND or None)
+admission_counts = Counter()
+
+async def _set_status(request: dict, status: RegistrationStatus, **attributes) -> bool:
+    """Move ``request`` to ``status`` if nobody changed it since it was read."""
+    names = {'#status': 'status'}
+    values = {':status': status.value, ':old_status': request['status'], ':now': datetime.now().isoformat()}
+    clauses = ["#status = :status", "updated_at = :now"]
+    for name, value in attributes.items():
+        names[f'#{name}'] = name
+        values[f':{name}'] = value
+        clauses.append(f"#{name} = :{name}")
+    try:
+        await registration_requests_table.update_item(
+            Key={'id': request['id']},
+            UpdateExpression="SET " + ", ".join(clauses),
+            ConditionExpression="#status = :old_status",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+async def _remove_from_waitlist(event_id: str, key: str):
+    await event_waitlist_table.delete_item(Key={'event_id': event_id, 'waitlist_key': key})
+
+async def _waitlist(request: dict) -> bool:
+    key = waitlist_key(request)
+    # Entry first, so a WAITLISTED request always has one to be promoted from
+    await event_waitlist_table.put_item(Item={
+        'event_id': request['event_id'],
+        'waitlist_key': key,
+        'request_id': request['id'],
+        'user_id': request['user_id']
+    })
+    if await _set_status(request, RegistrationStatus.WAITLISTED, waitlist_key=key):
+        return True
+    await _remove_from_waitlist(request['event_id'], key)  # Cancelled in the meantime
+    return False
+
+CANCELLABLE_STATUSES = {
+    RegistrationStatus.PENDING.value, RegistrationStatus.QUEUED.value,
+    RegistrationStatus.WAITLISTED.value, RegistrationStatus.APPROVED.value
+}
+
+async def cancel(request: dict) -> bool:
+    """Cancel ``request``, giving back its seat or waitlist place.
+
+    Returns False if its status changed since it was read.
+    """
+    # The seat goes back in the same transaction as the status change
+    outcome = (await bulk_update_event_status(
+        request['event_id'], [request], RegistrationStatus.CANCELLED
+    ))[request['id']]
+    if outcome == BulkOutcome.CONFLICT:
+        return False
+    if outcome != BulkOutcome.UPDATED:
+        raise RuntimeError(f"Could not cancel registration request {request['id']}: {outcome.value}")
+    if request['status'] == RegistrationStatus.APPROVED.value:
+        await request_promotion(request['event_id'])
+    elif request['status'] == RegistrationStatus.WAITLISTED.value and request.get('waitlist_key'):
+        await _remove_from_waitlist(request['event_id'], request['waitlist_key'])
+    return True
+
+async def _reject_duplicate(request: dict) -> bool:
+    """Reject a request whose user already holds, or is about to hold, a seat at the event."""
+    if not await _set_status(request, RegistrationStatus.REJECTED):
+        return False
+    if request['status'] == RegistrationStatus.WAITLISTED.value and request.get('waitlist_key'):
+        await _remove_from_waitlist(request['event_id'], request['waitlist_key'])
+    return True
+
+async def _waitlist_head(event_id: str, limit: int) -> list:
+    response = await event_waitlist_table.query(
+        KeyConditionExpression=Key('event_id').eq(event_id),
+        ConsistentRead=True,
+        Limit=limit
+    )
+    return response.get('Items', [])
+
+async def waitlist_position(request: dict) -> int:
+    """1-based place of a WAITLISTED request in its event's waitlist."""
+    query_kwargs = {
+        'KeyConditionExpression': (
+            Key('event_id').eq(request['event_id']) & Key('waitlist_key').lt(request['waitlist_key'])
+        ),
+        'Select': 'COUNT'
+    }
+    ahead = 0
+    while True:
+        response = await event_waitlist_table.query(**query_kwargs)
+        ahead += response.get('Count', 0)
+        if not response.get('LastEvaluatedKey'):
+            return ahead + 1
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+async def admit(event_id: str, request_ids=()) -> dict:
+    """Grant free seats to the waitlist head, then to the QUEUED ``request_ids``.
+
+    QUEUED requests that find the event full join the waitlist. Returns
+    ``{request_id: BulkOutcome}`` for the requests given.
+    """
+    # Messages are delivered at least once, so an id can show up twice
+    request_ids = list(dict.fromkeys(request_ids))
+    queued = []
+    if request_ids:
+        queued = await batch_get_items(
+            registration_requests_table.name, [{'id': request_id} for request_id in request_ids],
+            consistent_read=True
+        )
+    queued = sorted(
+        (request for request in queued if request['status'] == RegistrationStatus.QUEUED.value),
+        key=waitlist_key
+    )
+
+    event = await get_event_item(event_id)
+    if event is None:
+        outcomes = {}
+        for request in queued:
+            if await _set_status(request, RegistrationStatus.REJECTED):
+                outcomes[request['id']] = BulkOutcome.NOT_FOUND
+        return outcomes
+    available = int(event['max_participants']) - int(event.get('participant_count', 0))
+
+    waitlisted = []
+    if available > 0:
+        entries = await _waitlist_head(event_id, available)
+        if entries:
+            found = {request['id']: request for request in await batch_get_items(
+                registration_requests_table.name, [{'id': entry['request_id']} for entry in entries],
+                consistent_read=True
+            )}
+            for entry in entries:
+                request = found.get(entry['request_id'])
+                if request and request['status'] == RegistrationStatus.WAITLISTED.value:
+                    waitlisted.append(request)
+                else:
+                    await _remove_from_waitlist(event_id, entry['waitlist_key'])  # Stale entry
+
+    # The waitlist goes first: it arrived earlier than anything still queued.
+    # A user who registered twice only competes with their earliest request.
+    candidates, duplicates, users = [], [], set()
+    for request in waitlisted + queued:
+        (duplicates if request['user_id'] in users else candidates).append(request)
+        users.add(request['user_id'])
+    if not candidates:
+        return {}
+    await admission_budget.wait_async(TRANSACT_WRITE_UNITS * len(candidates))
+    outcomes = await bulk_update_event_status(event_id, candidates, RegistrationStatus.APPROVED)
+
+    deltas = defaultdict(int)
+    for request in duplicates:
+        outcomes[request['id']] = BulkOutcome.ALREADY_REGISTERED
+    for request in candidates + duplicates:
+        if outcomes.get(request['id']) == BulkOutcome.ALREADY_REGISTERED and await _reject_duplicate(request):
+            admission_counts['duplicates'] += 1
+            deltas[f"status#{request['status']}"] -= 1
+            deltas[f"status#{RegistrationStatus.REJECTED.value}"] += 1
+
+    approved = []
+    for request in waitlisted:
+        if outcomes.get(request['id']) == BulkOutcome.UPDATED:
+            await _remove_from_waitlist(event_id, request['waitlist_key'])
+            approved.append(request)
+            deltas[f"status#{RegistrationStatus.WAITLISTED.value}"] -= 1
+            deltas[f"status#{RegistrationStatus.APPROVED.value}"] += 1
+    for request in queued:
+        outcome = outcomes.get(request['id'])
+        if outcome == BulkOutcome.UPDATED:
+            approved.append(request)
+            deltas[f"status#{RegistrationStatus.QUEUED.value}"] -= 1
+            deltas[f"status#{RegistrationStatus.APPROVED.value}"] += 1
+        elif outcome == BulkOutcome.FULL and await _waitlist(request):
+            admission_counts['waitlisted'] += 1
+            deltas[f"status#{RegistrationStatus.QUEUED.value}"] -= 1
+            deltas[f"status#{RegistrationStatus.WAITLISTED.value}"] += 1
+    admission_counts['admitted'] += len(approved)
+
+    try:
+        await apply_deltas(event_id, deltas)
+    except Exception as e:
+        report_aggregate_error(event_id, e)
+    for request in approved:
+        await send_registration_confirmation(email=request['email'], event_data=event, registration_data=request)
+    return {request_id: outcomes[request_id] for request_id in request_ids if request_id in outcomes}
+
+async def process_messages(messages) -> set:
+    """Admit a batch of ``(message_id, body)`` pairs, one ``admit`` per event.
+
+    Returns the ids of the messages that should be delivered again.
+    """
+    by_event = defaultdict(list)
+    for message_id, body in messages:
+        try:
+            message = json.loads(body)
+            by_event[message['event_id']].append((message_id, message))
+        except (ValueError, KeyError):
+            print(f"Dropping malformed admission message {message_id}")
+    failed = set()
+
+    async def admit_event(event_id, entries):
+        request_ids = [message['request_id'] for _, message in entries if message.get('type') == 'admit']
+        try:
+            outcomes = await admit(event_id, request_ids)
+        except Exception as e:
+            print(f"Error admitting registrations for event {event_id}: {str(e)}")
+            failed.update(message_id for message_id, _ in entries)
+            return
+        failed.update(
+            message_id for message_id, message in entries
+            if outcomes.get(message.get('request_id')) == BulkOutcome.FAILED
+        )
+
+    await asyncio.gather(*(admit_event(event_id, entries) for event_id, entries in by_event.items()))
+    admission_counts['messages'] += len(messages)
+    admission_counts['redelivered'] += len(failed)
+    return failed
+
+class AdmissionWorker:
+    """Long-polls the admission queue and admits what it receives. Not started under Lambda."""
+
+    def __init__(self):
+        self._task = None
+
+    def start(self):
+        if self._task is None and admission_enabled():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error polling the admission queue: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def poll(self):
+        sqs = get_sqs()
+        response = await run_io(
+            sqs.receive_message,
+            QueueUrl=ADMISSION_QUEUE_URL,
+            MaxNumberOfMessages=ADMISSION_BATCH_SIZE,
+            WaitTimeSeconds=ADMISSION_WAIT_SECONDS,
+            VisibilityTimeout=ADMISSION_VISIBILITY_TIMEOUT_SECONDS
+        )
+        messages = response.get('Messages', [])
+        if not messages:
+            return
+        failed = await process_messages([(message['MessageId'], message['Body']) for message in messages])
+        done = [message for message in messages if message['MessageId'] not in failed]
+        if done:
+            await run_io(
+                sqs.delete_message_batch,
+                QueueUrl=ADMISSION_QUEUE_URL,
+                Entries=[{'Id': str(i), 'ReceiptHandle': message['ReceiptHandle']} for i, message in enumerate(done)]
+            )
+
+    def stats(self) -> dict:
+        return {
+            "enabled": admission_enabled(),
+            "running": self._task is not None,
+            "write_units_per_second": admission_budget.rate(),
+            **admission_counts
+        }
+
+admission_worker = AdmissionWorker()
+
+# Lambda
+
+_loop = None
+
+def handle_sqs_event(event: dict) -> dict:
+    """Entry point for an SQS-triggered Lambda; failed messages are reported for a partial batch retry."""
+    global _loop
+    if _loop is None:
+        # Kept across invocations, the event cache holds futures bound to it
+        _loop = asyncio.new_event_loop()
+
+    async def run():
+        failed = await process_messages(
+            [(record['messageId'], record['body']) for record in event.get('Records', [])]
+        )
+        await notification_outbox.flush()
+        return failed
+
+    failed = _loop.run_until_complete(run())
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failed)]}
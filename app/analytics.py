@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime
+from collections import defaultdict
+from boto3.dynamodb.conditions import Key
+from .db import (
+    registration_aggregates_table, registration_counters_table, registration_requests_table, parallel_scan
+)
+from .metrics import registry
+
+# Registration counters are kept up to date as registrations are written,
+# so reading analytics is a get_item and one query instead of a full-table
+# scan. Each counter is named "<dimension>#<value>", which lets a single
+# ADD create it on first use. The total and the status counters are
+# attributes of one aggregates item per scope; college and year are free
+# text with no bound on their values, so each value is its own item in
+# the counters table.
+GLOBAL_SCOPE = "global"
+DIMENSIONS = {
+    "status": "status_distribution",
+    "college": "college_distribution",
+    "year": "year_distribution"
+}
+ITEM_DIMENSIONS = ("college", "year")
+DIMENSION_VALUE_MAX_LENGTH = 100
+
+logger = logging.getLogger(__name__)
+
+aggregate_update_errors = registry.counter(
+    "registration_aggregate_update_errors_total",
+    "Registration counter updates that failed; the aggregates drift until rebuild_aggregates runs"
+)
+
+def report_aggregate_error(event_id: str, error: Exception):
+    """Record a failed counter update. The registration itself has already been written."""
+    aggregate_update_errors.inc()
+    logger.error("Registration aggregates for event %s are now out of date", event_id, exc_info=error)
+
+def event_scope(event_id: str) -> str:
+    return f"event#{event_id}"
+
+def _value(value) -> str:
+    return str(getattr(value, 'value', value))
+
+def _normalise(value) -> str:
+    # Collapse stray whitespace and cap the length so one value stays one small item
+    value = " ".join(str(value or "").split())[:DIMENSION_VALUE_MAX_LENGTH]
+    return value or "unknown"
+
+def _registration_counters(registration: dict) -> list:
+    return [
+        f"status#{_value(registration['status'])}",
+        f"college#{_normalise(registration.get('college_name'))}",
+        f"year#{_normalise(registration.get('year_of_study'))}",
+    ]
+
+def _is_item_counter(attribute: str) -> bool:
+    return attribute.partition('#')[0] in ITEM_DIMENSIONS
+
+async def _apply_item_delta(scope: str, counter: str, delta: int):
+    await registration_counters_table.update_item(
+        Key={'scope': scope, 'counter': counter},
+        UpdateExpression="ADD #count :d",
+        ExpressionAttributeNames={'#count': 'count'},
+        ExpressionAttributeValues={':d': delta}
+    )
+
+async def _apply_deltas(scope: str, deltas: dict):
+    item_deltas = {attribute: delta for attribute, delta in deltas.items() if _is_item_counter(attribute)}
+    deltas = {attribute: delta for attribute, delta in deltas.items() if attribute not in item_deltas}
+    await asyncio.gather(
+        _apply_attribute_deltas(scope, deltas),
+        *(_apply_item_delta(scope, counter, delta) for counter, delta in item_deltas.items())
+    )
+
+async def _apply_attribute_deltas(scope: str, deltas: dict):
+    names = {}
+    values = {':now': datetime.now().isoformat()}
+    clauses = []
+    for index, (attribute, delta) in enumerate(deltas.items()):
+        names[f"#c{index}"] = attribute
+        values[f":d{index}"] = delta
+        clauses.append(f"#c{index} :d{index}")
+    await registration_aggregates_table.update_item(
+        Key={'id': scope},
+        UpdateExpression=f"ADD {', '.join(clauses)} SET updated_at = :now",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+async def apply_deltas(event_id: str, deltas: dict):
+    """Apply counter deltas to both the global and the per-event aggregates."""
+    deltas = {attribute: delta for attribute, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    await asyncio.gather(
+        _apply_deltas(GLOBAL_SCOPE, deltas),
+        _apply_deltas(event_scope(event_id), deltas)
+    )
+
+async def record_registration(registration: dict):
+    deltas = {"total": 1}
+    for attribute in _registration_counters(registration):
+        deltas[attribute] = 1
+    await apply_deltas(registration['event_id'], deltas)
+
+async def record_status_change(registration: dict, old_status, new_status):
+    if _value(old_status) == _value(new_status):
+        return
+    await apply_deltas(registration['event_id'], {
+        f"status#{_value(old_status)}": -1,
+        f"status#{_value(new_status)}": 1
+    })
+
+def format_aggregates(item: dict, counters: list = ()) -> dict:
+    """Shape an aggregates item and its counter items like the original analytics Lambda response."""
+    analytics = {
+        'total_registrations': int(item.get('total', 0)),
+        'status_distribution': {},
+        'college_distribution': {},
+        'year_distribution': {},
+        'timestamp': item.get('updated_at')
+    }
+    attributes = list(item.items()) + [(counter['counter'], counter.get('count')) for counter in counters]
+    for attribute, count in attributes:
+        dimension, _, value = attribute.partition('#')
+        if dimension in DIMENSIONS and value and count:
+            analytics[DIMENSIONS[dimension]][value] = int(count)
+    return analytics
+
+async def _query_counters(scope: str) -> list:
+    query_kwargs = {'KeyConditionExpression': Key('scope').eq(scope)}
+    counters = []
+    while True:
+        response = await registration_counters_table.query(**query_kwargs)
+        counters.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return counters
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+async def get_aggregates(event_id: str = None) -> dict:
+    scope = event_scope(event_id) if event_id else GLOBAL_SCOPE
+    response, counters = await asyncio.gather(
+        registration_aggregates_table.get_item(Key={'id': scope}),
+        _query_counters(scope)
+    )
+    return format_aggregates(response.get('Item', {}), counters)
+
+def rebuild_aggregates():
+    """Recount every registration and overwrite the aggregates, for reconciliation.
+
+    Registrations written while this runs may be counted twice or not at
+    all; run it during a quiet period. The scan is paced as background work.
+    """
+    scopes = defaultdict(lambda: defaultdict(int))
+    for items in parallel_scan(registration_requests_table.sync):
+        for registration in items:
+            for scope in (GLOBAL_SCOPE, event_scope(registration['event_id'])):
+                counters = scopes[scope]
+                counters['total'] += 1
+                for attribute in _registration_counters(registration):
+                    counters[attribute] += 1
+
+    now = datetime.now().isoformat()
+    written = set()
+    with registration_aggregates_table.sync.batch_writer() as batch, \
+            registration_counters_table.sync.batch_writer() as counter_batch:
+        for scope, counters in scopes.items():
+            attributes = {}
+            for attribute, count in counters.items():
+                if _is_item_counter(attribute):
+                    counter_batch.put_item(Item={'scope': scope, 'counter': attribute, 'count': count})
+                    written.add((scope, attribute))
+                else:
+                    attributes[attribute] = count
+            batch.put_item(Item={'id': scope, 'updated_at': now, **attributes})
+
+    # Values nobody registers with any more would otherwise keep their old count
+    with registration_counters_table.sync.batch_writer() as counter_batch:
+        for items in parallel_scan(registration_counters_table.sync, ProjectionExpression="#s, #c",
+                                   ExpressionAttributeNames={'#s': 'scope', '#c': 'counter'}):
+            for counter in items:
+                if (counter['scope'], counter['counter']) not in written:
+                    counter_batch.delete_item(Key={'scope': counter['scope'], 'counter': counter['counter']})
+    print(f"Rebuilt aggregates for {len(scopes)} scopes")
+
+if __name__ == "__main__":
+    rebuild_aggregates()
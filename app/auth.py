@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-import boto3
 from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
@@ -9,20 +8,22 @@ import base64
 import hashlib
 from enum import Enum
 from sports_event_utils import generate_secret_hash
+from . import running_in_lambda
+from .db import cognito, run_io
+from .cache import InMemoryCacheBackend
+from .middleware import verify_cognito_token
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (Lambda gets them from the function configuration)
+if not running_in_lambda():
+    load_dotenv()
 
 router = APIRouter()
 
-# Initialize Cognito client
-cognito_client = boto3.client(
-    "cognito-idp",
-    region_name="us-east-1",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    aws_session_token=os.getenv("AWS_SESSION_TOKEN")
-)
+ORGANIZERS_GROUP = 'organizers'
+GROUP_CACHE_TTL_SECONDS = float(os.getenv('GROUP_CACHE_TTL_SECONDS', '300'))
+
+# Fallback for tokens that carry no cognito:groups claim
+_group_cache = InMemoryCacheBackend(maxsize=int(os.getenv('GROUP_CACHE_MAX_SIZE', '1024')))
 
 class UserRole(str, Enum):
     ORGANIZER = "organizer"
@@ -46,7 +47,8 @@ def get_secret_hash(username: str) -> str:
 async def sign_up(user: UserAuth):
     try:
         secret_hash = get_secret_hash(user.email)
-        response = cognito_client.sign_up(
+        response = await cognito(
+            "sign_up",
             ClientId=os.getenv("COGNITO_USER_POOL_CLIENT_ID"),
             Username=user.email,
             Password=user.password,
@@ -65,17 +67,19 @@ async def sign_up(user: UserAuth):
         
         # Auto-confirm the user (for development)
         try:
-            cognito_client.admin_confirm_sign_up(
+            await cognito(
+                "admin_confirm_sign_up",
                 UserPoolId=os.getenv("COGNITO_USER_POOL_ID"),
                 Username=user.email
             )
             
             # Add user to appropriate group based on role
             if user.role == UserRole.ORGANIZER:
-                cognito_client.admin_add_user_to_group(
+                await cognito(
+                    "admin_add_user_to_group",
                     UserPoolId=os.getenv("COGNITO_USER_POOL_ID"),
                     Username=user.email,
-                    GroupName='organizers'
+                    GroupName=ORGANIZERS_GROUP
                 )
         except ClientError as e:
             print(f"Error in post-signup operations: {e}")
@@ -88,7 +92,8 @@ async def sign_up(user: UserAuth):
 async def sign_in(user: UserAuth):
     try:
         secret_hash = get_secret_hash(user.email)
-        response = cognito_client.initiate_auth(
+        response = await cognito(
+            "initiate_auth",
             ClientId=os.getenv("COGNITO_USER_POOL_CLIENT_ID"),
             AuthFlow='USER_PASSWORD_AUTH',
             AuthParameters={
@@ -120,6 +125,31 @@ async def create_organizer(
     user.role = UserRole.ORGANIZER
     return await sign_up(user)
 
+async def get_user_groups(username: str, access_token: str) -> list:
+    """Return the user's Cognito groups, read from the verified access token when possible.
+
+    Cognito omits the cognito:groups claim for users in no group, and the
+    token cannot be checked while the pool keys are unavailable; only then
+    is the admin API asked, with the answer cached per user.
+    """
+    try:
+        claims = await run_io(verify_cognito_token, access_token)
+        if 'cognito:groups' in claims:
+            return claims['cognito:groups']
+    except Exception as e:
+        print(f"Could not read groups from token: {str(e)}")
+
+    groups = _group_cache.get(username)
+    if groups is None:
+        user_groups = await cognito(
+            "admin_list_groups_for_user",
+            Username=username,
+            UserPoolId=os.getenv("COGNITO_USER_POOL_ID")
+        )
+        groups = [group['GroupName'] for group in user_groups['Groups']]
+        _group_cache.set(username, groups, GROUP_CACHE_TTL_SECONDS)
+    return groups
+
 @router.post("/admin/signin")
 async def admin_signin(user_data: UserAuth):
     try:
@@ -134,7 +164,8 @@ async def admin_signin(user_data: UserAuth):
             ).digest()
         ).decode()
 
-        response = cognito_client.initiate_auth(
+        response = await cognito(
+            "initiate_auth",
             ClientId=os.getenv("COGNITO_USER_POOL_CLIENT_ID"),
             AuthFlow="USER_PASSWORD_AUTH",
             AuthParameters={
@@ -145,12 +176,8 @@ async def admin_signin(user_data: UserAuth):
         )
         
         # Verify user is in organizer group
-        user_groups = cognito_client.admin_list_groups_for_user(
-            Username=user_data.email,
-            UserPoolId=os.getenv("COGNITO_USER_POOL_ID")
-        )
-        
-        is_organizer = any(group['GroupName'] == 'organizers' for group in user_groups['Groups'])
+        groups = await get_user_groups(user_data.email, response["AuthenticationResult"]["AccessToken"])
+        is_organizer = ORGANIZERS_GROUP in groups
         
         if not is_organizer:
             raise HTTPException(
@@ -0,0 +1,240 @@
+import io
+import os
+import re
+import asyncio
+import tempfile
+from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from . import running_in_lambda
+from .db import get_s3, s3_head_object, s3_upload_fileobj, events_table, AWS_BACKEND
+from .cache import event_cache
+
+BANNER_MAX_BYTES = int(os.getenv('BANNER_MAX_BYTES', str(10 * 1024 * 1024)))
+BANNER_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+BANNER_UPLOAD_EXPIRY_SECONDS = int(os.getenv('BANNER_UPLOAD_EXPIRY_SECONDS', '900'))
+BANNER_SPOOL_CHUNK_BYTES = 1024 * 1024
+
+def bucket_name() -> str:
+    return os.getenv('S3_BUCKET_NAME')
+
+def banner_prefix(event_id: str) -> str:
+    return f"banners/{event_id}/"
+
+def banner_url(key: str) -> str:
+    return f"https://{bucket_name()}.s3.amazonaws.com/{key}"
+
+def _safe_filename(filename: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", os.path.basename(filename or ""))
+    return name[-100:] or "banner"
+
+def create_banner_upload(event_id: str, filename: str, content_type: str) -> dict:
+    """Presign a direct-to-S3 upload under ``banners/{event_id}/``.
+
+    The POST form enforces the size and content type in the policy. The PUT
+    URL is signed for the content type only, so the confirm step re-checks
+    the size of whatever was uploaded. Signing is local; no AWS call is made.
+    """
+    key = f"{banner_prefix(event_id)}{uuid4().hex}-{_safe_filename(filename)}"
+    s3 = get_s3()
+    post = s3.generate_presigned_post(
+        Bucket=bucket_name(),
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, BANNER_MAX_BYTES]
+        ],
+        ExpiresIn=BANNER_UPLOAD_EXPIRY_SECONDS
+    )
+    put_url = s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": bucket_name(), "Key": key, "ContentType": content_type},
+        ExpiresIn=BANNER_UPLOAD_EXPIRY_SECONDS
+    )
+    return {
+        "key": key,
+        "post": post,
+        "put": {"url": put_url, "headers": {"Content-Type": content_type}},
+        "max_bytes": BANNER_MAX_BYTES,
+        "expires_in": BANNER_UPLOAD_EXPIRY_SECONDS
+    }
+
+async def check_uploaded_banner(event_id: str, key: str):
+    """Return an error message if ``key`` is not an acceptable uploaded banner for the event, else None."""
+    if not key.startswith(banner_prefix(event_id)) or ".." in key:
+        return "Banner key does not belong to this event"
+    try:
+        head = await s3_head_object(Bucket=bucket_name(), Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ("404", "NoSuchKey", "NotFound"):
+            return "Banner has not been uploaded"
+        raise
+    if head.get('ContentLength', 0) > BANNER_MAX_BYTES:
+        return f"Banner exceeds {BANNER_MAX_BYTES} bytes"
+    if head.get('ContentType') not in BANNER_CONTENT_TYPES:
+        return "Unsupported banner content type"
+    return None
+
+async def spool_banner(upload) -> str:
+    """Copy a multipart banner to a temporary file in chunks and return its path.
+
+    Raises ValueError once the copy passes BANNER_MAX_BYTES. Starlette has
+    already parsed the whole multipart body by then, so this bounds what is
+    kept, not what the server received.
+    """
+    spool = tempfile.NamedTemporaryFile(prefix="banner-", delete=False)
+    size = 0
+    try:
+        with spool:
+            while chunk := await upload.read(BANNER_SPOOL_CHUNK_BYTES):
+                size += len(chunk)
+                if size > BANNER_MAX_BYTES:
+                    raise ValueError(f"Banner exceeds {BANNER_MAX_BYTES} bytes")
+                spool.write(chunk)
+    except BaseException:
+        discard_spooled_banner(spool.name)
+        raise
+    return spool.name
+
+def discard_spooled_banner(path: str):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+# Responsive variants generated for every banner: name -> bounding box
+BANNER_VARIANTS = {
+    "thumbnail": (320, 180),
+    "card": (800, 450),
+    "hero": (1920, 1080)
+}
+BANNER_VARIANT_FORMAT = os.getenv('BANNER_VARIANT_FORMAT', 'WEBP')
+BANNER_VARIANT_QUALITY = int(os.getenv('BANNER_VARIANT_QUALITY', '80'))
+BANNER_PROCESS_WORKERS = int(os.getenv('BANNER_PROCESS_WORKERS', '2'))
+BANNER_MAX_PIXELS = 40_000_000
+
+VARIANT_CONTENT_TYPES = {"WEBP": "image/webp", "AVIF": "image/avif", "JPEG": "image/jpeg"}
+
+_banner_pool = None
+_transfer_config = None
+_worker_s3 = {}  # pid -> client
+
+def _get_transfer_config():
+    global _transfer_config
+    if _transfer_config is None:
+        # s3transfer is only needed once a banner is processed
+        from boto3.s3.transfer import TransferConfig
+        _transfer_config = TransferConfig(
+            multipart_threshold=8 * 1024 * 1024,
+            multipart_chunksize=8 * 1024 * 1024,
+            max_concurrency=4
+        )
+    return _transfer_config
+
+def _get_banner_pool():
+    global _banner_pool
+    if _banner_pool is None:
+        if running_in_lambda() or AWS_BACKEND == 'local':
+            # Lambda has no /dev/shm, which multiprocessing needs; the local backend lives in this process
+            _banner_pool = ThreadPoolExecutor(max_workers=BANNER_PROCESS_WORKERS, thread_name_prefix="banner")
+        else:
+            _banner_pool = ProcessPoolExecutor(max_workers=BANNER_PROCESS_WORKERS)
+    return _banner_pool
+
+def shutdown_banner_pool():
+    global _banner_pool
+    if _banner_pool is not None:
+        _banner_pool.shutdown(wait=False, cancel_futures=True)
+        _banner_pool = None
+
+def render_variants(source, variant_format: str = BANNER_VARIANT_FORMAT,
+                    quality: int = BANNER_VARIANT_QUALITY) -> dict:
+    """Decode a banner (a file path or the bytes) and return ``{variant name: encoded bytes}``.
+
+    Runs in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = BANNER_MAX_PIXELS
+    variants = {}
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as original:
+        # Let the JPEG decoder downscale while decoding when it can
+        original.draft("RGB", max(BANNER_VARIANTS.values()))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        # Largest first, so each smaller variant resamples an already reduced image
+        for name, size in sorted(BANNER_VARIANTS.items(), key=lambda entry: -entry[1][0]):
+            image = image.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format=variant_format, quality=quality, method=4)
+            variants[name] = buffer.getvalue()
+    return variants
+
+def _get_worker_s3():
+    # A forked worker builds its own client rather than share the parent's connections
+    pid = os.getpid()
+    if pid not in _worker_s3:
+        _worker_s3.clear()
+        _worker_s3[pid] = get_s3.__wrapped__()
+    return _worker_s3[pid]
+
+def render_uploaded_variants(bucket: str, key: str) -> dict:
+    """Download an uploaded banner to a temporary file and render its variants.
+
+    Runs in a worker process, so the object never passes through the API process.
+    """
+    with tempfile.NamedTemporaryFile(prefix="banner-") as spool:
+        _get_worker_s3().download_fileobj(bucket, key, spool)
+        spool.flush()
+        return render_variants(spool.name)
+
+async def process_banner(event_id: str, source):
+    """Render the banner variants off the event loop, upload them concurrently and record them on the event.
+
+    ``source`` is a spooled file's path, or ``(bucket, key)`` of an uploaded object.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        if isinstance(source, tuple):
+            variants = await loop.run_in_executor(_get_banner_pool(), render_uploaded_variants, *source)
+        else:
+            variants = await loop.run_in_executor(_get_banner_pool(), render_variants, source)
+
+        content_type = VARIANT_CONTENT_TYPES.get(BANNER_VARIANT_FORMAT.upper(), "application/octet-stream")
+        extension = BANNER_VARIANT_FORMAT.lower()
+        base = f"{banner_prefix(event_id)}variants/{uuid4().hex}"
+        keys = {name: f"{base}/{name}.{extension}" for name in variants}
+        await asyncio.gather(*(
+            s3_upload_fileobj(
+                io.BytesIO(body), bucket_name(), keys[name],
+                ExtraArgs={
+                    "ContentType": content_type,
+                    "CacheControl": "public, max-age=31536000, immutable"
+                },
+                Config=_get_transfer_config()
+            )
+            for name, body in variants.items()
+        ))
+
+        banner_variants = {name: banner_url(key) for name, key in keys.items()}
+        await events_table.update_item(
+            Key={'id': event_id},
+            UpdateExpression="SET banner_variants = :variants",
+            ExpressionAttributeValues={':variants': banner_variants}
+        )
+        await event_cache.invalidate(event_id)
+    except Exception as e:
+        print(f"Error processing banner for event {event_id}: {str(e)}")
+
+async def process_spooled_banner(event_id: str, path: str):
+    try:
+        await process_banner(event_id, path)
+    finally:
+        discard_spooled_banner(path)
+
+async def process_uploaded_banner(event_id: str, key: str):
+    await process_banner(event_id, (bucket_name(), key))
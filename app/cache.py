@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from decimal import Decimal
+from collections import OrderedDict
+from .db import events_table, run_io
+from .utils import json_default
+
+EVENT_CACHE_TTL_SECONDS = float(os.getenv('EVENT_CACHE_TTL_SECONDS', '30'))
+EVENT_CACHE_MAX_SIZE = int(os.getenv('EVENT_CACHE_MAX_SIZE', '1024'))
+EVENT_CACHE_BACKEND = os.getenv('EVENT_CACHE_BACKEND', 'memory')
+
+class InMemoryCacheBackend:
+    """Bounded LRU with per-entry expiry, local to this process."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """Shared backend so every worker sees the same entries. Needs the ``redis`` package."""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "event:"):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw, parse_float=Decimal, parse_int=Decimal)
+
+    def set(self, key: str, value, ttl: float):
+        self._client.set(self.prefix + key, json.dumps(value, default=json_default), px=int(ttl * 1000))
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+    def __len__(self):
+        return 0  # Not tracked for a shared store
+
+class ReadThroughCache:
+    """Read-through TTL cache in front of an async loader, with hit/miss counters.
+
+    Concurrent misses for the same key share one load.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._inflight = {}
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await run_io(method, *args)
+        return method(*args)
+
+    async def get(self, key: str, loader):
+        value = await self._call(self.backend.get, key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(loader(key))
+            self._inflight[key] = pending
+            try:
+                value = await pending
+            finally:
+                self._inflight.pop(key, None)
+            if value is not None:
+                await self.set(key, value)
+            return value
+        return await asyncio.shield(pending)
+
+    async def set(self, key: str, value):
+        await self._call(self.backend.set, key, value, self.ttl)
+
+    async def invalidate(self, key: str):
+        await self._call(self.backend.delete, key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self.backend),
+            "ttl_seconds": self.ttl
+        }
+
+def _make_backend():
+    if EVENT_CACHE_BACKEND == 'redis':
+        return RedisCacheBackend(os.getenv('EVENT_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    return InMemoryCacheBackend(EVENT_CACHE_MAX_SIZE)
+
+event_cache = ReadThroughCache(_make_backend(), EVENT_CACHE_TTL_SECONDS)
+
+async def _load_event(event_id: str):
+    response = await events_table.get_item(Key={'id': event_id})
+    return response.get('Item')
+
+async def get_event_item(event_id: str):
+    """Return the event item, or None if it does not exist, reading through the cache."""
+    return await event_cache.get(event_id, _load_event)
@@ -1,11 +1,51 @@
 import boto3
 import os
+import time
 from dotenv import load_dotenv
-from app.models.models import REGISTRATION_REQUESTS_TABLE
+from app.models.models import (
+    EVENTS_TABLE, REGISTRATION_REQUESTS_TABLE, EVENT_PARTICIPANTS_TABLE, REGISTRATION_AGGREGATES_TABLE,
+    REGISTRATION_COUNTERS_TABLE, EVENT_WAITLIST_TABLE
+)
 
 # Load environment variables
 load_dotenv()
 
+def wait_for_index(client, table_name: str, index_name: str, poll_seconds: float = 5):
+    while True:
+        table = client.describe_table(TableName=table_name)['Table']
+        statuses = {index['IndexName']: index['IndexStatus'] for index in table.get('GlobalSecondaryIndexes', [])}
+        if table['TableStatus'] == 'ACTIVE' and statuses.get(index_name) == 'ACTIVE':
+            return
+        time.sleep(poll_seconds)
+
+def add_missing_indexes(client, definition: dict):
+    """Create the global secondary indexes an existing table lacks.
+
+    DynamoDB creates one index per update_table call, and the table has to
+    finish backfilling it before the next one can start.
+    """
+    table_name = definition['TableName']
+    table = client.describe_table(TableName=table_name)['Table']
+    existing = {index['IndexName'] for index in table.get('GlobalSecondaryIndexes', [])}
+    on_demand = table.get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST'
+    for index in definition.get('GlobalSecondaryIndexes', []):
+        if index['IndexName'] in existing:
+            continue
+        if on_demand:
+            index = {key: value for key, value in index.items() if key != 'ProvisionedThroughput'}
+        key_names = {key['AttributeName'] for key in index['KeySchema']}
+        client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=[
+                attribute for attribute in definition['AttributeDefinitions']
+                if attribute['AttributeName'] in key_names
+            ],
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+        print(f"Creating index {index['IndexName']} on {table_name}")
+        wait_for_index(client, table_name, index['IndexName'])
+        print(f"Created index {index['IndexName']} on {table_name}")
+
 def create_tables():
     try:
         dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION'))
@@ -13,13 +53,17 @@ def create_tables():
         # Get existing tables
         existing_tables = dynamodb.meta.client.list_tables()['TableNames']
         
-        # Create registration requests table if it doesn't exist
-        if REGISTRATION_REQUESTS_TABLE['TableName'] not in existing_tables:
-            table = dynamodb.create_table(**REGISTRATION_REQUESTS_TABLE)
-            table.wait_until_exists()
-            print(f"Created table: {REGISTRATION_REQUESTS_TABLE['TableName']}")
-        else:
-            print(f"Table {REGISTRATION_REQUESTS_TABLE['TableName']} already exists")
+        # Create each table if it doesn't exist, or add the indexes it is missing
+        events_definition = {**EVENTS_TABLE, 'TableName': os.getenv('DYNAMODB_EVENTS_TABLE', EVENTS_TABLE['TableName'])}
+        for definition in (events_definition, REGISTRATION_REQUESTS_TABLE, EVENT_PARTICIPANTS_TABLE,
+                           REGISTRATION_AGGREGATES_TABLE, REGISTRATION_COUNTERS_TABLE, EVENT_WAITLIST_TABLE):
+            if definition['TableName'] not in existing_tables:
+                table = dynamodb.create_table(**definition)
+                table.wait_until_exists()
+                print(f"Created table: {definition['TableName']}")
+            else:
+                print(f"Table {definition['TableName']} already exists")
+                add_missing_indexes(dynamodb.meta.client, definition)
             
         print("Tables setup completed")
         
@@ -1,20 +1,322 @@
-import boto3
 import os
-from .models.models import REGISTRATION_REQUESTS_TABLE
-
-def create_tables():
-    dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION'))
-    
-    tables = dynamodb.meta.client.list_tables()['TableNames']
-    
-    # # Create events table if it doesn't exist
-    # if EVENTS_TABLE['TableName'] not in tables:
-    #     dynamodb.create_table(**EVENTS_TABLE)
-    #     print(f"Created table: {EVENTS_TABLE['TableName']}")
-    
-    # Create registration requests table if it doesn't exist
-    if REGISTRATION_REQUESTS_TABLE['TableName'] not in tables:
-        dynamodb.create_table(**REGISTRATION_REQUESTS_TABLE)
-        print(f"Created table: {REGISTRATION_REQUESTS_TABLE['TableName']}")
-
-    print("Tables setup completed")
\ No newline at end of file
+import time
+import queue
+import random
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from . import running_in_lambda
+from .metrics import instrument_client
+from .throttling import (
+    capacity_tracker, track_capacity, call_with_throttle_retry, retry_throttled, background_work, BackgroundBudget,
+    is_transaction_conflict, conflict_delay, TRANSACTION_CONFLICT_MAX_ATTEMPTS
+)
+from .models.models import (
+    EVENTS_TABLE, REGISTRATION_REQUESTS_TABLE, EVENT_PARTICIPANTS_TABLE, REGISTRATION_AGGREGATES_TABLE,
+    REGISTRATION_COUNTERS_TABLE, EVENT_WAITLIST_TABLE
+)
+
+# Lambda gets its configuration from the function environment
+if not running_in_lambda():
+    load_dotenv()
+
+# boto3 is blocking, so every AWS call made from an async handler runs on
+# this pool. Size the HTTP connection pool to match so threads never queue
+# for a connection.
+AWS_IO_THREADS = int(os.getenv('AWS_IO_THREADS', '32'))
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', str(AWS_IO_THREADS)))
+
+aws_config = Config(
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=float(os.getenv('AWS_CONNECT_TIMEOUT', '2')),
+    read_timeout=float(os.getenv('AWS_READ_TIMEOUT', '10')),
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+# "local" swaps every AWS client for the in-memory stand-ins in local_backend.py
+AWS_BACKEND = os.getenv('AWS_BACKEND', 'aws')
+
+# Throttles get one quick retry in botocore; the adaptive retries in
+# throttling.py take over from there
+dynamodb_config = aws_config.merge(Config(retries={'total_max_attempts': 2, 'mode': 'standard'}))
+
+_io_executor = ThreadPoolExecutor(max_workers=AWS_IO_THREADS, thread_name_prefix="aws-io")
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking boto3 call on the AWS I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+def lazy_client(factory):
+    """Memoize a client factory so the client is built on first use, once, from any thread.
+
+    Creating boto3 clients loads their service models, which is most of the
+    import-time cost of this app; deferring it keeps Lambda cold starts short.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    return get
+
+def _local_backend():
+    from .local_backend import get_local_backend
+    return get_local_backend()
+
+@lazy_client
+def get_dynamodb():
+    if AWS_BACKEND == 'local':
+        return _local_backend().dynamodb
+    resource = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION'), config=dynamodb_config)
+    instrument_client(resource.meta.client)
+    track_capacity(resource.meta.client)
+    return resource
+
+@lazy_client
+def get_s3():
+    if AWS_BACKEND == 'local':
+        return _local_backend().s3
+    return instrument_client(boto3.client('s3', region_name=os.getenv('AWS_REGION'), config=aws_config))
+
+@lazy_client
+def get_sns():
+    if AWS_BACKEND == 'local':
+        return _local_backend().sns
+    return instrument_client(boto3.client('sns', region_name=os.getenv('AWS_REGION'), config=aws_config))
+
+@lazy_client
+def get_sqs():
+    if AWS_BACKEND == 'local':
+        return _local_backend().sqs
+    return instrument_client(boto3.client('sqs', region_name=os.getenv('AWS_REGION'), config=aws_config))
+
+@lazy_client
+def get_cognito_client():
+    if AWS_BACKEND == 'local':
+        return _local_backend().cognito
+    return instrument_client(boto3.client(
+        "cognito-idp",
+        region_name="us-east-1",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
+        config=aws_config
+    ))
+
+class AsyncTable:
+    """Awaitable wrapper around a boto3 Table; ``sync`` is the underlying table for thread-side code.
+
+    The Table resource is created on first use.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._table = None
+
+    @property
+    def sync(self):
+        if self._table is None:
+            self._table = get_dynamodb().Table(self.name)
+        return self._table
+
+    async def _call(self, method, **kwargs):
+        return await call_with_throttle_retry(self.name, lambda: run_io(method, **kwargs))
+
+    async def get_item(self, **kwargs):
+        return await self._call(self.sync.get_item, **kwargs)
+
+    async def put_item(self, **kwargs):
+        return await self._call(self.sync.put_item, **kwargs)
+
+    async def update_item(self, **kwargs):
+        return await self._call(self.sync.update_item, **kwargs)
+
+    async def delete_item(self, **kwargs):
+        return await self._call(self.sync.delete_item, **kwargs)
+
+    async def query(self, **kwargs):
+        return await self._call(self.sync.query, **kwargs)
+
+    async def scan(self, **kwargs):
+        return await self._call(self.sync.scan, **kwargs)
+
+events_table = AsyncTable(os.getenv('DYNAMODB_EVENTS_TABLE', EVENTS_TABLE['TableName']))
+registration_requests_table = AsyncTable(REGISTRATION_REQUESTS_TABLE['TableName'])
+event_participants_table = AsyncTable(EVENT_PARTICIPANTS_TABLE['TableName'])
+registration_aggregates_table = AsyncTable(REGISTRATION_AGGREGATES_TABLE['TableName'])
+registration_counters_table = AsyncTable(REGISTRATION_COUNTERS_TABLE['TableName'])
+event_waitlist_table = AsyncTable(EVENT_WAITLIST_TABLE['TableName'])
+
+capacity_tracker.configure(
+    lambda table_name: get_dynamodb().meta.client.describe_table(TableName=table_name)['Table']
+)
+
+async def transact_write_items(**kwargs):
+    """Low-level TransactWriteItems; attribute values must already be serialized.
+
+    Throttles are retried, and so are cancellations caused only by another
+    transaction writing the same items, which are common when many writers
+    hit one event at once.
+    """
+    tables = {
+        request['TableName'] for entry in kwargs['TransactItems'] for request in entry.values()
+    }
+    for attempt in range(TRANSACTION_CONFLICT_MAX_ATTEMPTS):
+        try:
+            return await call_with_throttle_retry(
+                sorted(tables), lambda: run_io(get_dynamodb().meta.client.transact_write_items, **kwargs)
+            )
+        except ClientError as e:
+            if not is_transaction_conflict(e) or attempt + 1 >= TRANSACTION_CONFLICT_MAX_ATTEMPTS:
+                raise
+            await asyncio.sleep(conflict_delay(attempt))
+
+def _write_chunk(table_name: str, items: list, key: str) -> dict:
+    """BatchWriteItem one chunk, retrying UnprocessedItems with exponential backoff.
+
+    Returns ``{item key: error}`` for the items that could not be written.
+    """
+    request = {table_name: [{'PutRequest': {'Item': item}} for item in items]}
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        try:
+            response = retry_throttled(table_name, get_dynamodb().batch_write_item, RequestItems=request)
+        except Exception as e:
+            return {item[key]: str(e) for item in items}
+        request = response.get('UnprocessedItems') or {}
+        if not request:
+            return {}
+        time.sleep(min(5.0, 0.05 * 2 ** attempt) * (0.5 + random.random() / 2))
+    return {
+        entry['PutRequest']['Item'][key]: "Unprocessed after retries"
+        for entry in request.get(table_name, [])
+    }
+
+async def batch_put_items(table_name: str, items: list, key: str = 'id') -> dict:
+    """Write ``items`` in 25-item batches spread over concurrent workers; returns failures by key."""
+    semaphore = asyncio.Semaphore(BATCH_WRITE_CONCURRENCY)
+
+    async def write(chunk):
+        async with semaphore:
+            return await run_io(_write_chunk, table_name, chunk, key)
+
+    chunks = [items[i:i + BATCH_WRITE_SIZE] for i in range(0, len(items), BATCH_WRITE_SIZE)]
+    failed = {}
+    for failures in await asyncio.gather(*(write(chunk) for chunk in chunks)):
+        failed.update(failures)
+    return failed
+
+def _get_chunk(table_name: str, keys: list, consistent_read: bool = False) -> list:
+    request = {table_name: {'Keys': keys, 'ConsistentRead': consistent_read}}
+    items = []
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        response = retry_throttled(table_name, get_dynamodb().batch_get_item, RequestItems=request)
+        items.extend(response['Responses'].get(table_name, []))
+        request = response.get('UnprocessedKeys') or {}
+        if not request:
+            return items
+        time.sleep(min(5.0, 0.05 * 2 ** attempt) * (0.5 + random.random() / 2))
+    raise RuntimeError(f"BatchGetItem left {len(request[table_name]['Keys'])} keys unprocessed")
+
+async def batch_get_items(table_name: str, keys: list, consistent_read: bool = False) -> list:
+    """Fetch items by key with BatchGetItem, 100 keys per call, chunks fetched concurrently."""
+    chunks = [keys[i:i + BATCH_GET_SIZE] for i in range(0, len(keys), BATCH_GET_SIZE)]
+    results = await asyncio.gather(*(run_io(_get_chunk, table_name, chunk, consistent_read) for chunk in chunks))
+    return [item for items in results for item in items]
+
+async def s3_upload_fileobj(fileobj, bucket: str, key: str, **kwargs):
+    return await run_io(get_s3().upload_fileobj, fileobj, bucket, key, **kwargs)
+
+async def s3_head_object(**kwargs):
+    return await run_io(get_s3().head_object, **kwargs)
+
+async def sns_publish(**kwargs):
+    return await run_io(get_sns().publish, **kwargs)
+
+async def cognito(operation: str, **kwargs):
+    """Call a Cognito identity provider operation, e.g. ``await cognito("initiate_auth", ...)``."""
+    return await run_io(getattr(get_cognito_client(), operation), **kwargs)
+
+BATCH_WRITE_SIZE = 25  # BatchWriteItem limit
+BATCH_GET_SIZE = 100  # BatchGetItem limit
+BATCH_WRITE_CONCURRENCY = int(os.getenv('BATCH_WRITE_CONCURRENCY', '8'))
+BATCH_WRITE_MAX_ATTEMPTS = int(os.getenv('BATCH_WRITE_MAX_ATTEMPTS', '8'))
+
+SCAN_SEGMENTS = int(os.getenv('SCAN_SEGMENTS', '8'))
+SCAN_MAX_WORKERS = int(os.getenv('SCAN_MAX_WORKERS', '8'))
+SCAN_READ_CAPACITY_PER_SECOND = float(os.getenv('SCAN_READ_CAPACITY_PER_SECOND', '0'))  # 0 = no cap beyond BackgroundBudget
+
+_SEGMENT_DONE = object()
+
+def parallel_scan(table, total_segments: int = SCAN_SEGMENTS, max_workers: int = SCAN_MAX_WORKERS,
+                  read_capacity_per_second: float = SCAN_READ_CAPACITY_PER_SECOND, **scan_kwargs):
+    """Run a DynamoDB parallel scan and yield pages of items as segments produce them.
+
+    Segments are scanned on a bounded thread pool and merged through a small
+    queue, so memory stays at a few pages no matter how large the table is.
+    Pages arrive in no particular order. This is background work: reads are
+    paced to leave the table's capacity to interactive requests, capped at
+    ``read_capacity_per_second`` when that is set.
+    """
+    budget = BackgroundBudget(table.name, read_capacity_per_second)
+    pages = queue.Queue(maxsize=total_segments * 2)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment):
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments, ReturnConsumedCapacity='TOTAL')
+        try:
+            with background_work():
+                while not stop.is_set():
+                    response = retry_throttled(table.name, table.scan, **kwargs)
+                    # Pages may overdraw the budget; the next one waits until it is paid back
+                    budget.wait(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+                    if not put(response.get('Items', [])):
+                        return
+                    last_key = response.get('LastEvaluatedKey')
+                    if not last_key:
+                        break
+                    kwargs['ExclusiveStartKey'] = last_key
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, total_segments)),
+                                  thread_name_prefix="parallel-scan")
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            item = pages.get()
+            if item is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # Consumer finished or went away (client disconnect): let workers exit
+        stop.set()
+        executor.shutdown(wait=False)
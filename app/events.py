@@ -1,32 +1,58 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form, Request, Query, Path
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form, Request, Query, Path, BackgroundTasks
 from boto3.dynamodb.conditions import Key
-import boto3
 import os
 from uuid import uuid4
 from datetime import datetime
-from .models.models import Event, REGISTRATION_REQUESTS_TABLE
-from .middleware import require_role, get_current_user
+from . import running_in_lambda
+from .models.models import Event, EventStatus, RegistrationStatus, EVENTS_TABLE
+from .middleware import require_role, organizer_dependency, get_current_user
 from enum import Enum
-from pydantic import BaseModel
-from typing import List
-from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from fastapi.responses import StreamingResponse
 from botocore.exceptions import ClientError
+import asyncio
+from collections import defaultdict
+import csv
+import io
 import json
 from sports_event_utils import validate_event_data
+from .utils import encode_cursor, decode_cursor, scan_pages, collect_pages, iter_ndjson, projection_kwargs
+from .cache import event_cache, get_event_item
+from .search import search_index, location_key
+from .responses import FastJSONResponse
+from .http_cache import cached_json, EVENT_CACHE_CONTROL, EVENT_LIST_CACHE_CONTROL, PRIVATE_CACHE_CONTROL
+from .banners import (
+    BANNER_CONTENT_TYPES, banner_url, create_banner_upload, check_uploaded_banner,
+    spool_banner, discard_spooled_banner, process_spooled_banner, process_uploaded_banner
+)
+from .notifications import notification_outbox, send_registration_confirmation
+from .admission import (
+    CANCELLABLE_STATUSES, admission_enabled, enqueue_registration, request_promotion, cancel,
+    waitlist_position, admission_worker
+)
+from .analytics import (
+    record_registration, record_status_change, apply_deltas, get_aggregates, report_aggregate_error
+)
+from .registrations import (
+    BulkOutcome, claim_seat, release_seat, list_participants,
+    bulk_update_event_status, raise_for_seat_outcome, raise_for_bulk_outcome
+)
+from .db import (
+    get_dynamodb, events_table, registration_requests_table, run_io, parallel_scan,
+    s3_upload_fileobj, batch_put_items, batch_get_items, SCAN_SEGMENTS, SCAN_READ_CAPACITY_PER_SECOND
+)
 
 router = APIRouter()
 
-dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION'))
-s3 = boto3.client('s3', region_name=os.getenv('AWS_REGION'))
-events_table = dynamodb.Table(os.getenv('DYNAMODB_EVENTS_TABLE'))
-registration_requests_table = dynamodb.Table(REGISTRATION_REQUESTS_TABLE['TableName'])
-sns = boto3.client('sns', region_name=os.getenv('AWS_REGION'))
-SNS_TOPIC_ARN = os.getenv('SNS_TOPIC_ARN')
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
 
-class RegistrationStatus(str, Enum):
-    PENDING = "PENDING"
-    APPROVED = "APPROVED"
-    REJECTED = "REJECTED"
+REGISTRATION_EXPORT_COLUMNS = [
+    "id", "event_id", "user_id", "status", "created_at", "full_name", "email",
+    "college_name", "year_of_study", "phone_number", "why_interested"
+]
 
 class RegistrationRequest(BaseModel):
     full_name: str
@@ -36,22 +62,53 @@ class RegistrationRequest(BaseModel):
     phone_number: str
     why_interested: str
 
-@router.post("/")
-async def create_event(
-    title: str = Form(...),
-    description: str = Form(...),
-    date: str = Form(...),
-    location: str = Form(...),
-    max_participants: int = Form(...),
-    organizer_id: str = Form(...),
-    banner: UploadFile = File(None)  # Optional file upload
-):
+# Attributes a fields= parameter may name
+EVENT_FIELDS = set(Event.model_fields)
+REGISTRATION_FIELDS = {"id", "event_id", "user_id", "status", "created_at", "waitlist_key"} | set(
+    RegistrationRequest.model_fields
+)
+FIELDS_DESCRIPTION = "Comma-separated attributes to return, e.g. id,title,date; id is always included"
+
+def fields_projection(fields: Optional[str], allowed) -> dict:
+    if not fields:
+        return {}
+    try:
+        return projection_kwargs(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class BulkStatusUpdate(BaseModel):
+    request_ids: List[str]
+    status: RegistrationStatus
+
+BULK_STATUS_MAX_IDS = 1000
+
+class BannerUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+
+class BannerConfirmRequest(BaseModel):
+    key: str
+
+class EventRow(BaseModel):
+    title: str
+    description: str
+    date: str
+    location: str
+    max_participants: int
+    organizer_id: str
+
+BULK_IMPORT_MAX_ROWS = 1000
+
+def build_event_item(title: str, description: str, date: str, location: str,
+                     max_participants: int, organizer_id: str) -> dict:
+    """Build a new event item, raising ValueError if it does not validate."""
     try:
         # Convert the date string to a datetime object
         event_date = datetime.fromisoformat(date)
         event_date_str = event_date.isoformat()
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {e}")
+        raise ValueError(f"Invalid date format: {e}")
 
     # Prepare event data
     event_data = {
@@ -62,44 +119,194 @@ async def create_event(
         "location": location,
         "max_participants": max_participants,
         "organizer_id": organizer_id,
+        "participant_count": 0,
+        "status": EventStatus.UPCOMING.value,  # Partition key of status-date-index
     }
 
     # Validate the event data
     if not validate_event_data(event_data):
-        raise HTTPException(status_code=400, detail="Invalid event data")
+        raise ValueError("Invalid event data")
+
+    # Partition key of location-index, which cannot be empty
+    if location_key(location):
+        event_data['location_key'] = location_key(location)
 
     # Ensure all datetime fields are strings before storing
     for key, value in event_data.items():
         if isinstance(value, datetime):
             event_data[key] = value.isoformat()  # Convert to string if it's a datetime
+    return event_data
 
+@router.post("/")
+async def create_event(
+    background_tasks: BackgroundTasks,
+    title: str = Form(...),
+    description: str = Form(...),
+    date: str = Form(...),
+    location: str = Form(...),
+    max_participants: int = Form(...),
+    organizer_id: str = Form(...),
+    banner: UploadFile = File(None)  # Optional file upload
+):
+    try:
+        event_data = build_event_item(title, description, date, location, max_participants, organizer_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Handle banner upload
+    banner_path = None
     if banner:
+        # Spooled to disk in chunks, so a large upload never sits in memory
+        try:
+            banner_path = await spool_banner(banner)
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
         try:
             # Upload the file to S3
             s3_key = f"banners/{event_data['id']}/{banner.filename}"
-            s3.upload_fileobj(banner.file, os.getenv('S3_BUCKET_NAME'), s3_key)
+            with open(banner_path, 'rb') as banner_file:
+                await s3_upload_fileobj(banner_file, os.getenv('S3_BUCKET_NAME'), s3_key)
             # Store the S3 URL in the event data
             event_data['banner_url'] = f"https://{os.getenv('S3_BUCKET_NAME')}.s3.amazonaws.com/{s3_key}"
         except Exception as e:
+            discard_spooled_banner(banner_path)
             raise HTTPException(status_code=500, detail=f"Error uploading banner: {e}")
 
     # Store event in DynamoDB
     try:
-        events_table.put_item(Item=event_data)
+        await events_table.put_item(Item=event_data)
+    except HTTPException:
+        discard_spooled_banner(banner_path)
+        raise
     except Exception as e:
+        discard_spooled_banner(banner_path)
         raise HTTPException(status_code=500, detail=f"Error storing event: {e}")
+    await event_cache.set(event_data['id'], event_data)
+    search_index.add(event_data)
+
+    # Responsive variants are rendered after the response has been sent
+    if banner_path:
+        background_tasks.add_task(process_spooled_banner, event_data['id'], banner_path)
 
     return {"message": "Event created successfully", "banner_url": event_data.get('banner_url')}
 
+@router.post("/bulk")
+async def bulk_create_events(request: Request):
+    """
+    Create many events at once from a JSON array or a CSV body (Content-Type: text/csv).
+    Returns one result per input row.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get('content-type', '').startswith('text/csv'):
+            rows = list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+        else:
+            rows = json.loads(body)
+            if isinstance(rows, dict):
+                rows = rows.get('events', [])
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse request body: {e}")
+    if not isinstance(rows, list) or not rows:
+        raise HTTPException(status_code=400, detail="Expected a non-empty list of events")
+    if len(rows) > BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_IMPORT_MAX_ROWS} events per request")
+
+    results = []
+    items = []
+    for index, row in enumerate(rows):
+        try:
+            fields = EventRow.model_validate(row)
+            item = build_event_item(**fields.model_dump())
+        except (ValidationError, ValueError) as e:
+            results.append({"row": index, "status": "invalid", "error": str(e)})
+            continue
+        items.append(item)
+        results.append({"row": index, "status": "created", "id": item['id']})
+
+    try:
+        failed = await batch_put_items(events_table.name, items)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error storing events: {e}")
+    for result in results:
+        if result.get('id') in failed:
+            result['status'] = "failed"
+            result['error'] = failed[result['id']]
+    for item in items:
+        if item['id'] not in failed:
+            search_index.add(item)
+
+    created = sum(1 for result in results if result['status'] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+async def get_own_event(event_id: str, user: dict) -> dict:
+    event = await get_event_item(event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if event.get('organizer_id') != user['id']:
+        raise HTTPException(status_code=403, detail="Only the event's organizer can access it")
+    return event
+
+@router.post("/{event_id}/banner/upload-url")
+async def create_banner_upload_url(
+    event_id: str,
+    upload: BannerUploadRequest,
+    user=Depends(organizer_dependency)
+):
+    """
+    Issue presigned POST/PUT targets so the client uploads the banner straight to S3.
+    """
+    if upload.content_type not in BANNER_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported banner content type")
+    await get_own_event(event_id, user)
+    try:
+        return create_banner_upload(event_id, upload.filename, upload.content_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating banner upload: {e}")
+
+@router.post("/{event_id}/banner/confirm")
+async def confirm_banner_upload(
+    event_id: str,
+    confirm: BannerConfirmRequest,
+    background_tasks: BackgroundTasks,
+    user=Depends(organizer_dependency)
+):
+    """
+    Attach a banner uploaded through a presigned URL to the event.
+    """
+    await get_own_event(event_id, user)
+    try:
+        error = await check_uploaded_banner(event_id, confirm.key)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+        url = banner_url(confirm.key)
+        await events_table.update_item(
+            Key={'id': event_id},
+            UpdateExpression="SET banner_url = :banner_url",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeValues={':banner_url': url}
+        )
+        await event_cache.invalidate(event_id)
+        background_tasks.add_task(process_uploaded_banner, event_id, confirm.key)
+        return {"message": "Banner attached successfully", "banner_url": url}
+    except HTTPException:
+        raise
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise HTTPException(status_code=404, detail="Event not found")
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/events/{event_id}")
-async def get_event(event_id: str):
+async def get_event(event_id: str, request: Request):
     try:
-        response = events_table.get_item(Key={'id': event_id})
-        if 'Item' not in response:
+        event = await get_event_item(event_id)
+        if event is None:
             raise HTTPException(status_code=404, detail="Event not found")
-        return response['Item']
+        return cached_json(request, event, EVENT_CACHE_CONTROL, key=f"event:{event_id}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -109,163 +316,515 @@ async def register_for_event(
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        # Get the event
-        event = events_table.get_item(Key={'id': event_id})
-        if 'Item' not in event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        
-        event = event['Item']
-        
-        # Check if user is already registered
-        participants = event.get('participants', [])
-        if current_user['id'] in participants:
-            raise HTTPException(status_code=400, detail="Already registered for this event")
-            
-        # Check if event is full
-        if len(participants) >= event['max_participants']:
-            raise HTTPException(status_code=400, detail="Event is full")
-            
-        # Add user to participants
-        events_table.update_item(
-            Key={'id': event_id},
-            UpdateExpression="SET participants = list_append(if_not_exists(participants, :empty_list), :user)",
-            ExpressionAttributeValues={
-                ':user': [current_user['id']],
-                ':empty_list': []
-            }
-        )
+        outcome, _ = await claim_seat(event_id, current_user['id'])
+        raise_for_seat_outcome(outcome)
         
         return {"message": "Successfully registered for event"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{event_id}/participants")
+async def get_event_participants(
+    event_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page")
+):
+    start_key = None
+    if cursor:
+        try:
+            start_key = decode_cursor(cursor, keys=('event_id', 'user_id'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        items, last_key = await list_participants(event_id, limit, start_key)
+        return {"items": items, "next_cursor": encode_cursor(last_key)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def get_cache_stats(user=Depends(organizer_dependency)):
+    return {"events": event_cache.stats()}
+
+@router.get("/notifications/stats")
+async def get_notification_stats(user=Depends(organizer_dependency)):
+    return await notification_outbox.stats()
+
+@router.get("/admission/stats")
+async def get_admission_stats(user=Depends(organizer_dependency)):
+    return admission_worker.stats()
+
 @router.get("/events/organizer/{organizer_id}")
 @require_role("organizer")
-async def get_organizer_events(organizer_id: str):
+async def get_organizer_events(
+    organizer_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
     try:
-        response = events_table.query(
+        response = await events_table.query(
             IndexName='organizer-index',
-            KeyConditionExpression=Key('organizer_id').eq(organizer_id)
+            KeyConditionExpression=Key('organizer_id').eq(organizer_id),
+            **fields_projection(fields, EVENT_FIELDS)
         )
-        return response['Items']
+        return cached_json(request, response['Items'], PRIVATE_CACHE_CONTROL)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/")
-async def get_all_events():
+async def get_all_events(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page"),
+    stream: bool = Query(False, description="Stream every event as NDJSON, page by page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    scan_kwargs = fields_projection(fields, EVENT_FIELDS)
+    if cursor:
+        try:
+            scan_kwargs['ExclusiveStartKey'] = decode_cursor(cursor, keys=('id',))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit:
+        scan_kwargs['Limit'] = limit
+
+    if stream:
+        # Sync generator, so Starlette iterates it in the threadpool
+        return StreamingResponse(
+            iter_ndjson(scan_pages(events_table.sync, **scan_kwargs)),
+            media_type="application/x-ndjson"
+        )
+
     try:
-        response = events_table.scan()  # Use scan to get all items
-        return response['Items']  # Return the list of events
+        if limit is None and cursor is None:
+            # No paging requested: keep returning a plain list, but follow
+            # LastEvaluatedKey instead of truncating at the first 1 MB page
+            items = await run_io(collect_pages, events_table.sync, **scan_kwargs)
+            return cached_json(request, items, EVENT_LIST_CACHE_CONTROL)
+
+        response = await events_table.scan(**scan_kwargs)
+        return cached_json(request, {
+            "items": response['Items'],
+            "next_cursor": encode_cursor(response.get('LastEvaluatedKey'))
+        }, EVENT_LIST_CACHE_CONTROL)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def date_key_condition(start: Optional[datetime], end: Optional[datetime]):
+    """Sort key condition on ``date`` for the discovery indexes; open-ended when ``end`` is None."""
+    start = (start or datetime.now()).isoformat()
+    if end is None:
+        return Key('date').gte(start)
+    if end.isoformat() < start:
+        raise HTTPException(status_code=400, detail="'to' is before 'from'")
+    return Key('date').between(start, end.isoformat())
+
+def index_cursor_keys(index_name: str) -> tuple:
+    """Attributes of a LastEvaluatedKey from an events index: the table key plus the index key."""
+    index = next(index for index in EVENTS_TABLE['GlobalSecondaryIndexes'] if index['IndexName'] == index_name)
+    return ('id',) + tuple(key['AttributeName'] for key in index['KeySchema'])
+
+async def query_event_index(index_name: str, key_condition, limit: int, cursor: Optional[str]):
+    query_kwargs = {'IndexName': index_name, 'KeyConditionExpression': key_condition, 'Limit': limit}
+    if cursor:
+        try:
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(cursor, keys=index_cursor_keys(index_name))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    response = await events_table.query(**query_kwargs)
+    return {
+        "items": response['Items'],
+        "next_cursor": encode_cursor(response.get('LastEvaluatedKey'))
+    }
+
+@router.get("/upcoming")
+async def get_upcoming_events(
+    start: Optional[datetime] = Query(None, alias="from", description="Earliest date, defaults to now"),
+    end: Optional[datetime] = Query(None, alias="to", description="Latest date"),
+    limit: int = Query(50, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page")
+):
+    """
+    Upcoming events in a date range, soonest first, from status-date-index.
+    """
+    try:
+        key_condition = Key('status').eq(EventStatus.UPCOMING.value) & date_key_condition(start, end)
+        return await query_event_index('status-date-index', key_condition, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/nearby")
+async def get_events_by_location(
+    location: str = Query(..., min_length=1, description="Location, matched ignoring case and punctuation"),
+    start: Optional[datetime] = Query(None, alias="from", description="Earliest date, defaults to now"),
+    end: Optional[datetime] = Query(None, alias="to", description="Latest date"),
+    limit: int = Query(50, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page")
+):
+    """
+    Events at a location, soonest first, from location-index.
+    """
+    key = location_key(location)
+    if not key:
+        raise HTTPException(status_code=400, detail="Location has no searchable words")
+    try:
+        key_condition = Key('location_key').eq(key) & date_key_condition(start, end)
+        return await query_event_index('location-index', key_condition, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search")
+async def search_events(
+    q: str = Query(..., min_length=1, description="Words that must all appear in the title or description"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    try:
+        await search_index.ensure_fresh()
+        return {"items": search_index.search(q, limit)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search/stats")
+async def get_search_stats(user=Depends(organizer_dependency)):
+    return search_index.stats()
+
 @router.post("/{event_id}/register-request")
 async def create_registration_request(
     event_id: str,
     registration_data: RegistrationRequest,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
+    request_id = str(uuid4())
+    request_data = {
+        "id": request_id,
+        "event_id": event_id,
+        "user_id": current_user['id'],
+        "status": RegistrationStatus.APPROVED,
+        "created_at": datetime.now().isoformat(),
+        **registration_data.model_dump()
+    }
+
     try:
-        # First check if the event exists
-        event = events_table.get_item(Key={'id': event_id})
-        if 'Item' not in event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        
-        event_data = event['Item']
-        
-        # Check if user is already registered
-        participants = event_data.get('participants', [])
-        if current_user['id'] in participants:
-            raise HTTPException(status_code=400, detail="Already registered for this event")
-            
-        # Check if event is full
-        if len(participants) >= event_data['max_participants']:
-            raise HTTPException(status_code=400, detail="Event is full")
-
-        request_id = str(uuid4())
-        request_data = {
-            "id": request_id,
-            "event_id": event_id,
-            "user_id": current_user['id'],
-            "status": RegistrationStatus.APPROVED,
-            "created_at": datetime.now().isoformat(),
-            **registration_data.model_dump()
-        }
+        if admission_enabled():
+            # Seats are granted by the admission worker, in arrival order
+            return await queue_registration_request(request_data)
+
+        # Claim the seat first
+        outcome, _ = await claim_seat(event_id, current_user['id'])
+        raise_for_seat_outcome(outcome)
             
-        # Create registration request
-        registration_requests_table.put_item(Item=request_data)
-        
-        # Add user to event participants
-        events_table.update_item(
-            Key={'id': event_id},
-            UpdateExpression="SET participants = list_append(if_not_exists(participants, :empty_list), :user)",
-            ExpressionAttributeValues={
-                ':user': [current_user['id']],
-                ':empty_list': []
-            }
-        )
+        # Create registration request, giving the seat back if that fails.
+        # The event details for the email are read alongside it.
+        try:
+            _, event_data = await asyncio.gather(
+                registration_requests_table.put_item(Item=request_data),
+                get_event_item(event_id)
+            )
+        except Exception:
+            await release_seat(event_id, current_user['id'])
+            raise
+
+        try:
+            await record_registration(request_data)
+        except Exception as e:
+            report_aggregate_error(event_id, e)
 
         # Send confirmation email
+        # Queued for the notification dispatcher, the request does not wait on SNS
         await send_registration_confirmation(
             email=registration_data.email,
             event_data=event_data,
             registration_data=request_data
         )
+        if running_in_lambda():
+            background_tasks.add_task(notification_outbox.flush)
         
         return {"message": "Registration request submitted successfully", "request_id": request_id}
             
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error creating registration request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create registration request: {str(e)}")
 
+async def queue_registration_request(request_data: dict):
+    if await get_event_item(request_data['event_id']) is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    request_data = {**request_data, "status": RegistrationStatus.QUEUED}
+    await registration_requests_table.put_item(Item=request_data)
+    try:
+        await enqueue_registration(request_data)
+    except Exception:
+        await registration_requests_table.delete_item(Key={'id': request_data['id']})
+        raise
+
+    try:
+        await record_registration(request_data)
+    except Exception as e:
+        report_aggregate_error(request_data['event_id'], e)
+
+    return FastJSONResponse(status_code=202, content={
+        "message": "Registration request queued",
+        "request_id": request_data['id'],
+        "status": RegistrationStatus.QUEUED.value,
+        "status_url": f"/events/registration-requests/{request_data['id']}/status"
+    })
+
 @router.get("/registration-requests")
-async def get_registration_requests(request: Request):
+async def get_registration_requests(
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
     """
     Get all registration requests regardless of status.
     """
+    projection = fields_projection(fields, REGISTRATION_FIELDS)
     try:
-        # Simple scan without any filters
-        response = registration_requests_table.scan()
-        return JSONResponse(content=response.get('Items', []))
+        # Simple scan without any filters, following every page
+        items = await run_io(collect_pages, registration_requests_table.sync, **projection)
+        return FastJSONResponse(content=items)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_registration_requests: {str(e)}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={"detail": str(e)}
         )
 
+@router.get("/{event_id}/registration-requests")
+async def get_event_registration_requests(
+    event_id: str,
+    status: Optional[RegistrationStatus] = Query(None, description="Only requests with this status"),
+    limit: int = Query(50, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    user=Depends(organizer_dependency)
+):
+    """
+    One event's registration requests from event-status-index, a page at a time,
+    with the event's per-status counts from the precomputed aggregates.
+    Only the event's own organizer may read them.
+    """
+    await get_own_event(event_id, user)
+    key_condition = Key('event_id').eq(event_id)
+    if status is not None:
+        key_condition &= Key('status').eq(status.value)
+    query_kwargs = {
+        'IndexName': 'event-status-index',
+        'KeyConditionExpression': key_condition,
+        'Limit': limit,
+        **fields_projection(fields, REGISTRATION_FIELDS)
+    }
+    if cursor:
+        try:
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(cursor, keys=('id', 'event_id', 'status'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        response, aggregates = await asyncio.gather(
+            registration_requests_table.query(**query_kwargs),
+            get_aggregates(event_id)
+        )
+        status_counts = aggregates['status_distribution']
+        return {
+            "items": response['Items'],
+            "next_cursor": encode_cursor(response.get('LastEvaluatedKey')),
+            "count": status_counts.get(status.value, 0) if status else aggregates['total_registrations'],
+            "status_counts": status_counts
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def iter_csv(pages, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for items in pages:
+        writer.writerows(items)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+@router.get("/registration-requests/export")
+async def export_registration_requests(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    segments: int = Query(SCAN_SEGMENTS, ge=1, le=64, description="Parallel scan segments"),
+    max_read_capacity: float = Query(
+        SCAN_READ_CAPACITY_PER_SECOND, ge=0,
+        description="Cap on read capacity units per second, 0 to only yield to interactive traffic"
+    ),
+    user=Depends(organizer_dependency)
+):
+    """
+    Stream every registration request using a parallel scan.
+    """
+    pages = parallel_scan(
+        registration_requests_table.sync,
+        total_segments=segments,
+        read_capacity_per_second=max_read_capacity
+    )
+    if format == ExportFormat.CSV:
+        return StreamingResponse(
+            iter_csv(pages, REGISTRATION_EXPORT_COLUMNS),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=registration-requests.csv"}
+        )
+    return StreamingResponse(iter_ndjson(pages), media_type="application/x-ndjson")
+
+@router.put("/registration-requests/bulk-status")
+async def bulk_update_registration_status(
+    update: BulkStatusUpdate,
+    user=Depends(organizer_dependency)
+):
+    """
+    Approve or reject many registration requests at once. Requests are read
+    with BatchGetItem and each event is written once per transaction chunk.
+    """
+    request_ids = list(dict.fromkeys(update.request_ids))
+    if not request_ids:
+        raise HTTPException(status_code=400, detail="No request ids given")
+    if len(request_ids) > BULK_STATUS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_STATUS_MAX_IDS} request ids per call")
+
+    try:
+        requests = await batch_get_items(
+            registration_requests_table.name, [{'id': request_id} for request_id in request_ids]
+        )
+        by_event = defaultdict(list)
+        for request in requests:
+            by_event[request['event_id']].append(request)
+
+        outcomes = {}
+        for event_outcomes in await asyncio.gather(*(
+            bulk_update_event_status(event_id, event_requests, update.status)
+            for event_id, event_requests in by_event.items()
+        )):
+            outcomes.update(event_outcomes)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for event_id, event_requests in by_event.items():
+        deltas = defaultdict(int)
+        for request in event_requests:
+            if outcomes.get(request['id']) == BulkOutcome.UPDATED:
+                deltas[f"status#{request['status']}"] -= 1
+                deltas[f"status#{update.status.value}"] += 1
+        if update.status != RegistrationStatus.APPROVED and deltas[f"status#{RegistrationStatus.APPROVED.value}"] < 0:
+            # Released seats go to the waitlist
+            await request_promotion(event_id)
+        try:
+            await apply_deltas(event_id, deltas)
+        except Exception as e:
+            report_aggregate_error(event_id, e)
+
+    results = [
+        {"id": request_id, "outcome": outcomes.get(request_id, BulkOutcome.NOT_FOUND)}
+        for request_id in request_ids
+    ]
+    summary = defaultdict(int)
+    for result in results:
+        summary[result['outcome'].value] += 1
+    return {"status": update.status, "summary": dict(summary), "results": results}
+
 @router.put("/registration-requests/{request_id}")
 async def update_registration_status(
     request_id: str,
     status: RegistrationStatus,
-    user=Depends(require_role("organizer"))
+    user=Depends(organizer_dependency)
 ):
     try:
-        # Update the registration request status
-        registration_requests_table.update_item(
-            Key={'id': request_id},
-            UpdateExpression="SET #status = :status",
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={':status': status}
-        )
-        
-        # If approved, add to event participants
-        if status == RegistrationStatus.APPROVED:
-            request = registration_requests_table.get_item(Key={'id': request_id})['Item']
-            events_table.update_item(
-                Key={'id': request['event_id']},
-                UpdateExpression="SET participants = list_append(if_not_exists(participants, :empty_list), :user)",
-                ExpressionAttributeValues={
-                    ':user': [request['user_id']],
-                    ':empty_list': []
-                }
-            )
+        request = (await registration_requests_table.get_item(Key={'id': request_id})).get('Item')
+        if not request:
+            raise HTTPException(status_code=404, detail="Registration request not found")
+
+        # Same path as bulk-status: the seat is claimed or released in the
+        # transaction that changes the status, guarded on the status read here
+        outcome = (await bulk_update_event_status(request['event_id'], [request], status))[request_id]
+        raise_for_bulk_outcome(outcome)
+        if outcome == BulkOutcome.UNCHANGED:
+            return {"message": f"Registration request {status}"}
+
+        # Moving away from approved frees the seat
+        if status != RegistrationStatus.APPROVED and request.get('status') == RegistrationStatus.APPROVED:
+            await request_promotion(request['event_id'])
+
+        try:
+            await record_status_change(request, request['status'], status)
+        except Exception as e:
+            report_aggregate_error(request['event_id'], e)
         
         return {"message": f"Registration request {status}"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+async def get_own_registration_request(request_id: str, current_user: dict) -> dict:
+    request = (await registration_requests_table.get_item(Key={'id': request_id})).get('Item')
+    if not request or request['user_id'] != current_user['id']:
+        raise HTTPException(status_code=404, detail="Registration request not found")
+    return request
+
+@router.get("/registration-requests/{request_id}/status")
+async def get_registration_request_status(
+    request_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Poll a registration request; waitlisted requests also get their place in line.
+    """
+    try:
+        request = await get_own_registration_request(request_id, current_user)
+        result = {"request_id": request_id, "event_id": request['event_id'], "status": request['status']}
+        if request['status'] == RegistrationStatus.WAITLISTED.value:
+            result["waitlist_position"] = await waitlist_position(request)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/registration-requests/{request_id}/cancel")
+async def cancel_registration_request(
+    request_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        request = await get_own_registration_request(request_id, current_user)
+        if request['status'] not in CANCELLABLE_STATUSES:
+            raise HTTPException(status_code=409, detail=f"A {request['status']} registration cannot be cancelled")
+        if not await cancel(request):
+            raise HTTPException(status_code=409, detail="Registration request changed, try again")
+
+        try:
+            await record_status_change(request, request['status'], RegistrationStatus.CANCELLED)
+        except Exception as e:
+            report_aggregate_error(request['event_id'], e)
+
+        return {"message": "Registration cancelled", "request_id": request_id}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -287,15 +846,15 @@ async def debug_registration_requests(
 async def debug_table():
     try:
         # List all tables
-        tables = dynamodb.meta.client.list_tables()
+        tables = await run_io(get_dynamodb().meta.client.list_tables)
         print("Available tables:", tables['TableNames'])
         
         # Get table info
-        table_info = registration_requests_table.table_status
+        table_info = await run_io(lambda: registration_requests_table.sync.table_status)
         print("Table status:", table_info)
         
         # Try a simple scan
-        response = registration_requests_table.scan(Limit=1)
+        response = await registration_requests_table.scan(Limit=1)
         print("Sample scan:", response)
         
         return {
@@ -307,47 +866,16 @@ async def debug_table():
         print(f"Debug error: {str(e)}")
         return {"error": str(e)}
 
-async def send_registration_confirmation(email: str, event_data: dict, registration_data: dict):
-    try:
-        message = {
-            "email": email,
-            "subject": f"Registration Confirmation - {event_data['title']}",
-            "message": f"""
-            Dear {registration_data['full_name']},
-
-            Thank you for registering for {event_data['title']}!
-
-            Event Details:
-            - Date: {event_data['date']}
-            - Location: {event_data['location']}
-
-            We're excited to have you join us!
-
-            Best regards,
-            The Event Team
-            """
-        }
-
-        response = sns.publish(
-            TopicArn=SNS_TOPIC_ARN,
-            Message=json.dumps(message),
-            MessageStructure='string'
-        )
-        print(f"Sent confirmation email to {email}: {response['MessageId']}")
-    except Exception as e:
-        print(f"Error sending confirmation email: {str(e)}")
-
 @router.get("/analytics/registrations")
-async def get_registration_analytics(user=Depends(require_role("organizer"))):
+async def get_registration_analytics(
+    event_id: Optional[str] = Query(None, description="Limit the counts to one event"),
+    user=Depends(organizer_dependency)
+):
     try:
-        lambda_client = boto3.client('lambda')
-        response = lambda_client.invoke(
-            FunctionName='registration_analytics',
-            InvocationType='RequestResponse'
-        )
-        
-        payload = json.loads(response['Payload'].read())
-        return JSONResponse(content=payload.get('body', {}))
+        # Precomputed counters, see app/analytics.py
+        return await get_aggregates(event_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,229 @@
+"""Conditional GETs and response compression.
+
+``cached_json`` renders a payload, tags it with a strong ETag (a hash of the
+body) and answers a matching ``If-None-Match`` with an empty 304. Bodies
+rendered for a cache key are remembered while the source object is the same
+one, so repeat polls of a cached event skip serialization too.
+
+``CompressionMiddleware`` negotiates brotli (when the ``brotli`` package is
+installed) or gzip for JSON, NDJSON and text bodies above
+``COMPRESSION_MIN_BYTES``, streaming responses included.
+"""
+import os
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+from .responses import dumps
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+EVENT_CACHE_CONTROL = os.getenv('EVENT_CACHE_CONTROL', 'public, max-age=5, stale-while-revalidate=30')
+EVENT_LIST_CACHE_CONTROL = os.getenv('EVENT_LIST_CACHE_CONTROL', 'public, max-age=5, stale-while-revalidate=30')
+# Per-user data: never stored by a shared cache, always revalidated
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+RENDERED_CACHE_SIZE = int(os.getenv('RENDERED_CACHE_SIZE', '1024'))
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+# Conditional GET
+
+def render_json(content) -> bytes:
+    return dumps(content)
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+class RenderedCache:
+    """Bounded map of cache key -> (source object, body, ETag)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, key: str, content):
+        with self._lock:
+            entry = self._entries.get(key)
+            # Same object as last time: it has not been reloaded, so neither has its body
+            if entry is not None and entry[0] is content:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+        body = render_json(content)
+        etag = make_etag(body)
+        with self._lock:
+            self._entries[key] = (content, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return body, etag
+
+rendered_cache = RenderedCache(RENDERED_CACHE_SIZE)
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]  # If-None-Match uses the weak comparison
+    tag = tag.strip('"')
+    # Compressed responses carry the encoding in their ETag, see CompressionMiddleware
+    for encoding in ENCODINGS:
+        if tag.endswith('-' + encoding):
+            return tag[:-len(encoding) - 1]
+    return tag
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == wanted for tag in if_none_match.split(','))
+
+def cached_json(request: Request, content, cache_control: str, key: str = None) -> Response:
+    """JSON response with an ETag and Cache-Control, or a 304 if the client's copy is current."""
+    if key is None:
+        body = render_json(content)
+        etag = make_etag(body)
+    else:
+        body, etag = rendered_cache.render(key, content)
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        # The 304 names the representation the 200 would have carried, compressed or not
+        if request.method != 'HEAD':
+            encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+            if encoding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+                headers['ETag'] = encoded_etag(etag, encoding)
+        headers['Vary'] = 'Accept-Encoding'
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+# Compression
+
+class _GzipEncoder:
+    def __init__(self):
+        # wbits 31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk reaches the client without waiting for the next
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+ENCODINGS = {'br': _BrotliEncoder, 'gzip': _GzipEncoder} if brotli else {'gzip': _GzipEncoder}
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    # A compressed body is a different representation, so it needs its own strong ETag
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+def negotiate_encoding(accept_encoding: str):
+    """The best encoding the client accepts, brotli first, or None."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+class CompressionMiddleware:
+    """ASGI middleware compressing compressible bodies with the negotiated encoding."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # HEAD bodies are empty, so there is nothing to compress
+        encoding = None
+        if scope["method"] != "HEAD":
+            encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding'))
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+class _CompressingSend:
+    def __init__(self, send, encoding, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get('content-type', '')
+        return (
+            self.start['status'] not in (204, 304)
+            and 'content-encoding' not in headers
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _encode_headers(self, headers: MutableHeaders):
+        headers['Content-Encoding'] = self.encoding
+        etag = headers.get('etag')
+        if etag:
+            headers['ETag'] = encoded_etag(etag, self.encoding)
+
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            self.start = message
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            return await self.send(message)
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if self.encoder is None:
+            headers = MutableHeaders(raw=self.start['headers'])
+            if not self._compressible(headers):
+                self.passthrough = True
+                await self.send(self.start)
+                return await self.send(message)
+            headers.add_vary_header('Accept-Encoding')
+            if self.encoding is None or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(self.start)
+                return await self.send(message)
+
+            self.encoder = ENCODINGS[self.encoding]()
+            self._encode_headers(headers)
+            if not more_body:
+                body = self.encoder.finish(body)
+                headers['Content-Length'] = str(len(body))
+                await self.send(self.start)
+                return await self.send({'type': 'http.response.body', 'body': body})
+            del headers['Content-Length']
+            await self.send(self.start)
+
+        body = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
@@ -0,0 +1,1071 @@
+"""In-memory stand-ins for the AWS services the app uses.
+
+Selected with ``AWS_BACKEND=local`` (see ``app/db.py``). They cover the
+DynamoDB table operations the routers call (expressions included), S3
+uploads and presigning, SNS publishing, SQS queues and the Cognito auth calls, so the
+app can be run, tested and benchmarked without a network. Every call can
+be given a fixed, optionally jittered latency to model a real round trip:
+
+    LOCAL_BACKEND_LATENCY_MS=5 LOCAL_BACKEND_LATENCY_JITTER_MS=2 LOCAL_BACKEND_SEED=1
+"""
+import io
+import os
+import re
+import copy
+import json
+import time
+import zlib
+import random
+import threading
+from enum import Enum
+from uuid import uuid4
+from decimal import Decimal
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from .models.models import (
+    EVENTS_TABLE, REGISTRATION_REQUESTS_TABLE, EVENT_PARTICIPANTS_TABLE, REGISTRATION_AGGREGATES_TABLE,
+    REGISTRATION_COUNTERS_TABLE, EVENT_WAITLIST_TABLE
+)
+
+LOCAL_BACKEND_LATENCY_MS = float(os.getenv('LOCAL_BACKEND_LATENCY_MS', '0'))
+LOCAL_BACKEND_LATENCY_JITTER_MS = float(os.getenv('LOCAL_BACKEND_LATENCY_JITTER_MS', '0'))
+LOCAL_BACKEND_SEED = int(os.getenv('LOCAL_BACKEND_SEED', '0'))
+
+# Like DynamoDB, a scan or query page stops after about 1 MB of items
+PAGE_SIZE_BYTES = 1024 * 1024
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+_MISSING = object()
+
+def _client_error(operation: str, code: str, message: str, **extra) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}, **extra}, operation)
+
+def _to_dynamo(value):
+    """Normalise Python values the way DynamoDB stores them (numbers as Decimal)."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, Enum):
+        # str() of a str enum is "Class.MEMBER" from Python 3.11 on
+        return _to_dynamo(value.value)
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {key: _to_dynamo(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamo(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return {_to_dynamo(item) for item in value}
+    return value
+
+def _item_size(item: dict) -> int:
+    return len(json.dumps(item, default=str))
+
+def _capacity_units(item_or_size, per_unit: int, factor: float = 1.0) -> float:
+    size = item_or_size if isinstance(item_or_size, int) else _item_size(item_or_size or {})
+    return max(1, -(-size // per_unit)) * factor
+
+# Expressions
+
+_TOKEN_RE = re.compile(r"\s*(?:(<>|<=|>=|=|<|>|\(|\)|,|\.|\[|\]|\+|-)|([#:]?[A-Za-z0-9_]+))")
+_FUNCTIONS = {"attribute_exists", "attribute_not_exists", "attribute_type", "begins_with", "contains", "size",
+              "if_not_exists", "list_append"}
+
+def _tokenize(expression: str):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN_RE.match(expression, position)
+        if not match or match.end() == position:
+            raise _client_error("Expression", "ValidationException", f"Invalid expression near: {expression[position:]}")
+        tokens.append(match.group(1) or match.group(2))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    def __init__(self, expression: str, names: dict, values: dict):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset: int = 0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def keyword(self, word: str) -> bool:
+        token = self.peek()
+        if token is not None and token.upper() == word:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, token: str):
+        if self.peek() != token:
+            raise _client_error("Expression", "ValidationException", f"Expected {token!r}, got {self.peek()!r}")
+        self.position += 1
+
+    def done(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    # Paths and operands
+
+    def path(self):
+        elements = [self._name(self.next())]
+        while self.peek() in (".", "["):
+            if self.next() == ".":
+                elements.append(self._name(self.next()))
+            else:
+                elements.append(int(self.next()))
+                self.expect("]")
+        return ("path", elements)
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise _client_error("Expression", "ValidationException", "Unexpected end of expression")
+        self.position += 1
+        return token
+
+    def _name(self, token: str) -> str:
+        if token.startswith("#"):
+            if token not in self.names:
+                raise _client_error("Expression", "ValidationException", f"Undefined attribute name {token}")
+            return self.names[token]
+        return token
+
+    def operand(self):
+        token = self.peek()
+        if token.startswith(":"):
+            self.position += 1
+            if token not in self.values:
+                raise _client_error("Expression", "ValidationException", f"Undefined attribute value {token}")
+            return ("value", self.values[token])
+        if token.lower() in _FUNCTIONS and self.peek(1) == "(":
+            self.position += 2
+            name = token.lower()
+            args = [self.operand()]
+            while self.peek() == ",":
+                self.position += 1
+                args.append(self.operand())
+            self.expect(")")
+            return ("call", name, args)
+        return self.path()
+
+    def value_expression(self):
+        left = self.operand()
+        if self.peek() in ("+", "-"):
+            operator = self.next()
+            return ("arith", operator, left, self.operand())
+        return left
+
+    # Conditions
+
+    def condition(self):
+        node = self._and()
+        while self.keyword("OR"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self.keyword("AND"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self.keyword("NOT"):
+            return ("not", self._not())
+        return self._primary()
+
+    def _primary(self):
+        if self.peek() == "(":
+            self.position += 1
+            node = self.condition()
+            self.expect(")")
+            return node
+        left = self.operand()
+        if left[0] == "call" and left[1] != "size":
+            return left
+        token = self.peek()
+        if token in ("=", "<>", "<", "<=", ">", ">="):
+            self.position += 1
+            return ("compare", token, left, self.operand())
+        if self.keyword("BETWEEN"):
+            low = self.operand()
+            if not self.keyword("AND"):
+                raise _client_error("Expression", "ValidationException", "BETWEEN needs AND")
+            return ("between", left, low, self.operand())
+        if self.keyword("IN"):
+            self.expect("(")
+            options = [self.operand()]
+            while self.peek() == ",":
+                self.position += 1
+                options.append(self.operand())
+            self.expect(")")
+            return ("in", left, options)
+        raise _client_error("Expression", "ValidationException", f"Invalid condition near {token!r}")
+
+def _resolve(item: dict, elements: list):
+    current = item
+    for element in elements:
+        if isinstance(element, int):
+            if not isinstance(current, list) or element >= len(current):
+                return _MISSING
+            current = current[element]
+        else:
+            if not isinstance(current, dict) or element not in current:
+                return _MISSING
+            current = current[element]
+    return current
+
+def _evaluate(node, item: dict):
+    kind = node[0]
+    if kind == "value":
+        return _to_dynamo(node[1])
+    if kind == "path":
+        return _resolve(item, node[1])
+    if kind == "arith":
+        left, right = _evaluate(node[2], item), _evaluate(node[3], item)
+        if not isinstance(left, Decimal) or not isinstance(right, Decimal):
+            raise _client_error("UpdateItem", "ValidationException", "Arithmetic on a non-number operand")
+        return left + right if node[1] == "+" else left - right
+    if kind == "call":
+        return _call(node[1], node[2], item)
+    if kind == "and":
+        return _evaluate(node[1], item) and _evaluate(node[2], item)
+    if kind == "or":
+        return _evaluate(node[1], item) or _evaluate(node[2], item)
+    if kind == "not":
+        return not _evaluate(node[1], item)
+    if kind == "compare":
+        return _compare(node[1], _evaluate(node[2], item), _evaluate(node[3], item))
+    if kind == "between":
+        value = _evaluate(node[1], item)
+        return _compare(">=", value, _evaluate(node[2], item)) and _compare("<=", value, _evaluate(node[3], item))
+    if kind == "in":
+        value = _evaluate(node[1], item)
+        return any(_compare("=", value, _evaluate(option, item)) for option in node[2])
+    raise ValueError(f"Unknown expression node {kind}")
+
+def _compare(operator: str, left, right) -> bool:
+    if left is _MISSING or right is _MISSING:
+        return operator == "<>" and not (left is _MISSING and right is _MISSING)
+    if operator == "=":
+        return left == right
+    if operator == "<>":
+        return left != right
+    if type(left) is not type(right) and not (isinstance(left, Decimal) and isinstance(right, Decimal)):
+        return False
+    try:
+        return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[operator]
+    except TypeError:
+        return False
+
+_TYPE_NAMES = {str: "S", Decimal: "N", bytes: "B", bool: "BOOL", dict: "M", list: "L", type(None): "NULL"}
+
+def _call(name: str, args: list, item: dict):
+    if name == "attribute_exists":
+        return _evaluate(args[0], item) is not _MISSING
+    if name == "attribute_not_exists":
+        return _evaluate(args[0], item) is _MISSING
+    if name == "attribute_type":
+        value = _evaluate(args[0], item)
+        if isinstance(value, set):
+            sample = next(iter(value), "")
+            return _evaluate(args[1], item) == ("NS" if isinstance(sample, Decimal) else "SS")
+        return _TYPE_NAMES.get(type(value)) == _evaluate(args[1], item)
+    if name == "begins_with":
+        value, prefix = _evaluate(args[0], item), _evaluate(args[1], item)
+        return isinstance(value, str) and isinstance(prefix, str) and value.startswith(prefix)
+    if name == "contains":
+        value, member = _evaluate(args[0], item), _evaluate(args[1], item)
+        if isinstance(value, str):
+            return isinstance(member, str) and member in value
+        if isinstance(value, (set, list)):
+            return member in value
+        return False
+    if name == "size":
+        value = _evaluate(args[0], item)
+        return _MISSING if value is _MISSING else Decimal(len(value))
+    if name == "if_not_exists":
+        value = _evaluate(args[0], item)
+        return _evaluate(args[1], item) if value is _MISSING else value
+    if name == "list_append":
+        left, right = _evaluate(args[0], item), _evaluate(args[1], item)
+        return list(left) + list(right)
+    raise _client_error("Expression", "ValidationException", f"Unsupported function {name}")
+
+def _normalise_condition(expression, names: dict, values: dict, is_key_condition: bool = False):
+    """Accept either a string expression or a boto3 ``Key``/``Attr`` condition object."""
+    if isinstance(expression, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(expression, is_key_condition=is_key_condition)
+        names = dict(names or {}, **built.attribute_name_placeholders)
+        values = dict(values or {}, **built.attribute_value_placeholders)
+        expression = built.condition_expression
+    return expression, names or {}, values or {}
+
+def evaluate_condition(expression, item: dict, names: dict = None, values: dict = None,
+                       is_key_condition: bool = False) -> bool:
+    if not expression:
+        return True
+    expression, names, values = _normalise_condition(expression, names, values, is_key_condition)
+    parser = _Parser(expression, names, values)
+    node = parser.condition()
+    if not parser.done():
+        raise _client_error("Expression", "ValidationException", f"Unexpected token {parser.peek()!r}")
+    return bool(_evaluate(node, item or {}))
+
+def _assign(item: dict, elements: list, value):
+    target = item
+    for element in elements[:-1]:
+        target = target[element]
+    target[elements[-1]] = value
+
+def _remove(item: dict, elements: list):
+    target = _resolve(item, elements[:-1]) if len(elements) > 1 else item
+    if target is _MISSING:
+        return
+    if isinstance(target, dict):
+        target.pop(elements[-1], None)
+    elif isinstance(target, list) and elements[-1] < len(target):
+        del target[elements[-1]]
+
+def apply_update(expression: str, item: dict, names: dict = None, values: dict = None):
+    """Apply an UpdateExpression to a copy of ``item``; returns ``(new item, updated top-level names)``."""
+    parser = _Parser(expression, names or {}, values or {})
+    original = item
+    item = copy.deepcopy(item)
+    updated = set()
+    while not parser.done():
+        clause = parser.next().upper()
+        while True:
+            path = parser.path()
+            elements = path[1]
+            updated.add(elements[0])
+            if clause == "SET":
+                parser.expect("=")
+                _assign(item, elements, _evaluate(parser.value_expression(), original))
+            elif clause == "REMOVE":
+                _remove(item, elements)
+            elif clause in ("ADD", "DELETE"):
+                operand = _evaluate(parser.operand(), original)
+                current = _resolve(item, elements)
+                if clause == "ADD":
+                    if isinstance(operand, Decimal):
+                        _assign(item, elements, (Decimal(0) if current is _MISSING else current) + operand)
+                    elif isinstance(operand, set):
+                        _assign(item, elements, (set() if current is _MISSING else set(current)) | operand)
+                    else:
+                        raise _client_error("UpdateItem", "ValidationException", "ADD needs a number or a set")
+                else:
+                    if current is not _MISSING:
+                        remaining = set(current) - operand
+                        if remaining:
+                            _assign(item, elements, remaining)
+                        else:
+                            _remove(item, elements)
+            else:
+                raise _client_error("UpdateItem", "ValidationException", f"Unknown update clause {clause}")
+            if parser.peek() != ",":
+                break
+            parser.position += 1
+    return item, updated
+
+def project(item: dict, expression, names: dict = None) -> dict:
+    if not expression:
+        return item
+    attributes = [_Parser(part, names or {}, {}).path()[1][0] for part in expression.split(",")]
+    return {name: item[name] for name in attributes if name in item}
+
+# DynamoDB
+
+class LocalTableSchema:
+    def __init__(self, definition: dict):
+        self.definition = definition
+        self.name = definition['TableName']
+        self.hash_key, self.range_key = self._keys(definition['KeySchema'])
+        self.indexes = {
+            index['IndexName']: self._keys(index['KeySchema'])
+            for index in definition.get('GlobalSecondaryIndexes', []) + definition.get('LocalSecondaryIndexes', [])
+        }
+
+    @staticmethod
+    def _keys(key_schema):
+        hash_key = next(key['AttributeName'] for key in key_schema if key['KeyType'] == 'HASH')
+        range_key = next((key['AttributeName'] for key in key_schema if key['KeyType'] == 'RANGE'), None)
+        return hash_key, range_key
+
+    def key_names(self):
+        return [self.hash_key] + ([self.range_key] if self.range_key else [])
+
+    def key_of(self, item: dict) -> tuple:
+        return tuple(item.get(name) for name in self.key_names())
+
+def _default_schemas():
+    events_definition = {**EVENTS_TABLE, 'TableName': os.getenv('DYNAMODB_EVENTS_TABLE', EVENTS_TABLE['TableName'])}
+    definitions = [events_definition, REGISTRATION_REQUESTS_TABLE, EVENT_PARTICIPANTS_TABLE,
+                   REGISTRATION_AGGREGATES_TABLE, REGISTRATION_COUNTERS_TABLE, EVENT_WAITLIST_TABLE]
+    return {definition['TableName']: LocalTableSchema(definition) for definition in definitions}
+
+class _BatchWriter:
+    def __init__(self, table, overwrite_by_pkeys=None):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def put_item(self, Item):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key):
+        self.table.delete_item(Key=Key)
+
+class LocalTable:
+    """Mirrors the subset of ``boto3`` ``Table`` used by the app."""
+
+    table_status = "ACTIVE"
+
+    def __init__(self, backend, schema: LocalTableSchema):
+        self._backend = backend
+        self.schema = schema
+        self.name = schema.name
+        self.items = {}
+
+    def wait_until_exists(self):
+        return None
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self, overwrite_by_pkeys)
+
+    def _key(self, key: dict, operation: str) -> tuple:
+        names = self.schema.key_names()
+        if set(key) != set(names):
+            raise _client_error(operation, "ValidationException", "The provided key element does not match the schema")
+        return tuple(_to_dynamo(key[name]) for name in names)
+
+    def _capacity(self, kwargs, units):
+        if kwargs.get('ReturnConsumedCapacity', 'NONE') != 'NONE':
+            return {'ConsumedCapacity': {'TableName': self.name, 'CapacityUnits': units}}
+        return {}
+
+    def _check(self, operation, kwargs, existing):
+        condition = kwargs.get('ConditionExpression')
+        if condition and not evaluate_condition(
+            condition, existing or {}, kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues')
+        ):
+            extra = {}
+            if kwargs.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and existing:
+                extra['Item'] = {name: _serializer.serialize(value) for name, value in existing.items()}
+            raise _client_error(operation, "ConditionalCheckFailedException", "The conditional request failed", **extra)
+
+    def get_item(self, **kwargs):
+        with self._backend.call("GetItem"):
+            item = self.items.get(self._key(kwargs['Key'], "GetItem"))
+            factor = 1.0 if kwargs.get('ConsistentRead') else 0.5
+            response = self._capacity(kwargs, _capacity_units(item, 4096, factor))
+            if item is not None:
+                response['Item'] = project(copy.deepcopy(item), kwargs.get('ProjectionExpression'),
+                                           kwargs.get('ExpressionAttributeNames'))
+            return response
+
+    def put_item(self, **kwargs):
+        with self._backend.call("PutItem"):
+            item = _to_dynamo(kwargs['Item'])
+            key = self._key({name: item.get(name) for name in self.schema.key_names()}, "PutItem")
+            existing = self.items.get(key)
+            self._check("PutItem", kwargs, existing)
+            self.items[key] = item
+            response = self._capacity(kwargs, _capacity_units(item, 1024))
+            if kwargs.get('ReturnValues') == 'ALL_OLD' and existing:
+                response['Attributes'] = copy.deepcopy(existing)
+            return response
+
+    def update_item(self, **kwargs):
+        with self._backend.call("UpdateItem"):
+            key = self._key(kwargs['Key'], "UpdateItem")
+            existing = self.items.get(key)
+            self._check("UpdateItem", kwargs, existing)
+            base = existing or {name: value for name, value in zip(self.schema.key_names(), key)}
+            updated, touched = apply_update(
+                kwargs['UpdateExpression'], base,
+                kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues')
+            )
+            self.items[key] = updated
+            response = self._capacity(kwargs, _capacity_units(updated, 1024))
+            return_values = kwargs.get('ReturnValues', 'NONE')
+            if return_values == 'ALL_NEW':
+                response['Attributes'] = copy.deepcopy(updated)
+            elif return_values == 'ALL_OLD' and existing:
+                response['Attributes'] = copy.deepcopy(existing)
+            elif return_values == 'UPDATED_NEW':
+                response['Attributes'] = {name: copy.deepcopy(updated[name]) for name in touched if name in updated}
+            elif return_values == 'UPDATED_OLD' and existing:
+                response['Attributes'] = {name: copy.deepcopy(existing[name]) for name in touched if name in existing}
+            return response
+
+    def delete_item(self, **kwargs):
+        with self._backend.call("DeleteItem"):
+            key = self._key(kwargs['Key'], "DeleteItem")
+            existing = self.items.get(key)
+            self._check("DeleteItem", kwargs, existing)
+            self.items.pop(key, None)
+            response = self._capacity(kwargs, _capacity_units(existing, 1024))
+            if kwargs.get('ReturnValues') == 'ALL_OLD' and existing:
+                response['Attributes'] = copy.deepcopy(existing)
+            return response
+
+    def _scan_order(self, item: dict) -> tuple:
+        # Items are spread over segments by a hash of their key, like partitions
+        table_key = repr(self.schema.key_of(item))
+        return (zlib.crc32(table_key.encode()), table_key)
+
+    def _query_order(self, item: dict, range_key) -> tuple:
+        return (item.get(range_key, "") if range_key else "", repr(self.schema.key_of(item)))
+
+    def _page(self, entries, kwargs, key_names, order, forward: bool = True):
+        """Apply the start key, Limit, the 1 MB page cap, the filter and projection to ``(order, item)`` pairs."""
+        entries.sort(key=lambda entry: entry[0], reverse=not forward)
+        start = kwargs.get('ExclusiveStartKey')
+        if start:
+            position = order(_to_dynamo(start))
+            entries = [entry for entry in entries if (entry[0] > position if forward else entry[0] < position)]
+
+        names = kwargs.get('ExpressionAttributeNames')
+        values = kwargs.get('ExpressionAttributeValues')
+        limit = kwargs.get('Limit')
+        evaluated = []
+        size = 0
+        last_key = None
+        for _, item in entries:
+            evaluated.append(item)
+            size += _item_size(item)
+            if (limit and len(evaluated) >= limit) or size >= PAGE_SIZE_BYTES:
+                if len(evaluated) < len(entries):
+                    last_key = {name: copy.deepcopy(item[name]) for name in key_names if name in item}
+                break
+
+        matched = [
+            item for item in evaluated
+            if evaluate_condition(kwargs.get('FilterExpression'), item, names, values)
+        ]
+        factor = 1.0 if kwargs.get('ConsistentRead') else 0.5
+        response = {'Count': len(matched), 'ScannedCount': len(evaluated)}
+        response.update(self._capacity(kwargs, _capacity_units(size, 4096, factor)))
+        if kwargs.get('Select') != 'COUNT':
+            projection = kwargs.get('ProjectionExpression')
+            response['Items'] = [project(copy.deepcopy(item), projection, names) for item in matched]
+        if last_key:
+            response['LastEvaluatedKey'] = last_key
+        return response
+
+    def _with_expressions(self, kwargs: dict, field: str, is_key_condition: bool = False) -> dict:
+        """Render a boto3 condition object in ``kwargs[field]`` into expression strings."""
+        expression, names, values = _normalise_condition(
+            kwargs.get(field), kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues'),
+            is_key_condition
+        )
+        return dict(kwargs, **{field: expression, 'ExpressionAttributeNames': names, 'ExpressionAttributeValues': values})
+
+    def scan(self, **kwargs):
+        with self._backend.call("Scan"):
+            if kwargs.get('FilterExpression') is not None:
+                kwargs = self._with_expressions(kwargs, 'FilterExpression')
+            total = kwargs.get('TotalSegments')
+            segment = kwargs.get('Segment')
+            entries = []
+            for item in self.items.values():
+                order = self._scan_order(item)
+                if not total or order[0] % total == segment:
+                    entries.append((order, item))
+            return self._page(entries, kwargs, self.schema.key_names(), self._scan_order)
+
+    def query(self, **kwargs):
+        with self._backend.call("Query"):
+            index_name = kwargs.get('IndexName')
+            if index_name:
+                if index_name not in self.schema.indexes:
+                    raise _client_error("Query", "ValidationException",
+                                        f"The table does not have the specified index: {index_name}")
+                hash_key, range_key = self.schema.indexes[index_name]
+            else:
+                hash_key, range_key = self.schema.hash_key, self.schema.range_key
+
+            kwargs = self._with_expressions(kwargs, 'KeyConditionExpression', is_key_condition=True)
+            if kwargs.get('FilterExpression') is not None:
+                kwargs = self._with_expressions(kwargs, 'FilterExpression')
+            names, values = kwargs['ExpressionAttributeNames'], kwargs['ExpressionAttributeValues']
+
+            entries = []
+            for item in self.items.values():
+                if hash_key not in item or (range_key and range_key not in item):
+                    continue  # Not projected into a sparse index
+                if evaluate_condition(kwargs['KeyConditionExpression'], item, names, values):
+                    entries.append((self._query_order(item, range_key), item))
+
+            key_names = list(dict.fromkeys([hash_key, range_key] + self.schema.key_names()))
+            return self._page(
+                entries, kwargs, [name for name in key_names if name],
+                lambda item: self._query_order(item, range_key), kwargs.get('ScanIndexForward', True)
+            )
+
+class LocalDynamoDBClient:
+    """The low-level client reachable as ``resource.meta.client``."""
+
+    def __init__(self, resource):
+        self._resource = resource
+
+    def list_tables(self, **kwargs):
+        with self._resource.backend.call("ListTables"):
+            return {'TableNames': sorted(self._resource.tables)}
+
+    def describe_table(self, TableName, **kwargs):
+        with self._resource.backend.call("DescribeTable"):
+            table = self._resource.tables.get(TableName)
+            if table is None:
+                raise _client_error("DescribeTable", "ResourceNotFoundException", f"Table {TableName} not found")
+            definition = table.schema.definition
+            if 'ProvisionedThroughput' not in definition:
+                return {'Table': {'TableName': TableName, 'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}}
+            return {'Table': {'TableName': TableName, 'ProvisionedThroughput': dict(definition['ProvisionedThroughput'])}}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        backend = self._resource.backend
+        with backend.call("TransactWriteItems"):
+            operations = []
+            seen = set()
+            for entry in TransactItems:
+                (kind, request), = entry.items()
+                table = self._resource.Table(request['TableName'])
+                request = dict(request)
+                for field in ('Key', 'Item', 'ExpressionAttributeValues'):
+                    if field in request:
+                        request[field] = {name: _deserializer.deserialize(value) for name, value in request[field].items()}
+                source = request.get('Key') or {name: request['Item'].get(name) for name in table.schema.key_names()}
+                key = table._key(source, "TransactWriteItems")
+                if (table.name, key) in seen:
+                    raise _client_error("TransactWriteItems", "ValidationException",
+                                        "Transaction request cannot include multiple operations on one item")
+                seen.add((table.name, key))
+                operations.append((kind, table, key, request))
+
+            reasons = []
+            for kind, table, key, request in operations:
+                existing = table.items.get(key)
+                try:
+                    table._check("TransactWriteItems", request, existing)
+                    reasons.append({'Code': 'None'})
+                except ClientError as e:
+                    reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                    if 'Item' in e.response:
+                        reason['Item'] = e.response['Item']
+                    reasons.append(reason)
+            if any(reason['Code'] != 'None' for reason in reasons):
+                raise _client_error(
+                    "TransactWriteItems", "TransactionCanceledException",
+                    "Transaction cancelled, please refer cancellation reasons for specific reasons "
+                    f"[{', '.join(reason['Code'] for reason in reasons)}]",
+                    CancellationReasons=reasons
+                )
+
+            for kind, table, key, request in operations:
+                if kind == 'Put':
+                    table.items[key] = _to_dynamo(request['Item'])
+                elif kind == 'Delete':
+                    table.items.pop(key, None)
+                elif kind == 'Update':
+                    base = table.items.get(key) or dict(zip(table.schema.key_names(), key))
+                    table.items[key], _ = apply_update(
+                        request['UpdateExpression'], base,
+                        request.get('ExpressionAttributeNames'), request.get('ExpressionAttributeValues')
+                    )
+            return {}
+
+class _ResourceMeta:
+    def __init__(self, client):
+        self.client = client
+
+class LocalDynamoDB:
+    """Mirrors the subset of the ``boto3`` DynamoDB service resource used by the app."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.tables = {}
+        for name, schema in _default_schemas().items():
+            self.tables[name] = LocalTable(backend, schema)
+        self.meta = _ResourceMeta(LocalDynamoDBClient(self))
+
+    def Table(self, name: str) -> LocalTable:
+        table = self.tables.get(name)
+        if table is None:
+            # Unknown tables get a plain "id" hash key
+            schema = LocalTableSchema({'TableName': name, 'KeySchema': [{'AttributeName': 'id', 'KeyType': 'HASH'}]})
+            table = self.tables[name] = LocalTable(self.backend, schema)
+        return table
+
+    def create_table(self, **definition):
+        table = self.tables[definition['TableName']] = LocalTable(self.backend, LocalTableSchema(definition))
+        return table
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        with self.backend.call("BatchWriteItem"):
+            for table_name, requests in RequestItems.items():
+                table = self.Table(table_name)
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = _to_dynamo(request['PutRequest']['Item'])
+                        table.items[table.schema.key_of(item)] = item
+                    else:
+                        table.items.pop(table._key(request['DeleteRequest']['Key'], "BatchWriteItem"), None)
+            return {'UnprocessedItems': {}}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        with self.backend.call("BatchGetItem"):
+            responses = {}
+            for table_name, request in RequestItems.items():
+                table = self.Table(table_name)
+                found = []
+                for key in request['Keys']:
+                    item = table.items.get(table._key(key, "BatchGetItem"))
+                    if item is not None:
+                        found.append(project(copy.deepcopy(item), request.get('ProjectionExpression'),
+                                             request.get('ExpressionAttributeNames')))
+                responses[table_name] = found
+            return {'Responses': responses, 'UnprocessedKeys': {}}
+
+# S3
+
+class LocalS3:
+    def __init__(self, backend):
+        self.backend = backend
+        self.objects = {}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        with self.backend.call("PutObject"):
+            self.objects[(Bucket, Key)] = {
+                'Body': Fileobj.read(),
+                'ContentType': (ExtraArgs or {}).get('ContentType', 'binary/octet-stream'),
+                'Extra': dict(ExtraArgs or {})
+            }
+
+    def put_object(self, Bucket, Key, Body=b"", ContentType='binary/octet-stream', **kwargs):
+        with self.backend.call("PutObject"):
+            body = Body.read() if hasattr(Body, 'read') else Body
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            self.objects[(Bucket, Key)] = {'Body': body, 'ContentType': ContentType, 'Extra': kwargs}
+            return {'ETag': f'"{zlib.crc32(body):08x}"'}
+
+    def _object(self, operation, Bucket, Key):
+        stored = self.objects.get((Bucket, Key))
+        if stored is None:
+            raise _client_error(operation, "404" if operation == "HeadObject" else "NoSuchKey", "Not Found")
+        return stored
+
+    def head_object(self, Bucket, Key, **kwargs):
+        with self.backend.call("HeadObject"):
+            stored = self._object("HeadObject", Bucket, Key)
+            return {'ContentLength': len(stored['Body']), 'ContentType': stored['ContentType']}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self.backend.call("GetObject"):
+            stored = self._object("GetObject", Bucket, Key)
+            return {
+                'Body': io.BytesIO(stored['Body']),
+                'ContentLength': len(stored['Body']),
+                'ContentType': stored['ContentType']
+            }
+
+    def download_fileobj(self, Bucket, Key, Fileobj, ExtraArgs=None, Callback=None, Config=None):
+        with self.backend.call("GetObject"):
+            Fileobj.write(self._object("GetObject", Bucket, Key)['Body'])
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        return {'url': f"http://localhost/local-s3/{Bucket}", 'fields': dict(Fields or {}, key=Key)}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, HttpMethod=None):
+        params = Params or {}
+        return f"http://localhost/local-s3/{params.get('Bucket')}/{params.get('Key')}?method={ClientMethod}"
+
+# SNS
+
+class LocalSNS:
+    def __init__(self, backend):
+        self.backend = backend
+        self.messages = []
+
+    def publish(self, TopicArn=None, Message="", **kwargs):
+        with self.backend.call("Publish"):
+            message_id = str(uuid4())
+            self.messages.append({'MessageId': message_id, 'TopicArn': TopicArn, 'Message': Message})
+            return {'MessageId': message_id}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        with self.backend.call("PublishBatch"):
+            if len(PublishBatchRequestEntries) > 10:
+                raise _client_error("PublishBatch", "TooManyEntriesInBatchRequest", "At most 10 entries per batch")
+            successful = []
+            for entry in PublishBatchRequestEntries:
+                message_id = str(uuid4())
+                self.messages.append({'MessageId': message_id, 'TopicArn': TopicArn, 'Message': entry['Message']})
+                successful.append({'Id': entry['Id'], 'MessageId': message_id})
+            return {'Successful': successful, 'Failed': []}
+
+# SQS
+
+class LocalSQS:
+    """First-in first-out queues with visibility timeouts; ``WaitTimeSeconds`` long-polls."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.queues = {}
+
+    def _queue(self, url):
+        return self.queues.setdefault(url, {'visible': deque(), 'in_flight': {}})
+
+    def _requeue_expired(self, queue):
+        now = time.monotonic()
+        expired = [handle for handle, (_, visible_at) in queue['in_flight'].items() if visible_at <= now]
+        # Messages whose visibility timed out go back to the front, oldest first
+        for handle in reversed(expired):
+            message, _ = queue['in_flight'].pop(handle)
+            queue['visible'].appendleft(message)
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        with self.backend.call("SendMessage"):
+            message = {'MessageId': str(uuid4()), 'Body': MessageBody}
+            self._queue(QueueUrl)['visible'].append(message)
+            return {'MessageId': message['MessageId']}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        with self.backend.call("SendMessageBatch"):
+            successful = []
+            for entry in Entries:
+                message = {'MessageId': str(uuid4()), 'Body': entry['MessageBody']}
+                self._queue(QueueUrl)['visible'].append(message)
+                successful.append({'Id': entry['Id'], 'MessageId': message['MessageId']})
+            return {'Successful': successful, 'Failed': []}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, WaitTimeSeconds=0, VisibilityTimeout=30, **kwargs):
+        deadline = time.monotonic() + WaitTimeSeconds
+        while True:
+            with self.backend.call("ReceiveMessage"):
+                queue = self._queue(QueueUrl)
+                self._requeue_expired(queue)
+                messages = []
+                while queue['visible'] and len(messages) < MaxNumberOfMessages:
+                    message = queue['visible'].popleft()
+                    message['ReceiveCount'] = message.get('ReceiveCount', 0) + 1
+                    handle = uuid4().hex
+                    queue['in_flight'][handle] = (message, time.monotonic() + VisibilityTimeout)
+                    messages.append({
+                        'MessageId': message['MessageId'], 'Body': message['Body'], 'ReceiptHandle': handle,
+                        'Attributes': {'ApproximateReceiveCount': str(message['ReceiveCount'])}
+                    })
+            if messages or time.monotonic() >= deadline:
+                return {'Messages': messages} if messages else {}
+            time.sleep(0.05)  # Outside the lock, so senders can get in
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        with self.backend.call("DeleteMessageBatch"):
+            in_flight = self._queue(QueueUrl)['in_flight']
+            for entry in Entries:
+                in_flight.pop(entry['ReceiptHandle'], None)
+            return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        with self.backend.call("ChangeMessageVisibility"):
+            in_flight = self._queue(QueueUrl)['in_flight']
+            if ReceiptHandle in in_flight:
+                message, _ = in_flight[ReceiptHandle]
+                in_flight[ReceiptHandle] = (message, time.monotonic() + VisibilityTimeout)
+            return {}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None):
+        with self.backend.call("GetQueueAttributes"):
+            queue = self._queue(QueueUrl)
+            return {'Attributes': {
+                'ApproximateNumberOfMessages': str(len(queue['visible'])),
+                'ApproximateNumberOfMessagesNotVisible': str(len(queue['in_flight']))
+            }}
+
+# Cognito
+
+class LocalCognito:
+    """User pool stand-in that issues RS256 tokens signed with a key generated at startup."""
+
+    KEY_ID = "local-key"
+    TOKEN_LIFETIME = timedelta(hours=1)
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.users = {}
+        self._private_key = None
+        self._lock = threading.Lock()
+
+    def _key(self):
+        with self._lock:
+            if self._private_key is None:
+                from cryptography.hazmat.primitives.asymmetric import rsa
+                self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            return self._private_key
+
+    def jwks(self) -> list:
+        from jwt.algorithms import RSAAlgorithm
+        jwk = json.loads(RSAAlgorithm.to_jwk(self._key().public_key()))
+        jwk.update({'kid': self.KEY_ID, 'alg': 'RS256', 'use': 'sig'})
+        return [jwk]
+
+    def _user(self, operation, username):
+        user = self.users.get(username)
+        if user is None:
+            raise _client_error(operation, "UserNotFoundException", "User does not exist.")
+        return user
+
+    def sign_up(self, ClientId, Username, Password, UserAttributes=(), SecretHash=None, **kwargs):
+        with self.backend.call("SignUp"):
+            if Username in self.users:
+                raise _client_error("SignUp", "UsernameExistsException", "An account with the given email already exists.")
+            sub = str(uuid4())
+            self.users[Username] = {
+                'sub': sub,
+                'password': Password,
+                'confirmed': False,
+                'groups': [],
+                'attributes': {attribute['Name']: _to_dynamo(attribute['Value']) for attribute in UserAttributes}
+            }
+            return {'UserSub': sub, 'UserConfirmed': False}
+
+    def admin_confirm_sign_up(self, UserPoolId, Username, **kwargs):
+        with self.backend.call("AdminConfirmSignUp"):
+            self._user("AdminConfirmSignUp", Username)['confirmed'] = True
+            return {}
+
+    def admin_add_user_to_group(self, UserPoolId, Username, GroupName, **kwargs):
+        with self.backend.call("AdminAddUserToGroup"):
+            groups = self._user("AdminAddUserToGroup", Username)['groups']
+            if GroupName not in groups:
+                groups.append(GroupName)
+            return {}
+
+    def admin_list_groups_for_user(self, Username, UserPoolId, **kwargs):
+        with self.backend.call("AdminListGroupsForUser"):
+            groups = self._user("AdminListGroupsForUser", Username)['groups']
+            return {'Groups': [{'GroupName': group, 'UserPoolId': UserPoolId} for group in groups]}
+
+    def issue_tokens(self, username: str, client_id: str) -> dict:
+        import jwt
+        user = self.users[username]
+        now = datetime.now(timezone.utc)
+        common = {
+            'sub': user['sub'],
+            'iss': 'local-cognito',
+            'iat': now,
+            'exp': now + self.TOKEN_LIFETIME,
+            'auth_time': int(now.timestamp())
+        }
+        if user['groups']:
+            common['cognito:groups'] = list(user['groups'])
+        access = dict(common, token_use='access', client_id=client_id, username=username)
+        identity = dict(common, token_use='id', aud=client_id, email=user['attributes'].get('email', username),
+                        **{'cognito:username': username})
+        if 'custom:role' in user['attributes']:
+            identity['custom:role'] = user['attributes']['custom:role']
+        sign = lambda claims: jwt.encode(claims, self._key(), algorithm='RS256', headers={'kid': self.KEY_ID})
+        return {
+            'AccessToken': sign(access),
+            'IdToken': sign(identity),
+            'ExpiresIn': int(self.TOKEN_LIFETIME.total_seconds()),
+            'TokenType': 'Bearer'
+        }
+
+    def initiate_auth(self, ClientId, AuthFlow, AuthParameters, **kwargs):
+        with self.backend.call("InitiateAuth"):
+            username = AuthParameters.get('USERNAME')
+            user = self.users.get(username)
+            if user is None or user['password'] != AuthParameters.get('PASSWORD'):
+                raise _client_error("InitiateAuth", "NotAuthorizedException", "Incorrect username or password.")
+            if not user['confirmed']:
+                raise _client_error("InitiateAuth", "UserNotConfirmedException", "User is not confirmed.")
+            return {'AuthenticationResult': self.issue_tokens(username, ClientId)}
+
+class LocalBackend:
+    """Holds the stand-in services, the simulated latency and per-operation call counts."""
+
+    def __init__(self, latency_ms: float = LOCAL_BACKEND_LATENCY_MS,
+                 jitter_ms: float = LOCAL_BACKEND_LATENCY_JITTER_MS, seed: int = LOCAL_BACKEND_SEED):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        # One lock makes every call, transactions included, atomic
+        self._lock = threading.RLock()
+        self.calls = Counter()
+        self.dynamodb = LocalDynamoDB(self)
+        self.s3 = LocalS3(self)
+        self.sns = LocalSNS(self)
+        self.sqs = LocalSQS(self)
+        self.cognito = LocalCognito(self)
+
+    def reset(self, latency_ms: float = None, jitter_ms: float = None, seed: int = None):
+        """Drop all stored data and call counts, e.g. between benchmark runs.
+
+        State is cleared in place because the app's clients hold on to these objects.
+        """
+        with self._lock:
+            for table in self.dynamodb.tables.values():
+                table.items.clear()
+            self.s3.objects.clear()
+            self.sns.messages.clear()
+            self.sqs.queues.clear()
+            self.cognito.users.clear()
+            self.calls.clear()
+            if latency_ms is not None:
+                self.latency_ms = latency_ms
+            if jitter_ms is not None:
+                self.jitter_ms = jitter_ms
+            if seed is not None:
+                self._random.seed(seed)
+
+    def call(self, operation: str):
+        return _SimulatedCall(self, operation)
+
+    def _delay(self) -> float:
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+class _SimulatedCall:
+    def __init__(self, backend: LocalBackend, operation: str):
+        self.backend = backend
+        self.operation = operation
+
+    def __enter__(self):
+        delay = self.backend._delay()
+        if delay:
+            time.sleep(delay)  # Outside the lock, like time spent on the network
+        self.backend._lock.acquire()
+        self.backend.calls[self.operation] += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.backend._lock.release()
+        return False
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_local_backend() -> LocalBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = LocalBackend()
+        return _backend
@@ -1,9 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app import running_in_lambda
 from app.auth import router as auth_router
 from app.events import router as events_router
+from app.banners import shutdown_banner_pool
+from app.notifications import notification_outbox
+from app.admission import admission_worker
+from app.metrics import MetricsMiddleware, event_loop_monitor, registry
+from app.http_cache import CompressionMiddleware
+from app.responses import FastJSONResponse
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    notification_outbox.start()
+    if not running_in_lambda():
+        event_loop_monitor.start()
+        # Under Lambda the queue triggers lambda_handler.admission_handler instead
+        admission_worker.start()
+    try:
+        yield
+    finally:
+        await admission_worker.stop()
+        await notification_outbox.stop()
+        await event_loop_monitor.stop()
+        shutdown_banner_pool()
+
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -15,11 +39,20 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+app.add_middleware(CompressionMiddleware)
+
+# Added last so it is outermost and times the whole request
+app.add_middleware(MetricsMiddleware)
+
 # Root route
 @app.get("/")
 def read_root():
     return {"message": "Sports Event Management API"}
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(events_router, prefix="/events", tags=["Events"])
@@ -0,0 +1,322 @@
+"""Request, AWS call and event-loop metrics.
+
+Metrics are kept in-process and exposed in the Prometheus text format on
+``/metrics``. Under Lambda (``METRICS_FORMAT=emf``, the default there) the
+samples recorded during an invocation are also written as CloudWatch EMF
+log lines by ``flush_emf`` using aws-lambda-powertools.
+
+AWS calls are timed through botocore's event hooks, registered on every
+client by ``instrument_client``. The same hooks ask DynamoDB for
+``ReturnConsumedCapacity=TOTAL`` so the capacity each table really uses
+is counted.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from . import running_in_lambda
+
+METRICS_FORMAT = os.getenv('METRICS_FORMAT', 'emf' if running_in_lambda() else 'prometheus')
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'SportsEvents')
+METRICS_CONSUMED_CAPACITY = os.getenv('METRICS_CONSUMED_CAPACITY', '1') == '1'
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.getenv('EVENT_LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# EMF allows at most 100 values per metric in one log line
+EMF_MAX_VALUES = 100
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name: str, help: str):
+        self._lock = registry.lock
+        self._registry = registry
+        self.name = name
+        self.help = help
+        # Values recorded since the last EMF flush
+        self._pending = defaultdict(list)
+
+    def _record_pending(self, labels, value):
+        if self._registry.collect_samples:
+            self._pending[labels].append(value)
+
+    def take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+        return pending
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+            self._record_pending(key, amount)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(labels)} {value!r}" for labels, value in sorted(values.items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+            self._record_pending(key, value)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(labels)} {value!r}" for labels, value in sorted(values.items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets=LATENCY_BUCKETS):
+        super().__init__(*args)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+            self._record_pending(key, value)
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: (list(buckets), total, count) for key, (buckets, total, count) in self._series.items()}
+        lines = []
+        for labels, (buckets, total, count) in sorted(snapshot.items()):
+            for bound, cumulative in zip(self.buckets, buckets):
+                lines.append(f"{self.name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self, collect_samples: bool = False):
+        self.lock = threading.Lock()
+        self.collect_samples = collect_samples
+        self.metrics = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(self, name, help)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        metric = Gauge(self, name, help)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, help, buckets=buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry(collect_samples=METRICS_FORMAT == 'emf')
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template"
+)
+aws_call_duration = registry.histogram(
+    "aws_call_duration_seconds", "AWS API call latency, retries included"
+)
+aws_call_errors = registry.counter(
+    "aws_call_errors_total", "AWS API calls that returned an error, by error code"
+)
+dynamodb_consumed_capacity = registry.counter(
+    "dynamodb_consumed_capacity_units_total", "DynamoDB capacity units consumed, by table and operation"
+)
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled for a fixed interval"
+)
+
+# HTTP
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request by method, route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template, not the raw path, keeps the label set bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=str(status)
+            )
+
+# AWS
+
+CAPACITY_OPERATIONS = {
+    "GetItem", "PutItem", "UpdateItem", "DeleteItem", "Query", "Scan",
+    "BatchGetItem", "BatchWriteItem", "TransactGetItems", "TransactWriteItems"
+}
+
+def _operation(event_name: str):
+    # e.g. "after-call.dynamodb.GetItem"
+    parts = event_name.split(".")
+    return parts[1], parts[2]
+
+def request_consumed_capacity(params, model, **kwargs):
+    if model.name in CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+def _before_call(context, **kwargs):
+    context['metrics_started'] = time.perf_counter()
+
+def _after_call(http_response, parsed, context, event_name, **kwargs):
+    service, operation = _operation(event_name)
+    started = context.get('metrics_started')
+    if started is not None:
+        aws_call_duration.observe(time.perf_counter() - started, service=service, operation=operation)
+    parsed = parsed or {}
+    if http_response.status_code >= 300:
+        code = parsed.get('Error', {}).get('Code', str(http_response.status_code))
+        aws_call_errors.inc(service=service, operation=operation, code=code)
+
+    consumed = parsed.get('ConsumedCapacity')
+    if consumed:
+        for entry in consumed if isinstance(consumed, list) else [consumed]:
+            dynamodb_consumed_capacity.inc(
+                entry.get('CapacityUnits', 0), table=entry.get('TableName', 'unknown'), operation=operation
+            )
+
+def _after_call_error(exception, context, event_name, **kwargs):
+    # Raised before a response was parsed, e.g. timeouts and connection errors
+    service, operation = _operation(event_name)
+    started = context.get('metrics_started')
+    if started is not None:
+        aws_call_duration.observe(time.perf_counter() - started, service=service, operation=operation)
+    aws_call_errors.inc(service=service, operation=operation, code=type(exception).__name__)
+
+def instrument_client(client):
+    """Register the metrics hooks on a boto3 client and return it."""
+    events = client.meta.events
+    events.register('before-call', _before_call, unique_id='metrics-before-call')
+    events.register('after-call', _after_call, unique_id='metrics-after-call')
+    events.register('after-call-error', _after_call_error, unique_id='metrics-after-call-error')
+    if METRICS_CONSUMED_CAPACITY and client.meta.service_model.service_name == 'dynamodb':
+        events.register('provide-client-params.dynamodb', request_consumed_capacity,
+                        unique_id='metrics-consumed-capacity')
+    return client
+
+# Event loop
+
+class EventLoopLagMonitor:
+    """Sleeps for a fixed interval and records how much later than due it woke up.
+
+    Not started under Lambda, where a frozen execution environment would
+    show up as lag.
+    """
+
+    def __init__(self, interval: float = EVENT_LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            event_loop_lag.observe(max(0.0, loop.time() - due))
+
+event_loop_monitor = EventLoopLagMonitor()
+
+# EMF
+
+def flush_emf():
+    """Write the samples recorded since the last flush as EMF log lines, one per label set."""
+    if not registry.collect_samples:
+        return
+    # Deferred: powertools is only needed once an invocation has finished
+    from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+
+    for metric in registry.metrics:
+        if isinstance(metric, Histogram):
+            # Latencies are reported in milliseconds, CloudWatch's usual unit
+            unit, scale = MetricUnit.Milliseconds, 1000
+            name = metric.name.replace("_seconds", "_ms")
+        else:
+            unit, scale, name = MetricUnit.Count, 1, metric.name
+        for labels, values in metric.take_pending().items():
+            if isinstance(metric, Counter):
+                values = [sum(values)]
+            elif isinstance(metric, Gauge):
+                values = values[-1:]
+            for start in range(0, len(values), EMF_MAX_VALUES):
+                emf = EphemeralMetrics(namespace=METRICS_NAMESPACE)
+                for label, value in labels:
+                    emf.add_dimension(name=label, value=str(value))
+                for value in values[start:start + EMF_MAX_VALUES]:
+                    emf.add_metric(name=name, unit=unit, value=value * scale)
+                emf.flush_metrics()
@@ -3,8 +3,11 @@ from fastapi.security import OAuth2PasswordBearer
 import jwt
 import os
 from jwt.algorithms import RSAAlgorithm
-import requests
+import time
+import threading
+from collections import OrderedDict
 from functools import wraps
+from .db import run_io, AWS_BACKEND
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -21,88 +24,181 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def require_role(required_role: str):
-    async def dependency(request: Request):
-        try:
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                raise HTTPException(status_code=401, detail="No valid token provided")
-
-            token = auth_header.split(' ')[1]
-            try:
-                payload = jwt.decode(token, os.getenv('JWT_SECRET'), algorithms=['HS256'])
-                if payload.get('role') != required_role:
-                    raise HTTPException(status_code=403, detail="Insufficient permissions")
-                return payload
-            except jwt.ExpiredSignatureError:
-                raise HTTPException(status_code=401, detail="Token has expired")
-            except jwt.JWTError:
-                raise HTTPException(status_code=401, detail="Invalid token")
-        except Exception as e:
-            print(f"Auth error: {str(e)}")
-            raise
-    return dependency
-
 def get_cognito_public_keys():
+    if AWS_BACKEND == 'local':
+        from .local_backend import get_local_backend
+        return get_local_backend().cognito.jwks()
+    # Deferred: only needed when the key store refreshes
+    import requests
     region = os.getenv('AWS_REGION')
     pool_id = os.getenv('COGNITO_USER_POOL_ID')
     url = f'https://cognito-idp.{region}.amazonaws.com/{pool_id}/.well-known/jwks.json'
-    response = requests.get(url)
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
     return response.json()['keys']
 
+class CognitoKeyStore:
+    """Process-wide cache of parsed Cognito public keys, keyed by ``kid``.
+
+    Keys are refreshed in a background thread once they are older than
+    ``ttl`` seconds. An unknown ``kid`` (key rotation) triggers a synchronous
+    refetch, but at most once every ``min_refetch_interval`` seconds so a
+    burst of bad tokens cannot turn into a burst of JWKS requests.
+    """
+
+    def __init__(self, ttl: float, min_refetch_interval: float):
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._last_attempt = float('-inf')
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get_key(self, kid: str):
+        key = self._keys.get(kid)
+        if key is not None:
+            if time.monotonic() - self._fetched_at > self.ttl:
+                self._refresh_in_background()
+            return key
+
+        # Unknown kid: the pool may have rotated its keys
+        self.refresh()
+        return self._keys.get(kid)
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_attempt < self.min_refetch_interval:
+                return
+            self._last_attempt = now
+            try:
+                keys = get_cognito_public_keys()
+            except Exception as e:
+                print(f"Error fetching Cognito public keys: {str(e)}")
+                return
+            self._keys = {k['kid']: RSAAlgorithm.from_jwk(k) for k in keys}
+            self._fetched_at = now
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(force=True)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="cognito-jwks-refresh", daemon=True).start()
+
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified tokens; entries expire at the token's ``exp``."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str, audience=None):
+        cache_key = (token, audience)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return claims
+
+    def put(self, token: str, audience, claims: dict):
+        expires_at = claims.get('exp')
+        if expires_at is None:
+            return
+        with self._lock:
+            self._entries[(token, audience)] = (claims, float(expires_at))
+            self._entries.move_to_end((token, audience))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+cognito_key_store = CognitoKeyStore(
+    ttl=float(os.getenv('COGNITO_JWKS_TTL_SECONDS', '3600')),
+    min_refetch_interval=float(os.getenv('COGNITO_JWKS_MIN_REFETCH_SECONDS', '30'))
+)
+verified_tokens = VerifiedTokenCache(maxsize=int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', '1024')))
+
+def verify_cognito_token(token: str, audience=None) -> dict:
+    """Verify a Cognito RS256 token against the cached pool keys and return its claims."""
+    claims = verified_tokens.get(token, audience)
+    if claims is not None:
+        return claims
+
+    header = jwt.get_unverified_header(token)
+    key = cognito_key_store.get_key(header['kid'])
+    if key is None:
+        raise jwt.InvalidTokenError("Invalid token key")
+
+    claims = jwt.decode(token, key, algorithms=['RS256'], audience=audience)
+    verified_tokens.put(token, audience, claims)
+    return claims
+
+async def verify_role(request: Request, role: str) -> dict:
+    """Verify the request's Cognito bearer token and its ``custom:role``; returns the user."""
+    auth_header = request.headers.get('Authorization')
+    
+    if not auth_header or not auth_header.startswith('Bearer '):
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+    
+    token = auth_header.split(' ')[1]
+    
+    try:
+        audience = os.getenv('COGNITO_USER_POOL_CLIENT_ID')
+        decoded = verified_tokens.get(token, audience)
+        if decoded is None:
+            # Cache miss may need a JWKS fetch, keep it off the event loop
+            decoded = await run_io(verify_cognito_token, token, audience)
+    except HTTPException:
+        raise
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    
+    # Check user role
+    user_role = decoded.get('custom:role')
+    if user_role != role:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    # Add user info to request state
+    request.state.user = {
+        'id': decoded['sub'],
+        'email': decoded.get('email', ''),
+        'role': user_role
+    }
+    return request.state.user
+
+def role_dependency(role: str):
+    """``require_role`` for ``Depends(...)``: resolves to the verified user."""
+    async def dependency(request: Request) -> dict:
+        return await verify_role(request, role)
+    return dependency
+
+organizer_dependency = role_dependency("organizer")
+
 def require_role(role: str):
+    """Route decorator; the handler must take the ``Request``. Use ``role_dependency`` with ``Depends``."""
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            request = next(arg for arg in args if isinstance(arg, Request))
-            auth_header = request.headers.get('Authorization')
-            
-            if not auth_header or not auth_header.startswith('Bearer '):
-                raise HTTPException(status_code=401, detail="Invalid authorization header")
-            
-            token = auth_header.split(' ')[1]
-            
-            try:
-                # Decode JWT token header to get kid
-                header = jwt.get_unverified_header(token)
-                kid = header['kid']
-                
-                # Get public keys from Cognito
-                keys = get_cognito_public_keys()
-                key = next((k for k in keys if k['kid'] == kid), None)
-                
-                if not key:
-                    raise HTTPException(status_code=401, detail="Invalid token key")
-                
-                # Convert JWK to PEM format
-                public_key = RSAAlgorithm.from_jwk(key)
-                
-                # Verify and decode token
-                decoded = jwt.decode(
-                    token,
-                    public_key,
-                    algorithms=['RS256'],
-                    audience=os.getenv('COGNITO_USER_POOL_CLIENT_ID')
-                )
-                
-                # Check user role
-                user_role = decoded.get('custom:role')
-                if user_role != role:
-                    raise HTTPException(status_code=403, detail="Insufficient permissions")
-                
-                # Add user info to request state
-                request.state.user = {
-                    'id': decoded['sub'],
-                    'email': decoded['email'],
-                    'role': user_role
-                }
-                
-                return await func(*args, **kwargs)
-            except jwt.ExpiredSignatureError:
-                raise HTTPException(status_code=401, detail="Token has expired")
-            except jwt.InvalidTokenError as e:
-                raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
-            except Exception as e:
-                raise HTTPException(status_code=401, detail=str(e))
+            request = kwargs.get('request') or next(arg for arg in args if isinstance(arg, Request))
+            await verify_role(request, role)
+            # Outside verify_role: the handler's own errors (400, 404, 429) reach the client as raised
+            return await func(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,51 @@
+import boto3
+import os
+from dotenv import load_dotenv
+from app.models.models import EventStatus
+from app.search import location_key
+
+# Load environment variables
+load_dotenv()
+
+def migrate_event_indexes():
+    """Give existing events the ``status`` and ``location_key`` the discovery indexes are keyed on.
+
+    Events without them are left out of status-date-index and location-index.
+    Safe to re-run: events that already carry both are skipped.
+    """
+    try:
+        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION'))
+        events_table = dynamodb.Table(os.getenv('DYNAMODB_EVENTS_TABLE'))
+
+        migrated = 0
+        scan_kwargs = {'ProjectionExpression': "id, #status, #location, location_key",
+                       'ExpressionAttributeNames': {'#status': 'status', '#location': 'location'}}
+        while True:
+            response = events_table.scan(**scan_kwargs)
+            for event in response.get('Items', []):
+                key = location_key(event.get('location', ''))
+                if 'status' in event and event.get('location_key', '') == key:
+                    continue
+                update = "SET #status = if_not_exists(#status, :status)"
+                values = {':status': EventStatus.UPCOMING.value}
+                if key:  # Index keys cannot be empty
+                    update += ", location_key = :location_key"
+                    values[':location_key'] = key
+                events_table.update_item(
+                    Key={'id': event['id']},
+                    UpdateExpression=update,
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues=values
+                )
+                migrated += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        print(f"Indexed {migrated} events")
+
+    except Exception as e:
+        print(f"Error migrating event indexes: {str(e)}")
+
+if __name__ == "__main__":
+    migrate_event_indexes()
@@ -0,0 +1,53 @@
+import boto3
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from app.models.models import EVENT_PARTICIPANTS_TABLE
+
+# Load environment variables
+load_dotenv()
+
+def migrate_participants():
+    """Move legacy ``participants`` lists off event items into the event-participants table.
+
+    Each event keeps only ``participant_count``. Safe to re-run: events that
+    no longer carry a ``participants`` attribute are skipped.
+    """
+    try:
+        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION'))
+        events_table = dynamodb.Table(os.getenv('DYNAMODB_EVENTS_TABLE'))
+        participants_table = dynamodb.Table(EVENT_PARTICIPANTS_TABLE['TableName'])
+
+        migrated = 0
+        scan_kwargs = {}
+        while True:
+            response = events_table.scan(**scan_kwargs)
+            for event in response.get('Items', []):
+                if 'participants' not in event:
+                    continue
+                participants = set(event['participants'])
+                migrated_at = datetime.now().isoformat()
+                with participants_table.batch_writer(overwrite_by_pkeys=['event_id', 'user_id']) as batch:
+                    for user_id in participants:
+                        batch.put_item(Item={
+                            'event_id': event['id'],
+                            'user_id': user_id,
+                            'registered_at': migrated_at
+                        })
+                events_table.update_item(
+                    Key={'id': event['id']},
+                    UpdateExpression="SET participant_count = :count REMOVE participants",
+                    ExpressionAttributeValues={':count': len(participants)}
+                )
+                migrated += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        print(f"Migrated participants for {migrated} events")
+
+    except Exception as e:
+        print(f"Error migrating participants: {str(e)}")
+
+if __name__ == "__main__":
+    migrate_participants()
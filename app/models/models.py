@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -8,6 +8,14 @@ class EventStatus(str, Enum):
     ONGOING = "ongoing"
     COMPLETED = "completed"
 
+class RegistrationStatus(str, Enum):
+    PENDING = "PENDING"
+    APPROVED = "APPROVED"
+    REJECTED = "REJECTED"
+    QUEUED = "QUEUED"          # Accepted by the admission queue, not yet decided
+    WAITLISTED = "WAITLISTED"  # Event was full; promoted in order when a seat frees up
+    CANCELLED = "CANCELLED"    # Withdrawn by the participant
+
 class Event(BaseModel):
     id: Optional[str] = None
     title: str
@@ -17,10 +25,103 @@ class Event(BaseModel):
     max_participants: int
     organizer_id: str
     banner_url: Optional[str] = None
+    banner_variants: Optional[Dict[str, str]] = None  # thumbnail/card/hero URLs
     status: EventStatus = EventStatus.UPCOMING
-    participants: List[str] = []
+    participant_count: int = 0  # Participants live in EVENT_PARTICIPANTS_TABLE
+
 
+# The deployed name comes from DYNAMODB_EVENTS_TABLE. Discovery queries use
+# status-date-index ("upcoming in a date range") and location-index, keyed
+# on the normalised location_key; both are sorted by date.
+EVENTS_TABLE = {
+    'TableName': 'events',
+    'KeySchema': [
+        {
+            'AttributeName': 'id',
+            'KeyType': 'HASH'  # Partition key
+        }
+    ],
+    'AttributeDefinitions': [
+        {
+            'AttributeName': 'id',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'organizer_id',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'status',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'date',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'location_key',
+            'AttributeType': 'S'
+        }
+    ],
+    'GlobalSecondaryIndexes': [
+        {
+            'IndexName': 'organizer-index',
+            'KeySchema': [
+                {
+                    'AttributeName': 'organizer_id',
+                    'KeyType': 'HASH'
+                }
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        },
+        {
+            'IndexName': 'status-date-index',
+            'KeySchema': [
+                {
+                    'AttributeName': 'status',
+                    'KeyType': 'HASH'
+                },
+                {
+                    'AttributeName': 'date',
+                    'KeyType': 'RANGE'
+                }
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        },
+        {
+            'IndexName': 'location-index',
+            'KeySchema': [
+                {
+                    'AttributeName': 'location_key',
+                    'KeyType': 'HASH'
+                },
+                {
+                    'AttributeName': 'date',
+                    'KeyType': 'RANGE'
+                }
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        }
+    ],
+    'ProvisionedThroughput': {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+}
 
+# event-status-index serves one event's requests, optionally of one status
 REGISTRATION_REQUESTS_TABLE = {
     'TableName': 'registration-requests',
     'KeySchema': [
@@ -33,10 +134,150 @@ REGISTRATION_REQUESTS_TABLE = {
         {
             'AttributeName': 'id',
             'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'event_id',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'status',
+            'AttributeType': 'S'
+        }
+    ],
+    'GlobalSecondaryIndexes': [
+        {
+            'IndexName': 'event-status-index',
+            'KeySchema': [
+                {
+                    'AttributeName': 'event_id',
+                    'KeyType': 'HASH'
+                },
+                {
+                    'AttributeName': 'status',
+                    'KeyType': 'RANGE'
+                }
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        }
+    ],
+    'ProvisionedThroughput': {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+}
+
+EVENT_PARTICIPANTS_TABLE = {
+    'TableName': 'event-participants',
+    'KeySchema': [
+        {
+            'AttributeName': 'event_id',
+            'KeyType': 'HASH'  # Partition key
+        },
+        {
+            'AttributeName': 'user_id',
+            'KeyType': 'RANGE'  # Sort key
+        }
+    ],
+    'AttributeDefinitions': [
+        {
+            'AttributeName': 'event_id',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'user_id',
+            'AttributeType': 'S'
+        }
+    ],
+    'ProvisionedThroughput': {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+}
+
+# Precomputed registration counters: one item for all registrations
+# ('global') and one per event ('event#<event_id>'). Only the total and
+# the bounded status counters live here.
+REGISTRATION_AGGREGATES_TABLE = {
+    'TableName': 'registration-aggregates',
+    'KeySchema': [
+        {
+            'AttributeName': 'id',
+            'KeyType': 'HASH'  # Partition key
+        }
+    ],
+    'AttributeDefinitions': [
+        {
+            'AttributeName': 'id',
+            'AttributeType': 'S'
+        }
+    ],
+    'ProvisionedThroughput': {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+}
+
+# Free-text registration dimensions (college, year of study), one item per
+# value so no single item grows with the number of distinct values. The
+# sort key is "<dimension>#<normalised value>".
+REGISTRATION_COUNTERS_TABLE = {
+    'TableName': 'registration-counters',
+    'KeySchema': [
+        {
+            'AttributeName': 'scope',
+            'KeyType': 'HASH'  # Partition key, as the aggregates id
+        },
+        {
+            'AttributeName': 'counter',
+            'KeyType': 'RANGE'  # Sort key
+        }
+    ],
+    'AttributeDefinitions': [
+        {
+            'AttributeName': 'scope',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'counter',
+            'AttributeType': 'S'
+        }
+    ],
+    'ProvisionedThroughput': {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+}
+
+# Registrations that arrived after an event filled up, in arrival order.
+# The sort key is "<created_at>#<request_id>".
+EVENT_WAITLIST_TABLE = {
+    'TableName': 'event-waitlist',
+    'KeySchema': [
+        {
+            'AttributeName': 'event_id',
+            'KeyType': 'HASH'  # Partition key
+        },
+        {
+            'AttributeName': 'waitlist_key',
+            'KeyType': 'RANGE'  # Sort key
+        }
+    ],
+    'AttributeDefinitions': [
+        {
+            'AttributeName': 'event_id',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'waitlist_key',
+            'AttributeType': 'S'
         }
     ],
     'ProvisionedThroughput': {
         'ReadCapacityUnits': 5,
         'WriteCapacityUnits': 5
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,339 @@
+"""Registration notifications, published to SNS through an outbox.
+
+Callers enqueue a record and return; a dispatcher (a background task in a
+long-running server, a flush at the end of each request under Lambda)
+publishes records in batches. With ``NOTIFICATION_QUEUE_URL`` set the
+records live on an SQS queue, so they survive restarts and any instance
+can deliver them; otherwise they are kept in process memory. Failed
+records are retried with exponential backoff and jitter and dead-lettered
+after ``NOTIFICATION_MAX_ATTEMPTS``.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+from collections import deque
+from uuid import uuid4
+from .db import get_sns, get_sqs, run_io, AWS_BACKEND
+from .metrics import registry
+
+SNS_TOPIC_ARN = os.getenv('SNS_TOPIC_ARN')
+NOTIFICATION_PUBLISHER = os.getenv('NOTIFICATION_PUBLISHER', 'sns')
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '5'))
+NOTIFICATION_FLUSH_INTERVAL_SECONDS = float(os.getenv('NOTIFICATION_FLUSH_INTERVAL_SECONDS', '0.5'))
+NOTIFICATION_QUEUE_URL = os.getenv(
+    'NOTIFICATION_QUEUE_URL', 'local://notification-outbox' if AWS_BACKEND == 'local' else None
+)
+NOTIFICATION_DEAD_LETTER_QUEUE_URL = os.getenv(
+    'NOTIFICATION_DEAD_LETTER_QUEUE_URL', 'local://notification-dead-letters' if AWS_BACKEND == 'local' else None
+)
+NOTIFICATION_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv('NOTIFICATION_VISIBILITY_TIMEOUT_SECONDS', '30'))
+SNS_BATCH_SIZE = 10  # PublishBatch limit, also the ReceiveMessage limit
+SQS_MAX_VISIBILITY_SECONDS = 12 * 60 * 60
+
+notification_queue_depth = registry.gauge(
+    "notification_queue_depth", "Notification records waiting in the outbox, by state"
+)
+notification_publish_duration = registry.histogram(
+    "notification_publish_duration_seconds", "Time taken by one PublishBatch call"
+)
+notification_delivery_latency = registry.histogram(
+    "notification_delivery_latency_seconds", "Time from enqueue to a successful publish",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+)
+notification_outcomes = registry.counter(
+    "notifications_total", "Notification publish attempts, by outcome"
+)
+
+class SNSPublisher:
+    async def publish_batch(self, records):
+        """Publish up to 10 records; return ``{record id: error}`` for the ones that failed."""
+        response = await run_io(
+            get_sns().publish_batch,
+            TopicArn=SNS_TOPIC_ARN,
+            PublishBatchRequestEntries=[
+                {'Id': record['id'], 'Message': json.dumps(record['message'])}
+                for record in records
+            ]
+        )
+        return {failure['Id']: failure.get('Message', failure.get('Code')) for failure in response.get('Failed', [])}
+
+class LocalPublisher:
+    """Stand-in publisher that keeps messages in memory, for tests and local runs."""
+
+    def __init__(self):
+        self.published = []
+        self.fail_next = 0
+
+    async def publish_batch(self, records):
+        if self.fail_next:
+            self.fail_next -= 1
+            return {record['id']: "Simulated failure" for record in records}
+        self.published.extend(record['message'] for record in records)
+        return {}
+
+class MemoryOutboxStore:
+    """Outbox records in process memory; lost on restart. Dead letters are kept in a bounded deque."""
+
+    def __init__(self):
+        self.dead_letters = deque(maxlen=1000)
+        self._pending = deque()
+        self._retrying = []
+
+    async def add(self, record: dict):
+        self._pending.append(dict(record, attempts=0))
+
+    async def take(self, limit: int) -> list:
+        """Up to ``limit`` records that are due, retries first."""
+        now = time.monotonic()
+        batch = []
+        due = [record for record in self._retrying if record['not_before'] <= now]
+        for record in due[:limit]:
+            self._retrying.remove(record)
+            batch.append(record)
+        while self._pending and len(batch) < limit:
+            batch.append(self._pending.popleft())
+        return batch
+
+    async def remove(self, records: list):
+        pass  # Taken records are already out of the store
+
+    async def retry(self, record: dict, delay: float):
+        record['not_before'] = time.monotonic() + delay
+        self._retrying.append(record)
+
+    async def dead_letter(self, record: dict):
+        self.dead_letters.append(record)
+
+    async def depth(self) -> dict:
+        return {"queued": len(self._pending), "retrying": len(self._retrying)}
+
+class SQSOutboxStore:
+    """Outbox records on an SQS queue.
+
+    A taken record stays on the queue, hidden, until it is removed; a failed
+    one is hidden for its backoff and its ``ApproximateReceiveCount`` counts
+    the attempts. Dead letters go to ``dead_letter_queue_url``, or without
+    one stay hidden as long as SQS allows, for the queue's redrive policy.
+    """
+
+    def __init__(self, queue_url: str, dead_letter_queue_url: str = None):
+        self.queue_url = queue_url
+        self.dead_letter_queue_url = dead_letter_queue_url
+
+    async def add(self, record: dict):
+        await run_io(get_sqs().send_message, QueueUrl=self.queue_url, MessageBody=json.dumps(record))
+
+    async def take(self, limit: int) -> list:
+        response = await run_io(
+            get_sqs().receive_message,
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=limit,
+            VisibilityTimeout=NOTIFICATION_VISIBILITY_TIMEOUT_SECONDS,
+            AttributeNames=['ApproximateReceiveCount']
+        )
+        records = []
+        for message in response.get('Messages', []):
+            record = json.loads(message['Body'])
+            record['attempts'] = int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1)) - 1
+            record['receipt_handle'] = message['ReceiptHandle']
+            records.append(record)
+        return records
+
+    async def remove(self, records: list):
+        if records:
+            await run_io(
+                get_sqs().delete_message_batch,
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(i), 'ReceiptHandle': record['receipt_handle']} for i, record in enumerate(records)]
+            )
+
+    async def retry(self, record: dict, delay: float):
+        await run_io(
+            get_sqs().change_message_visibility,
+            QueueUrl=self.queue_url,
+            ReceiptHandle=record['receipt_handle'],
+            VisibilityTimeout=min(int(delay) + 1, SQS_MAX_VISIBILITY_SECONDS)
+        )
+
+    async def dead_letter(self, record: dict):
+        if not self.dead_letter_queue_url:
+            await self.retry(record, SQS_MAX_VISIBILITY_SECONDS)
+            return
+        body = {key: value for key, value in record.items() if key != 'receipt_handle'}
+        await run_io(get_sqs().send_message, QueueUrl=self.dead_letter_queue_url, MessageBody=json.dumps(body))
+        await self.remove([record])
+
+    async def depth(self) -> dict:
+        response = await run_io(
+            get_sqs().get_queue_attributes,
+            QueueUrl=self.queue_url,
+            AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+        )
+        attributes = response.get('Attributes', {})
+        return {
+            "queued": int(attributes.get('ApproximateNumberOfMessages', 0)),
+            "retrying": int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0))
+        }
+
+class NotificationOutbox:
+    """Callers enqueue and return, a background dispatcher publishes in batches.
+
+    Failed records are retried with exponential backoff and jitter; after
+    ``max_attempts`` they are dead-lettered by the store.
+    """
+
+    def __init__(self, publisher, store=None, max_attempts: int = NOTIFICATION_MAX_ATTEMPTS,
+                 flush_interval: float = NOTIFICATION_FLUSH_INTERVAL_SECONDS):
+        self.publisher = publisher
+        self.store = store or MemoryOutboxStore()
+        self.max_attempts = max_attempts
+        self.flush_interval = flush_interval
+        self._wakeup = None
+        self._task = None
+        self.published = 0
+        self.failed_attempts = 0
+        self.dead_lettered = 0
+        self._latencies = deque(maxlen=500)
+
+    async def enqueue(self, message: dict) -> str:
+        record = {'id': uuid4().hex, 'message': message, 'enqueued_at': time.time()}
+        await self.store.add(record)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return record['id']
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error dispatching notifications: {str(e)}")
+
+    async def flush(self):
+        """Publish everything queued and every retry that is due.
+
+        Under Lambda there is no long-running dispatcher, so this runs at the
+        end of each request instead.
+        """
+        flushed = False
+        while True:
+            batch = await self.store.take(SNS_BATCH_SIZE)
+            if not batch:
+                break
+            flushed = True
+            started = time.perf_counter()
+            try:
+                failures = await self.publisher.publish_batch(batch)
+            except Exception as e:
+                failures = {record['id']: str(e) for record in batch}
+            elapsed = time.perf_counter() - started
+            self._latencies.append(elapsed)
+            notification_publish_duration.observe(elapsed)
+
+            published = [record for record in batch if record['id'] not in failures]
+            await self.store.remove(published)
+            for record in published:
+                self.published += 1
+                notification_outcomes.inc(outcome="published")
+                notification_delivery_latency.observe(max(0.0, time.time() - record.get('enqueued_at', time.time())))
+
+            for record in batch:
+                if record['id'] not in failures:
+                    continue
+                self.failed_attempts += 1
+                record['attempts'] += 1
+                record['last_error'] = failures[record['id']]
+                if record['attempts'] >= self.max_attempts:
+                    self.dead_lettered += 1
+                    notification_outcomes.inc(outcome="dead_lettered")
+                    await self.store.dead_letter(record)
+                    print(f"Notification {record['id']} dead-lettered: {record['last_error']}")
+                else:
+                    notification_outcomes.inc(outcome="failed")
+                    backoff = min(60.0, 0.5 * 2 ** record['attempts'])
+                    await self.store.retry(record, random.uniform(backoff / 2, backoff))
+        if flushed:
+            await self.depth()
+
+    async def depth(self) -> dict:
+        """Records waiting in the store, also reported as the ``notification_queue_depth`` gauge."""
+        depth = await self.store.depth()
+        for state, count in depth.items():
+            notification_queue_depth.set(count, state=state)
+        return depth
+
+    async def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+        depth = await self.depth()
+        return {
+            "queue_depth": depth["queued"],
+            "retry_depth": depth["retrying"],
+            "dead_letters": self.dead_lettered,
+            "published": self.published,
+            "failed_attempts": self.failed_attempts,
+            "publish_latency_p50_seconds": percentile(0.5),
+            "publish_latency_p95_seconds": percentile(0.95)
+        }
+
+def _make_publisher():
+    if NOTIFICATION_PUBLISHER == 'local':
+        return LocalPublisher()
+    return SNSPublisher()
+
+def _make_store():
+    if NOTIFICATION_QUEUE_URL:
+        return SQSOutboxStore(NOTIFICATION_QUEUE_URL, NOTIFICATION_DEAD_LETTER_QUEUE_URL)
+    return MemoryOutboxStore()
+
+notification_outbox = NotificationOutbox(_make_publisher(), _make_store())
+
+async def send_registration_confirmation(email: str, event_data: dict, registration_data: dict):
+    try:
+        message = {
+            "email": email,
+            "subject": f"Registration Confirmation - {event_data['title']}",
+            "message": f"""
+            Dear {registration_data['full_name']},
+
+            Thank you for registering for {event_data['title']}!
+
+            Event Details:
+            - Date: {event_data['date']}
+            - Location: {event_data['location']}
+
+            We're excited to have you join us!
+
+            Best regards,
+            The Event Team
+            """
+        }
+
+        await notification_outbox.enqueue(message)
+    except Exception as e:
+        print(f"Error queueing confirmation email: {str(e)}")
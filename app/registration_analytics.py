@@ -1,44 +1,221 @@
+import os
 import json
-import boto3
-from datetime import datetime
-from collections import defaultdict
+import asyncio
+import numpy as np
+from datetime import datetime, timedelta
+from .db import registration_requests_table, events_table, parallel_scan, batch_get_items
 
-dynamodb = boto3.resource('dynamodb')
-registration_table = dynamodb.Table('registration-requests')
+SCAN_SEGMENTS = int(os.getenv('ANALYTICS_SCAN_SEGMENTS', '4'))
+SNAPSHOT_PATH = os.getenv('ANALYTICS_SNAPSHOT_PATH', '/tmp/registration_analytics.npz')
+# Incremental scans reach back this far before the last one, for writes that were in flight
+SNAPSHOT_OVERLAP_SECONDS = int(os.getenv('ANALYTICS_SNAPSHOT_OVERLAP_SECONDS', '300'))
+
+# Only the attributes the engine needs are read from the table
+PROJECTION = "id, event_id, #status, college_name, year_of_study, created_at"
+CATEGORICAL_COLUMNS = ("event_id", "status", "college_name", "year_of_study")
+
+class Categorical:
+    """Dictionary-encodes a string column: values become small integer codes into ``categories``."""
+
+    def __init__(self, categories=()):
+        self.categories = list(categories)
+        self._codes = {value: code for code, value in enumerate(self.categories)}
+
+    def code(self, value):
+        """The code of ``value``, or None if it has not been seen."""
+        return self._codes.get(value)
+
+    def encode(self, values):
+        uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques.tolist()):
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.categories)
+                self.categories.append(value)
+            lookup[i] = code
+        return lookup[inverse.reshape(-1)]
+
+    def counts(self, codes):
+        return np.bincount(codes, minlength=len(self.categories))
+
+    def to_dict(self, counts):
+        return {self.categories[code]: int(count) for code, count in enumerate(counts) if count}
+
+class RegistrationColumns:
+    """Registrations held as parallel numpy arrays instead of a list of dicts."""
+
+    def __init__(self):
+        self.encoders = {column: Categorical() for column in CATEGORICAL_COLUMNS}
+        self.codes = {column: np.empty(0, dtype=np.int32) for column in CATEGORICAL_COLUMNS}
+        self.ids = np.empty(0, dtype=str)
+        self.created_at = np.empty(0, dtype='datetime64[s]')
+        self.scanned_at = None  # When the scan that produced these rows started
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self, ids):
+        """Row of each id in ``ids``, or -1 for ids not held yet."""
+        rows = np.full(len(ids), -1)
+        if len(self.ids):
+            order = np.argsort(self.ids)
+            positions = np.searchsorted(self.ids, ids, sorter=order).clip(max=len(self.ids) - 1)
+            found = self.ids[order[positions]] == ids
+            rows[found] = order[positions[found]]
+        return rows
+
+    def upsert(self, items):
+        """Add new records and overwrite the rows of records already held."""
+        if not items:
+            return
+        ids = np.array([item['id'] for item in items], dtype=str)
+        rows = self._rows(ids)
+        existing, new = rows >= 0, rows < 0
+
+        self.ids = np.concatenate([self.ids, ids[new]])
+        for column in CATEGORICAL_COLUMNS:
+            codes = self.encoders[column].encode([str(item.get(column, '')) for item in items])
+            self.codes[column][rows[existing]] = codes[existing]
+            self.codes[column] = np.concatenate([self.codes[column], codes[new]])
+        # ISO strings truncated to whole seconds; missing timestamps become NaT
+        timestamps = np.array([item.get('created_at', 'NaT')[:19] for item in items], dtype='datetime64[s]')
+        self.created_at[rows[existing]] = timestamps[existing]
+        self.created_at = np.concatenate([self.created_at, timestamps[new]])
+
+    def save(self, path: str):
+        arrays = {f"codes_{column}": codes for column, codes in self.codes.items()}
+        arrays.update({
+            f"categories_{column}": np.array(encoder.categories, dtype=str)
+            for column, encoder in self.encoders.items()
+        })
+        np.savez_compressed(path, ids=self.ids, created_at=self.created_at,
+                            scanned_at=np.array(self.scanned_at or ''), **arrays)
+
+    @classmethod
+    def load(cls, path: str):
+        columns = cls()
+        with np.load(path) as snapshot:
+            columns.ids = snapshot['ids']
+            columns.created_at = snapshot['created_at']
+            columns.scanned_at = str(snapshot['scanned_at']) if 'scanned_at' in snapshot.files else None
+            for column in CATEGORICAL_COLUMNS:
+                columns.codes[column] = snapshot[f"codes_{column}"]
+                columns.encoders[column] = Categorical(snapshot[f"categories_{column}"].tolist())
+        return columns
+
+def load_columns(segments: int, use_snapshot: bool = False, full_rebuild: bool = False):
+    """Load registrations into columns, by default with a full scan.
+
+    ``use_snapshot`` reuses the local snapshot when there is one and only
+    fetches records created or updated (``updated_at``, set on every status
+    change) since the scan that produced it, overwriting the snapshot's
+    rows for records it already holds. The filter is applied server-side,
+    so it saves transfer and decoding but not read capacity. Records
+    deleted since are only dropped by a ``full_rebuild``.
+    """
+    scan_kwargs = {
+        'ProjectionExpression': PROJECTION,
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+    columns = None
+    if use_snapshot and not full_rebuild and os.path.exists(SNAPSHOT_PATH):
+        columns = RegistrationColumns.load(SNAPSHOT_PATH)
+        if columns.scanned_at:
+            since = datetime.fromisoformat(columns.scanned_at) - timedelta(seconds=SNAPSHOT_OVERLAP_SECONDS)
+            scan_kwargs['FilterExpression'] = "created_at >= :since OR updated_at >= :since"
+            scan_kwargs['ExpressionAttributeValues'] = {':since': since.isoformat()}
+        else:
+            columns = None  # Written before change tracking; rebuild it
+    columns = columns or RegistrationColumns()
+
+    scanned_at = datetime.now().isoformat()
+    for items in parallel_scan(registration_requests_table.sync, total_segments=segments, **scan_kwargs):
+        columns.upsert(items)
+    columns.scanned_at = scanned_at
+    if use_snapshot:
+        columns.save(SNAPSHOT_PATH)
+    return columns
+
+async def get_event_capacities(event_ids):
+    """Fetch max_participants and participant_count for the given events."""
+    events = await batch_get_items(events_table.name, [{'id': event_id} for event_id in event_ids if event_id])
+    return {
+        event['id']: (int(event.get('max_participants', 0)), int(event.get('participant_count', 0)))
+        for event in events
+    }
+
+def _rate(numerator, denominator):
+    return round(float(numerator) / float(denominator), 4) if denominator else None
+
+def time_buckets(created_at, unit: str):
+    valid = created_at[~np.isnat(created_at)]
+    buckets, counts = np.unique(valid.astype(f'datetime64[{unit}]'), return_counts=True)
+    return {str(bucket): int(count) for bucket, count in zip(buckets, counts)}
+
+def compute_analytics(columns: RegistrationColumns, capacities: dict) -> dict:
+    encoders, codes = columns.encoders, columns.codes
+    statuses = encoders['status']
+    events = encoders['event_id']
+
+    # Event x status counts in one pass: combine the two codes into one index
+    n_status = max(len(statuses.categories), 1)
+    combined = codes['event_id'] * n_status + codes['status']
+    per_event_status = np.bincount(
+        combined, minlength=len(events.categories) * n_status
+    ).reshape(len(events.categories), n_status)
+
+    def status_count(counts, status):
+        code = statuses.code(status)
+        return counts[..., code] if code is not None else np.zeros(counts.shape[:-1], dtype=np.int64)
+
+    approved = status_count(per_event_status, 'APPROVED')
+    rejected = status_count(per_event_status, 'REJECTED')
+
+    per_event = {}
+    for code, event_id in enumerate(events.categories):
+        max_participants, participant_count = capacities.get(event_id, (0, 0))
+        per_event[event_id] = {
+            'total_registrations': int(per_event_status[code].sum()),
+            'status_distribution': statuses.to_dict(per_event_status[code]),
+            'approval_rate': _rate(approved[code], approved[code] + rejected[code]),
+            'fill_rate': _rate(participant_count, max_participants)
+        }
+
+    return {
+        'total_registrations': len(columns),
+        'status_distribution': statuses.to_dict(statuses.counts(codes['status'])),
+        'college_distribution': encoders['college_name'].to_dict(encoders['college_name'].counts(codes['college_name'])),
+        'year_distribution': encoders['year_of_study'].to_dict(encoders['year_of_study'].counts(codes['year_of_study'])),
+        'approval_rate': _rate(approved.sum(), approved.sum() + rejected.sum()),
+        'fill_rate': _rate(
+            sum(count for _, count in capacities.values()),
+            sum(maximum for maximum, _ in capacities.values())
+        ),
+        'hourly_registrations': time_buckets(columns.created_at, 'h'),
+        'daily_registrations': time_buckets(columns.created_at, 'D'),
+        'per_event': per_event,
+        'timestamp': datetime.now().isoformat()
+    }
 
 def lambda_handler(event, context):
     try:
-        # Scan registration requests
-        response = registration_table.scan()
-        registrations = response.get('Items', [])
-        
-        # Initialize analytics data
-        analytics = {
-            'total_registrations': len(registrations),
-            'status_distribution': defaultdict(int),
-            'college_distribution': defaultdict(int),
-            'year_distribution': defaultdict(int),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Process registrations
-        for reg in registrations:
-            analytics['status_distribution'][reg['status']] += 1
-            analytics['college_distribution'][reg['college_name']] += 1
-            analytics['year_distribution'][reg['year_of_study']] += 1
-        
-        # Convert defaultdict to regular dict for JSON serialization
-        analytics['status_distribution'] = dict(analytics['status_distribution'])
-        analytics['college_distribution'] = dict(analytics['college_distribution'])
-        analytics['year_distribution'] = dict(analytics['year_distribution'])
-        
+        event = event or {}
+        columns = load_columns(
+            segments=int(event.get('segments', SCAN_SEGMENTS)),
+            use_snapshot=bool(event.get('use_snapshot', False)),
+            full_rebuild=bool(event.get('full_rebuild', False))
+        )
+        capacities = asyncio.run(get_event_capacities(columns.encoders['event_id'].categories))
+        analytics = compute_analytics(columns, capacities)
+
         return {
             'statusCode': 200,
             'body': json.dumps(analytics)
         }
-        
+
     except Exception as e:
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        }
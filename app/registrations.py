@@ -0,0 +1,344 @@
+from enum import Enum
+from datetime import datetime
+from fastapi import HTTPException
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from .db import events_table, event_participants_table, registration_requests_table, transact_write_items
+from .throttling import is_transaction_conflict
+from .cache import event_cache, get_event_item
+from .models.models import RegistrationStatus
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+class SeatOutcome(str, Enum):
+    CLAIMED = "claimed"
+    FULL = "full"
+    ALREADY_REGISTERED = "already_registered"
+    NOT_FOUND = "not_found"
+
+# A seat is claimed in a single transaction: the event's counter must be
+# below capacity and the participant row must not exist yet. DynamoDB
+# evaluates both atomically, so concurrent registrations can neither
+# overbook nor double-register.
+CLAIM_SEAT_CONDITION = (
+    "attribute_exists(id) "
+    "AND (attribute_not_exists(participant_count) OR participant_count < max_participants)"
+)
+
+def serialize(values: dict) -> dict:
+    return {key: _serializer.serialize(value) for key, value in values.items()}
+
+def deserialize(item: dict) -> dict:
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
+def _condition_failed(reason: dict) -> bool:
+    return reason.get('Code') == 'ConditionalCheckFailed'
+
+async def claim_seat(event_id: str, user_id: str):
+    """Register ``user_id`` for an event in one round trip.
+
+    Returns ``(SeatOutcome, event)`` where ``event`` is the event item as it
+    was when a capacity check failed, and ``None`` otherwise.
+    """
+    try:
+        await transact_write_items(TransactItems=[
+            {
+                'Update': {
+                    'TableName': events_table.name,
+                    'Key': serialize({'id': event_id}),
+                    'UpdateExpression': "ADD participant_count :one",
+                    'ConditionExpression': CLAIM_SEAT_CONDITION,
+                    'ExpressionAttributeValues': serialize({':one': 1}),
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }
+            },
+            {
+                'Put': {
+                    'TableName': event_participants_table.name,
+                    'Item': serialize({
+                        'event_id': event_id,
+                        'user_id': user_id,
+                        'registered_at': datetime.now().isoformat()
+                    }),
+                    'ConditionExpression': "attribute_not_exists(user_id)"
+                }
+            }
+        ])
+        await event_cache.invalidate(event_id)
+        return SeatOutcome.CLAIMED, None
+    except ClientError as e:
+        if is_transaction_conflict(e):
+            # Still contended after transact_write_items' retries
+            raise HTTPException(status_code=503, detail="Event is busy, try again",
+                                headers={"Retry-After": "1"})
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        event_reason, participant_reason = e.response.get('CancellationReasons', [{}, {}])
+        if _condition_failed(participant_reason):
+            return SeatOutcome.ALREADY_REGISTERED, None
+        if not _condition_failed(event_reason):
+            raise
+        if not event_reason.get('Item'):
+            return SeatOutcome.NOT_FOUND, None
+        return SeatOutcome.FULL, deserialize(event_reason['Item'])
+
+async def release_seat(event_id: str, user_id: str):
+    """Give back a seat claimed by ``user_id``; a no-op if the user holds none.
+
+    Any other failure is raised, so callers do not go on as if the seat was freed.
+    """
+    try:
+        await transact_write_items(TransactItems=[
+            {
+                'Delete': {
+                    'TableName': event_participants_table.name,
+                    'Key': serialize({'event_id': event_id, 'user_id': user_id}),
+                    'ConditionExpression': "attribute_exists(user_id)"
+                }
+            },
+            {
+                'Update': {
+                    'TableName': events_table.name,
+                    'Key': serialize({'id': event_id}),
+                    'UpdateExpression': "ADD participant_count :minus_one",
+                    'ExpressionAttributeValues': serialize({':minus_one': -1})
+                }
+            }
+        ])
+        await event_cache.invalidate(event_id)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        participant_reason = e.response.get('CancellationReasons', [{}])[0]
+        if not _condition_failed(participant_reason):
+            raise
+        # No participant row: the seat was already released
+
+async def list_participants(event_id: str, limit: int, exclusive_start_key: dict = None):
+    query_kwargs = {
+        'KeyConditionExpression': "event_id = :event_id",
+        'ExpressionAttributeValues': {':event_id': event_id},
+        'Limit': limit
+    }
+    if exclusive_start_key:
+        query_kwargs['ExclusiveStartKey'] = exclusive_start_key
+    response = await event_participants_table.query(**query_kwargs)
+    return response.get('Items', []), response.get('LastEvaluatedKey')
+
+class BulkOutcome(str, Enum):
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+    NOT_FOUND = "not_found"
+    FULL = "full"
+    ALREADY_REGISTERED = "already_registered"  # The user already holds a seat at the event
+    CONFLICT = "conflict"
+    FAILED = "failed"
+
+TRANSACT_MAX_ITEMS = 100
+# One event counter update plus a participant write and a status update per request
+BULK_CHUNK_SIZE = (TRANSACT_MAX_ITEMS - 1) // 2
+BULK_MAX_ATTEMPTS = 3
+
+def _status_update(request: dict, status: RegistrationStatus) -> dict:
+    # Guarded on the status we read, so a concurrent change is reported, not overwritten
+    return {
+        'Update': {
+            'TableName': registration_requests_table.name,
+            'Key': serialize({'id': request['id']}),
+            'UpdateExpression': "SET #status = :status, updated_at = :now",
+            'ConditionExpression': "#status = :old_status",
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': serialize({
+                ':status': status.value, ':old_status': request['status'], ':now': datetime.now().isoformat()
+            })
+        }
+    }
+
+async def _read_capacity(event_id: str, fresh: bool):
+    if fresh:
+        response = await events_table.get_item(
+            Key={'id': event_id},
+            ProjectionExpression="max_participants, participant_count",
+            ConsistentRead=True
+        )
+        event = response.get('Item')
+    else:
+        event = await get_event_item(event_id)
+    if event is None:
+        return None
+    return int(event['max_participants']), int(event.get('participant_count', 0))
+
+async def _commit_chunk(event_id: str, chunk: list, status: RegistrationStatus, outcomes: dict):
+    """Apply one status change to up to BULK_CHUNK_SIZE requests of a single event in one transaction."""
+    approving = status == RegistrationStatus.APPROVED
+    has_seat = set()   # users already holding a seat (approvals)
+    no_seat = set()    # users holding no seat (releases)
+    pending = list(chunk)
+    fresh = False
+
+    for _ in range(BULK_MAX_ATTEMPTS):
+        if not pending:
+            return
+        items = []
+        seat_requests = []
+
+        if approving:
+            seen_users = set()
+            claims = []
+            for request in pending:
+                if request['user_id'] in seen_users or request['user_id'] in has_seat:
+                    # Approving a second request would not take a second seat
+                    outcomes[request['id']] = BulkOutcome.ALREADY_REGISTERED
+                    continue
+                seen_users.add(request['user_id'])
+                claims.append(request)
+            pending = claims
+            if claims:
+                capacity = await _read_capacity(event_id, fresh)
+                if capacity is not None and len(claims) > capacity[0] - capacity[1] and not fresh:
+                    # The cached count may be stale; only a consistent read may turn requests away
+                    fresh = True
+                    capacity = await _read_capacity(event_id, fresh)
+                if capacity is None:
+                    for request in pending:
+                        outcomes[request['id']] = BulkOutcome.NOT_FOUND
+                    return
+                max_participants, participant_count = capacity
+                available = max(0, max_participants - participant_count)
+                for request in claims[available:]:
+                    outcomes[request['id']] = BulkOutcome.FULL
+                full_ids = {request['id'] for request in claims[available:]}
+                pending = [request for request in pending if request['id'] not in full_ids]
+                seat_requests = claims[:available]
+            if seat_requests:
+                items.append({
+                    'Update': {
+                        'TableName': events_table.name,
+                        'Key': serialize({'id': event_id}),
+                        'UpdateExpression': "ADD participant_count :n",
+                        'ConditionExpression': (
+                            "max_participants = :max "
+                            "AND (attribute_not_exists(participant_count) OR participant_count <= :limit)"
+                        ),
+                        'ExpressionAttributeValues': serialize({
+                            ':n': len(seat_requests),
+                            ':max': max_participants,
+                            ':limit': max_participants - len(seat_requests)
+                        })
+                    }
+                })
+                registered_at = datetime.now().isoformat()
+                for request in seat_requests:
+                    items.append({
+                        'Put': {
+                            'TableName': event_participants_table.name,
+                            'Item': serialize({
+                                'event_id': event_id,
+                                'user_id': request['user_id'],
+                                'registered_at': registered_at
+                            }),
+                            'ConditionExpression': "attribute_not_exists(user_id)"
+                        }
+                    })
+        else:
+            seat_requests = [
+                request for request in pending
+                if request['status'] == RegistrationStatus.APPROVED.value and request['user_id'] not in no_seat
+            ]
+            # Two requests from one user share one participant row
+            seat_requests = list({request['user_id']: request for request in seat_requests}.values())
+            if seat_requests:
+                items.append({
+                    'Update': {
+                        'TableName': events_table.name,
+                        'Key': serialize({'id': event_id}),
+                        'UpdateExpression': "ADD participant_count :n",
+                        'ExpressionAttributeValues': serialize({':n': -len(seat_requests)})
+                    }
+                })
+                for request in seat_requests:
+                    items.append({
+                        'Delete': {
+                            'TableName': event_participants_table.name,
+                            'Key': serialize({'event_id': event_id, 'user_id': request['user_id']}),
+                            'ConditionExpression': "attribute_exists(user_id)"
+                        }
+                    })
+
+        if not pending:
+            return
+        seat_offset = 1 if seat_requests else 0
+        status_offset = len(items)
+        items.extend(_status_update(request, status) for request in pending)
+
+        try:
+            await transact_write_items(TransactItems=items)
+            for request in pending:
+                outcomes[request['id']] = BulkOutcome.UPDATED
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+
+        failed = [index for index, reason in enumerate(reasons) if _condition_failed(reason)]
+        if not failed:
+            continue  # Conflict with another transaction, just retry
+        for index in failed:
+            if index >= status_offset:
+                request = pending[index - status_offset]
+                outcomes[request['id']] = BulkOutcome.CONFLICT
+            elif index >= seat_offset:
+                request = seat_requests[index - seat_offset]
+                (has_seat if approving else no_seat).add(request['user_id'])
+            else:
+                fresh = True  # Capacity moved since we read it
+        conflicted = {request['id'] for request in pending if outcomes.get(request['id']) == BulkOutcome.CONFLICT}
+        pending = [request for request in pending if request['id'] not in conflicted]
+
+    for request in pending:
+        outcomes.setdefault(request['id'], BulkOutcome.FAILED)
+
+async def bulk_update_event_status(event_id: str, requests: list, status: RegistrationStatus) -> dict:
+    """Move every request of one event to ``status``, writing the event once per chunk.
+
+    Returns ``{request_id: BulkOutcome}``.
+    """
+    outcomes = {}
+    changing = []
+    for request in requests:
+        if request['status'] == status.value:
+            outcomes[request['id']] = BulkOutcome.UNCHANGED
+        else:
+            changing.append(request)
+    for start in range(0, len(changing), BULK_CHUNK_SIZE):
+        chunk = changing[start:start + BULK_CHUNK_SIZE]
+        try:
+            await _commit_chunk(event_id, chunk, status, outcomes)
+        except Exception as e:
+            print(f"Error updating registration requests for event {event_id}: {str(e)}")
+            for request in chunk:
+                outcomes.setdefault(request['id'], BulkOutcome.FAILED)
+    await event_cache.invalidate(event_id)
+    return outcomes
+
+def raise_for_bulk_outcome(outcome: BulkOutcome):
+    if outcome == BulkOutcome.NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if outcome == BulkOutcome.ALREADY_REGISTERED:
+        raise HTTPException(status_code=409, detail="Already registered for this event")
+    if outcome == BulkOutcome.FULL:
+        raise HTTPException(status_code=409, detail="Event is full")
+    if outcome == BulkOutcome.CONFLICT:
+        raise HTTPException(status_code=409, detail="Registration request changed, try again")
+    if outcome == BulkOutcome.FAILED:
+        raise HTTPException(status_code=500, detail="Could not update the registration request")
+
+def raise_for_seat_outcome(outcome: SeatOutcome):
+    if outcome == SeatOutcome.NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if outcome == SeatOutcome.ALREADY_REGISTERED:
+        raise HTTPException(status_code=409, detail="Already registered for this event")
+    if outcome == SeatOutcome.FULL:
+        raise HTTPException(status_code=409, detail="Event is full")
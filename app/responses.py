@@ -0,0 +1,18 @@
+"""Fast JSON rendering for DynamoDB items.
+
+orjson serializes datetimes natively; ``json_default`` covers what DynamoDB
+hands back that JSON has no type for (``Decimal`` numbers, sets).
+``FastJSONResponse`` is the app's default response class. Handlers that
+return large lists should return it directly: a plain return value is first
+walked by FastAPI's ``jsonable_encoder``, which costs more than the encoding.
+"""
+import orjson
+from fastapi.responses import JSONResponse
+from .utils import json_default
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
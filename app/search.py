@@ -0,0 +1,141 @@
+"""Event discovery without table scans.
+
+Date ranges and locations are served by the events table's
+``status-date-index`` and ``location-index``. Title and description search
+uses an in-process inverted index: it is built from one scan on first use,
+updated as events are created here, and rebuilt in the background every
+``SEARCH_INDEX_REFRESH_SECONDS`` to pick up events created by other
+processes. A search then only touches the postings of its terms.
+"""
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from .db import events_table, run_io, background_work
+from .utils import collect_pages
+
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', '300'))
+
+# Kept per event so results can be returned without reading the table
+SEARCH_RESULT_FIELDS = ("id", "title", "date", "location", "status", "banner_url")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {"a", "an", "and", "at", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+def tokenize(text: str) -> list:
+    return [token for token in _TOKEN_RE.findall((text or "").lower()) if token not in STOP_WORDS]
+
+def location_key(location: str) -> str:
+    """Normalised location, the partition key of ``location-index``."""
+    return " ".join(tokenize(location))
+
+def _report_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error building the search index: {str(task.exception())}")
+
+class EventSearchIndex:
+    """Inverted index from title and description terms to event ids."""
+
+    def __init__(self, refresh_seconds: float = SEARCH_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._postings = defaultdict(set)
+        self._terms = {}    # event id -> (title terms, description terms)
+        self._results = {}  # event id -> SEARCH_RESULT_FIELDS
+        self._added_during_scan = set()
+        self._built_at = None
+        self._building = None
+
+    def add(self, event: dict):
+        title_terms = set(tokenize(event.get('title')))
+        description_terms = set(tokenize(event.get('description')))
+        with self._lock:
+            self._remove(event['id'])
+            for term in title_terms | description_terms:
+                self._postings[term].add(event['id'])
+            self._terms[event['id']] = (title_terms, description_terms)
+            self._results[event['id']] = {field: event[field] for field in SEARCH_RESULT_FIELDS if field in event}
+            self._added_during_scan.add(event['id'])
+
+    def _remove(self, event_id: str):
+        title_terms, description_terms = self._terms.pop(event_id, (set(), set()))
+        for term in title_terms | description_terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(event_id)
+                if not postings:
+                    del self._postings[term]
+        self._results.pop(event_id, None)
+
+    def remove(self, event_id: str):
+        with self._lock:
+            self._remove(event_id)
+
+    def search(self, query: str, limit: int) -> list:
+        """Events matching every term, title matches first, then by date."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            # Intersect from the rarest term so the work follows the result size
+            postings = sorted((self._postings.get(term, set()) for term in terms), key=len)
+            matches = set(postings[0])
+            for ids in postings[1:]:
+                matches &= ids
+            scored = []
+            for event_id in matches:
+                title_terms, _ = self._terms[event_id]
+                result = self._results[event_id]
+                scored.append((-len(terms & title_terms), result.get('date', ''), result))
+        scored.sort(key=lambda entry: entry[:2])
+        return [dict(result) for _, _, result in scored[:limit]]
+
+    def _load(self):
+        with background_work():
+            return collect_pages(
+                events_table.sync,
+                ProjectionExpression=", ".join(f"#{field}" for field in SEARCH_RESULT_FIELDS + ("description",)),
+                ExpressionAttributeNames={f"#{field}": field for field in SEARCH_RESULT_FIELDS + ("description",)}
+            )
+
+    async def _rebuild(self):
+        started = time.monotonic()
+        with self._lock:
+            self._added_during_scan = set()
+        events = await run_io(self._load)
+        fresh = EventSearchIndex(self.refresh_seconds)
+        for event in events:
+            fresh.add(event)
+        with self._lock:
+            # Events added while the scan ran may be missing from it
+            for event_id in self._added_during_scan:
+                if event_id in self._results and event_id not in fresh._results:
+                    title_terms, description_terms = self._terms[event_id]
+                    for term in title_terms | description_terms:
+                        fresh._postings[term].add(event_id)
+                    fresh._terms[event_id] = self._terms[event_id]
+                    fresh._results[event_id] = self._results[event_id]
+            self._postings, self._terms, self._results = fresh._postings, fresh._terms, fresh._results
+        self._built_at = started
+
+    async def ensure_fresh(self):
+        """Build the index on first use; afterwards refresh it without making callers wait."""
+        if self._built_at is not None and time.monotonic() - self._built_at < self.refresh_seconds:
+            return
+        if self._building is None or self._building.done():
+            self._building = asyncio.ensure_future(self._rebuild())
+            self._building.add_done_callback(_report_failure)
+        if self._built_at is None:
+            await asyncio.shield(self._building)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "events": len(self._results),
+                "terms": len(self._postings),
+                "age_seconds": None if self._built_at is None else time.monotonic() - self._built_at
+            }
+
+search_index = EventSearchIndex()
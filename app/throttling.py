@@ -0,0 +1,317 @@
+"""Client-side admission control for DynamoDB capacity.
+
+Interactive requests and background work (scans, exports, aggregate
+rebuilds) share the same provisioned tables. Consumed capacity is tracked
+per table from DynamoDB's ``ConsumedCapacity``, and background work is
+paced by a token bucket that only gets what interactive traffic leaves
+over of the capacity ``DescribeTable`` reports (on-demand tables are not
+paced unless a budget is set explicitly). Throttled calls are retried with jittered backoff that grows with
+the table's recent throttle rate; once retries are spent the caller gets
+a 429 with ``Retry-After``, and background work on that table pauses until
+then. Interactive calls are never held back by the pause: each one gets
+its own retries.
+"""
+import os
+import math
+import time
+import random
+import asyncio
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from fastapi import HTTPException
+from botocore.exceptions import ClientError
+from .metrics import request_consumed_capacity
+
+CAPACITY_WINDOW_SECONDS = float(os.getenv('CAPACITY_WINDOW_SECONDS', '10'))
+# Background work may use this share of a table's provisioned capacity,
+# minus what interactive requests are using, but never less than the floor
+BACKGROUND_CAPACITY_SHARE = float(os.getenv('BACKGROUND_CAPACITY_SHARE', '0.8'))
+BACKGROUND_CAPACITY_FLOOR = float(os.getenv('BACKGROUND_CAPACITY_FLOOR', '0.1'))
+THROTTLE_MAX_ATTEMPTS = int(os.getenv('THROTTLE_MAX_ATTEMPTS', '4'))
+THROTTLE_BASE_DELAY_SECONDS = float(os.getenv('THROTTLE_BASE_DELAY_SECONDS', '0.05'))
+THROTTLE_MAX_DELAY_SECONDS = float(os.getenv('THROTTLE_MAX_DELAY_SECONDS', '2'))
+RETRY_AFTER_MAX_SECONDS = int(os.getenv('RETRY_AFTER_MAX_SECONDS', '30'))
+# How long a table's described throughput is trusted; auto scaling moves it
+CAPACITY_DESCRIBE_TTL_SECONDS = float(os.getenv('CAPACITY_DESCRIBE_TTL_SECONDS', '300'))
+TRANSACTION_CONFLICT_MAX_ATTEMPTS = int(os.getenv('TRANSACTION_CONFLICT_MAX_ATTEMPTS', '5'))
+
+THROTTLE_ERROR_CODES = {
+    'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'
+}
+# Per-item codes in a TransactionCanceledException
+THROTTLE_REASON_CODES = {'ThrottlingError', 'ProvisionedThroughputExceeded'}
+READ_OPERATIONS = {'GetItem', 'Query', 'Scan', 'BatchGetItem', 'TransactGetItems'}
+
+class CapacityExhausted(HTTPException):
+    """Raised once a table has been throttled past the retry budget."""
+
+    def __init__(self, table: str, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail=f"Capacity for {table} is exhausted, retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.table = table
+        self.retry_after = retry_after
+
+class CapacityTracker:
+    """Sliding-window view of consumed capacity and throttles per table."""
+
+    def __init__(self, window: float = CAPACITY_WINDOW_SECONDS):
+        self.window = window
+        self._lock = threading.Lock()
+        self._consumed = defaultdict(deque)  # (table, kind) -> (time, units, background)
+        self._throttles = defaultdict(deque)  # table -> (time,)
+        self._blocked_until = {}
+        self._provisioned = {}  # table -> (described at, {'read': units, 'write': units})
+        self._describe = None
+
+    def configure(self, describe):
+        """Set how to look up a table: ``describe(table name)`` returns DescribeTable's ``Table``."""
+        self._describe = describe
+        self._provisioned.clear()
+
+    @staticmethod
+    def _throughput(table: dict) -> dict:
+        if table.get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST':
+            return {}
+        throughput = table.get('ProvisionedThroughput', {})
+        return {'read': throughput.get('ReadCapacityUnits') or None,
+                'write': throughput.get('WriteCapacityUnits') or None}
+
+    def provisioned(self, table: str, kind: str):
+        """Provisioned units per second, or None for on-demand and unknown tables.
+
+        Read from the live table, so on-demand tables are not paced at all.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._provisioned.get(table)
+        if cached is None or now - cached[0] > CAPACITY_DESCRIBE_TTL_SECONDS:
+            throughput = {}
+            if self._describe is not None:
+                try:
+                    throughput = self._throughput(self._describe(table))
+                except Exception as e:
+                    # Unpaced until the next lookup; throttles are still retried
+                    print(f"Error describing table {table}: {str(e)}")
+            cached = (now, throughput)
+            with self._lock:
+                self._provisioned[table] = cached
+        return cached[1].get(kind)
+
+    def _trim(self, entries: deque, now: float):
+        cutoff = now - self.window
+        while entries and entries[0][0] < cutoff:
+            entries.popleft()
+
+    def record(self, table: str, kind: str, units: float, background: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            entries = self._consumed[(table, kind)]
+            entries.append((now, units, background))
+            self._trim(entries, now)
+
+    def rate(self, table: str, kind: str, background: bool = None) -> float:
+        """Units per second consumed over the window; ``background`` filters by origin."""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._consumed[(table, kind)]
+            self._trim(entries, now)
+            units = sum(u for _, u, is_background in entries if background is None or is_background == background)
+        return units / self.window
+
+    def record_throttle(self, table: str):
+        now = time.monotonic()
+        with self._lock:
+            throttles = self._throttles[table]
+            throttles.append((now,))
+            self._trim(throttles, now)
+
+    def throttle_count(self, table: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            throttles = self._throttles[table]
+            self._trim(throttles, now)
+            return len(throttles)
+
+    def block(self, table: str, seconds: float):
+        with self._lock:
+            self._blocked_until[table] = max(self._blocked_until.get(table, 0.0), time.monotonic() + seconds)
+
+    def blocked_for(self, tables) -> float:
+        """Seconds until none of ``tables`` is blocked any more."""
+        now = time.monotonic()
+        with self._lock:
+            return max([0.0] + [self._blocked_until.get(table, 0.0) - now for table in tables])
+
+capacity_tracker = CapacityTracker()
+
+_background = threading.local()
+
+@contextmanager
+def background_work():
+    """Mark DynamoDB calls made by this thread as background work for the tracker."""
+    previous = getattr(_background, 'active', False)
+    _background.active = True
+    try:
+        yield
+    finally:
+        _background.active = previous
+
+def in_background() -> bool:
+    return getattr(_background, 'active', False)
+
+def _record_consumed_capacity(parsed, event_name, **kwargs):
+    consumed = (parsed or {}).get('ConsumedCapacity')
+    if not consumed:
+        return
+    operation = event_name.split('.')[2]
+    kind = 'read' if operation in READ_OPERATIONS else 'write'
+    background = in_background()
+    for entry in consumed if isinstance(consumed, list) else [consumed]:
+        capacity_tracker.record(entry.get('TableName', 'unknown'), kind, entry.get('CapacityUnits', 0), background)
+
+def track_capacity(client):
+    """Register the consumed-capacity hooks on a DynamoDB client and return it."""
+    events = client.meta.events
+    # Same handler and id as the metrics hook, so it is registered once
+    events.register('provide-client-params.dynamodb', request_consumed_capacity,
+                    unique_id='metrics-consumed-capacity')
+    events.register('after-call.dynamodb', _record_consumed_capacity, unique_id='throttling-consumed-capacity')
+    return client
+
+class TokenBucket:
+    """Token bucket holding at most one second of tokens.
+
+    ``reserve`` takes tokens immediately, letting the balance go negative,
+    and returns how long the caller should wait before going ahead. A
+    ``rate`` of ``None`` means unlimited.
+    """
+
+    def __init__(self, rate):
+        self._rate = rate
+        self._available = None
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def rate(self):
+        return self._rate
+
+    def reserve(self, units: float) -> float:
+        rate = self.rate()
+        if not rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            if self._available is None:
+                self._available = rate
+            self._available = min(rate, self._available + (now - self._updated) * rate)
+            self._updated = now
+            self._available -= units
+            return max(0.0, -self._available) / rate
+
+    def wait(self, units: float):
+        delay = self.reserve(units)
+        if delay:
+            time.sleep(delay)
+
+    async def wait_async(self, units: float):
+        delay = self.reserve(units)
+        if delay:
+            await asyncio.sleep(delay)
+
+class BackgroundBudget(TokenBucket):
+    """Paces background reads on one table below what interactive traffic leaves free.
+
+    ``units_per_second`` is an optional hard cap; without it and without a
+    known provisioned capacity (on-demand tables) reads are not paced.
+    """
+
+    def __init__(self, table: str, units_per_second: float = 0, kind: str = 'read'):
+        super().__init__(units_per_second or None)
+        self.table = table
+        self.kind = kind
+
+    def rate(self):
+        rates = [self._rate] if self._rate else []
+        provisioned = capacity_tracker.provisioned(self.table, self.kind)
+        if provisioned:
+            interactive = capacity_tracker.rate(self.table, self.kind, background=False)
+            rates.append(max(provisioned * BACKGROUND_CAPACITY_FLOOR,
+                             provisioned * BACKGROUND_CAPACITY_SHARE - interactive))
+        if not rates:
+            return None
+        rate = min(rates)
+        # Back off further while the table is being throttled
+        return rate / (1 + capacity_tracker.throttle_count(self.table))
+
+def is_throttle(error: Exception) -> bool:
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code')
+    if code in THROTTLE_ERROR_CODES:
+        return True
+    if code == 'TransactionCanceledException':
+        return any(reason.get('Code') in THROTTLE_REASON_CODES
+                   for reason in error.response.get('CancellationReasons', []))
+    return False
+
+def is_transaction_conflict(error: Exception) -> bool:
+    """A transaction cancelled only because another one was writing the same items."""
+    if not isinstance(error, ClientError):
+        return False
+    if error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+        return False
+    codes = {reason.get('Code') for reason in error.response.get('CancellationReasons', [])} - {None, 'None'}
+    return codes == {'TransactionConflict'}
+
+def conflict_delay(attempt: int) -> float:
+    """Jittered backoff before retrying a conflicting transaction."""
+    return random.uniform(0, min(THROTTLE_MAX_DELAY_SECONDS, THROTTLE_BASE_DELAY_SECONDS * 2 ** attempt))
+
+def _tables(tables):
+    return (tables,) if isinstance(tables, str) else tuple(tables)
+
+def _backoff_ceiling(tables, attempt: int) -> float:
+    # The ceiling grows with how often these tables were throttled recently
+    pressure = 1 + max(capacity_tracker.throttle_count(table) for table in tables) / 10
+    return min(THROTTLE_MAX_DELAY_SECONDS, THROTTLE_BASE_DELAY_SECONDS * 2 ** attempt * pressure)
+
+def _throttled(tables, attempt: int):
+    """Record a throttle; return the delay before the next attempt, or raise if attempts are spent."""
+    for table in tables:
+        capacity_tracker.record_throttle(table)
+    if attempt + 1 >= THROTTLE_MAX_ATTEMPTS:
+        retry_after = min(RETRY_AFTER_MAX_SECONDS, max(1, math.ceil(_backoff_ceiling(tables, attempt + 1))))
+        for table in tables:
+            capacity_tracker.block(table, retry_after)
+        raise CapacityExhausted(tables[0], retry_after)
+    return random.uniform(0, _backoff_ceiling(tables, attempt))
+
+async def call_with_throttle_retry(tables, call):
+    """Await ``call()`` (a coroutine factory), retrying while DynamoDB throttles."""
+    tables = _tables(tables)
+    if in_background():
+        await asyncio.sleep(capacity_tracker.blocked_for(tables))
+    for attempt in range(THROTTLE_MAX_ATTEMPTS):
+        try:
+            return await call()
+        except ClientError as e:
+            if not is_throttle(e):
+                raise
+            await asyncio.sleep(_throttled(tables, attempt))
+
+def retry_throttled(tables, func, *args, **kwargs):
+    """Blocking counterpart of call_with_throttle_retry, for code running on worker threads."""
+    tables = _tables(tables)
+    if in_background():
+        time.sleep(capacity_tracker.blocked_for(tables))
+    for attempt in range(THROTTLE_MAX_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except ClientError as e:
+            if not is_throttle(e):
+                raise
+            time.sleep(_throttled(tables, attempt))
@@ -0,0 +1,74 @@
+import base64
+import json
+import orjson
+from decimal import Decimal
+from .throttling import retry_throttled
+
+def json_default(value):
+    # DynamoDB hands numbers back as Decimal and string sets as set
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_cursor(last_evaluated_key):
+    """Wrap a DynamoDB LastEvaluatedKey in an opaque, URL-safe continuation token."""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, keys=None) -> dict:
+    """Turn a continuation token back into an ExclusiveStartKey. Raises ValueError if malformed.
+
+    ``keys`` names the key attributes the query or scan pages by; when given,
+    the token must hold exactly those, each a string.
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')), parse_float=Decimal)
+    if not isinstance(key, dict) or not key:
+        raise ValueError("Invalid cursor")
+    if keys is not None and (set(key) != set(keys) or not all(isinstance(value, str) for value in key.values())):
+        raise ValueError("Invalid cursor")
+    return key
+
+def scan_pages(table, **scan_kwargs):
+    """Yield the Items of each scan page, following LastEvaluatedKey to the end of the table.
+
+    Throttled pages are retried; past the retry budget CapacityExhausted (a 429) is raised.
+    """
+    while True:
+        response = retry_throttled(table.name, table.scan, **scan_kwargs)
+        yield response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+def collect_pages(table, **scan_kwargs):
+    items = []
+    for page in scan_pages(table, **scan_kwargs):
+        items.extend(page)
+    return items
+
+def projection_kwargs(fields: str, allowed) -> dict:
+    """Turn a ``fields=a,b`` parameter into ProjectionExpression arguments.
+
+    ``id`` is always included. Raises ValueError naming any field not in ``allowed``.
+    """
+    names = list(dict.fromkeys(['id'] + [name.strip() for name in fields.split(',') if name.strip()]))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Placeholders for every name, since many (date, status, location) are reserved words
+    return {
+        'ProjectionExpression': ", ".join(f"#f{i}" for i in range(len(names))),
+        'ExpressionAttributeNames': {f"#f{i}": name for i, name in enumerate(names)}
+    }
+
+def iter_ndjson(pages):
+    """Serialize pages of items as newline-delimited JSON, one page at a time."""
+    for items in pages:
+        if items:
+            yield b''.join(orjson.dumps(item, default=json_default) + b'\n' for item in items)
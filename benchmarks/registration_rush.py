@@ -0,0 +1,504 @@
+"""Load benchmark for the registration rush: many users registering for one event at once.
+
+Scenarios:
+
+* ``storm``: concurrent ``POST /events/{id}/register-request`` for more users than
+  there are seats, some of them retrying, mixed with event detail reads
+* ``browse``: event detail reads, paginated listing and participant pages over a catalog
+* ``triage``: organizer single and bulk approve/reject of registration requests, alongside
+  paging through the event's requests by status
+* ``analytics``: the registration counters and the NDJSON export
+
+By default the app runs in-process over ASGI with ``AWS_BACKEND=local``, so
+nothing touches AWS. ``--base-url`` drives a running server instead, e.g. one
+started with ``AWS_BACKEND=local uvicorn app.main:app``; the organizer
+scenarios then need an organizer ID token in ``--organizer-token``. Latency
+is reported per endpoint (p50/p95/p99) with throughput, error rate and
+overbooking, and the results are written as JSON that ``--compare`` can diff
+against. The exit status is 1 on overbooking, on any 5xx answer, or when a
+scenario's error rate exceeds ``--max-error-rate``.
+Needs ``httpx`` in addition to the app's requirements:
+
+    python -m benchmarks.registration_rush --users 2000 --seats 500 --latency-ms 5
+    python -m benchmarks.registration_rush --scenario storm --compare benchmarks/results/previous.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ("storm", "browse", "triage", "analytics")
+ORGANIZER_SCENARIOS = ("triage", "analytics")
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class Recorder:
+    """Collects latency and status codes per endpoint label."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, label, status, elapsed):
+        self.latencies[label].append(elapsed * 1000)
+        self.statuses[label][status] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        duration = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        total = errors = server_errors = 0
+        for label, latencies in self.latencies.items():
+            latencies.sort()
+            statuses = self.statuses[label]
+            count = len(latencies)
+            # 4xx answers such as "Event is full" are expected outcomes; 5xx and transport failures are not
+            failed = sum(n for status, n in statuses.items() if status == "error" or int(status) >= 500)
+            total += count
+            errors += failed
+            server_errors += sum(n for status, n in statuses.items() if status != "error" and int(status) >= 500)
+            endpoints[label] = {
+                "requests": count,
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "max_ms": round(latencies[-1], 2),
+                "error_rate": round(failed / count, 4),
+                "statuses": {str(status): n for status, n in sorted(statuses.items(), key=lambda s: str(s[0]))}
+            }
+        return {
+            "duration_s": round(duration, 3),
+            "requests": total,
+            "throughput_rps": round(total / duration, 1) if duration else None,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "server_errors": server_errors,
+            "endpoints": endpoints
+        }
+
+class Bench:
+    def __init__(self, client, args, local_backend=None):
+        self.client = client
+        self.args = args
+        self.local_backend = local_backend
+        self.random = random.Random(args.seed)
+        self.organizer_id = "benchmark-organizer"
+        self.organizer_headers = {}
+
+    async def request(self, recorder, label, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            if recorder:
+                recorder.record(label, "error", time.perf_counter() - started)
+            return None
+        if recorder:
+            recorder.record(label, response.status_code, time.perf_counter() - started)
+        return response
+
+    async def run(self, jobs):
+        """Run job coroutines with at most ``--concurrency`` in flight."""
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def bounded(job):
+            async with semaphore:
+                return await job
+
+        return await asyncio.gather(*(bounded(job) for job in jobs))
+
+    def participant_headers(self, user_id):
+        # get_current_user reads the claims without verifying the signature
+        import jwt
+        token = jwt.encode(
+            {"sub": user_id, "email": f"{user_id}@example.com", "custom:role": "participant"},
+            "benchmark", algorithm="HS256"
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    async def sign_in_organizer(self):
+        if self.args.organizer_token:
+            self.organizer_headers = {"Authorization": f"Bearer {self.args.organizer_token}"}
+            return
+        if self.local_backend is None:
+            return
+        email, password = "organizer@example.com", "Benchmark-Passw0rd"
+        response = await self.client.post(
+            "/auth/signup", json={"email": email, "password": password, "role": "organizer"}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Organizer sign-up failed: {response.text}")
+        # Sign-in only returns the access token; the role claim lives in the ID token
+        cognito = self.local_backend.cognito
+        tokens = cognito.issue_tokens(email, os.environ["COGNITO_USER_POOL_CLIENT_ID"])
+        self.organizer_id = cognito.users[email]["sub"]
+        self.organizer_headers = {"Authorization": f"Bearer {tokens['IdToken']}"}
+
+    async def create_events(self, count, max_participants):
+        start = datetime(2030, 1, 1)
+        rows = [
+            {
+                "title": f"Benchmark event {i}",
+                "description": "Registration rush benchmark",
+                "date": (start + timedelta(days=i % 365)).isoformat(),
+                "location": f"Venue {i % 20}",
+                "max_participants": max_participants,
+                "organizer_id": self.organizer_id
+            }
+            for i in range(count)
+        ]
+        event_ids = []
+        for offset in range(0, count, 1000):
+            response = await self.client.post("/events/bulk", json=rows[offset:offset + 1000])
+            response.raise_for_status()
+            event_ids.extend(result["id"] for result in response.json()["results"] if result["status"] == "created")
+        return event_ids
+
+    def registration_body(self, user_id):
+        return {
+            "full_name": f"User {user_id}",
+            "email": f"{user_id}@example.com",
+            "college_name": f"College {self.random.randrange(25)}",
+            "year_of_study": str(self.random.randint(1, 4)),
+            "phone_number": "0000000000",
+            "why_interested": "Benchmark"
+        }
+
+    async def register(self, recorder, event_id, user_id):
+        response = await self.request(
+            recorder, "POST /events/{id}/register-request", "POST", f"/events/{event_id}/register-request",
+            json=self.registration_body(user_id), headers=self.participant_headers(user_id)
+        )
+        # 202 when the admission queue is on: the seat is granted later
+        if response is not None and response.status_code in (200, 202):
+            return response.json()["request_id"]
+        return None
+
+    async def count_participants(self, event_id):
+        count, cursor = 0, None
+        while True:
+            params = {"limit": 1000, **({"cursor": cursor} if cursor else {})}
+            response = await self.client.get(f"/events/{event_id}/participants", params=params)
+            response.raise_for_status()
+            page = response.json()
+            count += len(page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return count
+
+async def storm(bench):
+    args = bench.args
+    event_id, = await bench.create_events(1, args.seats)
+    users = [f"user-{i}" for i in range(args.users)]
+    # Impatient users press the button again
+    attempts = users + bench.random.sample(users, int(len(users) * args.retry_rate))
+    bench.random.shuffle(attempts)
+
+    recorder = Recorder()
+    jobs = [bench.register(recorder, event_id, user_id) for user_id in attempts]
+    jobs += [
+        bench.request(recorder, "GET /events/events/{id}", "GET", f"/events/events/{event_id}")
+        for _ in range(int(len(attempts) * args.reads_per_registration))
+    ]
+    bench.random.shuffle(jobs)
+    request_ids = [request_id for request_id in await bench.run(jobs) if isinstance(request_id, str)]
+    recorder.stop()
+
+    participants = await bench.count_participants(event_id)
+    event = (await bench.client.get(f"/events/events/{event_id}")).json()
+    result = recorder.summary()
+    result["registrations"] = {
+        "seats": args.seats,
+        "attempts": len(attempts),
+        "accepted": len(request_ids),
+        "participants": participants,
+        "participant_count": int(event.get("participant_count", 0)),
+        "overbooked": max(0, participants - args.seats, len(request_ids) - args.seats),
+        "count_drift": int(event.get("participant_count", 0)) - participants
+    }
+    bench.storm_event = (event_id, request_ids)
+    return result
+
+async def browse(bench):
+    args = bench.args
+    event_ids = await bench.create_events(args.catalog_events, args.seats)
+    recorder = Recorder()
+
+    async def walk_listing():
+        cursor = None
+        for _ in range(args.list_pages):
+            params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+            response = await bench.request(recorder, "GET /events/?limit", "GET", "/events/", params=params)
+            if response is None or response.status_code != 200:
+                return
+            cursor = response.json()["next_cursor"]
+            if not cursor:
+                return
+
+    jobs = []
+    for _ in range(args.browse_requests):
+        roll = bench.random.random()
+        event_id = bench.random.choice(event_ids)
+        if roll < 0.6:
+            jobs.append(bench.request(recorder, "GET /events/events/{id}", "GET", f"/events/events/{event_id}"))
+        elif roll < 0.9:
+            jobs.append(walk_listing())
+        else:
+            jobs.append(bench.request(
+                recorder, "GET /events/{id}/participants", "GET", f"/events/{event_id}/participants",
+                params={"limit": 100}
+            ))
+    await bench.run(jobs)
+    recorder.stop()
+    return recorder.summary()
+
+async def triage(bench):
+    args = bench.args
+    if getattr(bench, "storm_event", None):
+        event_id, request_ids = bench.storm_event
+    else:
+        event_id, = await bench.create_events(1, args.seats)
+        request_ids = await bench.run([
+            bench.register(None, event_id, f"triage-user-{i}") for i in range(args.seats)
+        ])
+        request_ids = [request_id for request_id in request_ids if request_id]
+
+    recorder = Recorder()
+    request_ids = list(request_ids)
+    bench.random.shuffle(request_ids)
+    single = request_ids[:args.triage_single]
+    bulk = request_ids[args.triage_single:]
+
+    jobs = [
+        bench.request(
+            recorder, "PUT /events/registration-requests/{id}", "PUT",
+            f"/events/registration-requests/{request_id}",
+            params={"status": bench.random.choice(["REJECTED", "APPROVED"])},
+            headers=bench.organizer_headers
+        )
+        for request_id in single
+    ]
+    jobs += [
+        bench.request(
+            recorder, "PUT /events/registration-requests/bulk-status", "PUT",
+            "/events/registration-requests/bulk-status",
+            json={"request_ids": bulk[offset:offset + args.triage_batch], "status": "REJECTED"},
+            headers=bench.organizer_headers
+        )
+        for offset in range(0, len(bulk), args.triage_batch)
+    ]
+
+    async def walk_requests(status):
+        # The organizer's triage view: one event's requests of one status, page by page
+        cursor = None
+        while True:
+            params = {"status": status, "limit": 100, **({"cursor": cursor} if cursor else {})}
+            response = await bench.request(
+                recorder, "GET /events/{id}/registration-requests", "GET",
+                f"/events/{event_id}/registration-requests", params=params, headers=bench.organizer_headers
+            )
+            if response is None or response.status_code != 200:
+                return
+            cursor = response.json()["next_cursor"]
+            if not cursor:
+                return
+
+    jobs += [walk_requests(status) for status in ("APPROVED", "REJECTED")]
+    await bench.run(jobs)
+    recorder.stop()
+
+    participants = await bench.count_participants(event_id)
+    result = recorder.summary()
+    result["registrations"] = {"seats": args.seats, "participants": participants,
+                               "overbooked": max(0, participants - args.seats)}
+    return result
+
+async def analytics(bench):
+    args = bench.args
+    event_id = bench.storm_event[0] if getattr(bench, "storm_event", None) else None
+    recorder = Recorder()
+
+    async def export():
+        label = "GET /events/registration-requests/export"
+        started = time.perf_counter()
+        try:
+            async with bench.client.stream(
+                "GET", "/events/registration-requests/export", headers=bench.organizer_headers
+            ) as response:
+                async for _ in response.aiter_lines():
+                    pass
+            recorder.record(label, response.status_code, time.perf_counter() - started)
+        except Exception:
+            recorder.record(label, "error", time.perf_counter() - started)
+
+    jobs = []
+    for i in range(args.analytics_requests):
+        params = {"event_id": event_id} if event_id and i % 2 else {}
+        jobs.append(bench.request(
+            recorder, "GET /events/analytics/registrations", "GET", "/events/analytics/registrations",
+            params=params, headers=bench.organizer_headers
+        ))
+    jobs += [export() for _ in range(args.exports)]
+    await bench.run(jobs)
+    recorder.stop()
+    return recorder.summary()
+
+SCENARIO_FUNCTIONS = {"storm": storm, "browse": browse, "triage": triage, "analytics": analytics}
+
+def configure_local_environment(args):
+    """Point the in-process app at the local stand-ins; must run before ``app`` is imported."""
+    os.environ["AWS_BACKEND"] = "local"
+    os.environ["LOCAL_BACKEND_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["LOCAL_BACKEND_LATENCY_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["LOCAL_BACKEND_SEED"] = str(args.seed)
+    for name, value in {
+        "AWS_REGION": "us-east-1",
+        "DYNAMODB_EVENTS_TABLE": "events",
+        "COGNITO_USER_POOL_ID": "local-pool",
+        "COGNITO_USER_POOL_CLIENT_ID": "local-client",
+        "COGNITO_CLIENT_SECRET": "local-secret",
+        "SNS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:local"
+    }.items():
+        os.environ.setdefault(name, value)
+
+async def run_benchmark(args):
+    import httpx
+
+    local_backend = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        app = None
+    else:
+        configure_local_environment(args)
+        sys.path.insert(0, ROOT)
+        from app.main import app
+        from app.local_backend import get_local_backend
+        local_backend = get_local_backend()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark",
+                                   timeout=args.timeout)
+        # ASGITransport does not send lifespan events
+        await app.router.startup()
+
+    results = {}
+    try:
+        bench = Bench(client, args, local_backend)
+        await bench.sign_in_organizer()
+        for name in args.scenario:
+            if local_backend is not None:
+                local_backend.calls.clear()
+            results[name] = await SCENARIO_FUNCTIONS[name](bench)
+            if local_backend is not None:
+                results[name]["backend_calls"] = dict(local_backend.calls)
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+        await client.aclose()
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def print_report(results, previous=None):
+    for name, result in results.items():
+        print(f"\n{name}: {result['requests']} requests in {result['duration_s']} s, "
+              f"{result['throughput_rps']} req/s, error rate {result['error_rate']:.2%}")
+        if "registrations" in result:
+            print(f"  registrations: {result['registrations']}")
+        baseline = (previous or {}).get(name, {}).get("endpoints", {})
+        for label, endpoint in result["endpoints"].items():
+            line = (f"  {label:<48} n={endpoint['requests']:<6} p50={endpoint['p50_ms']:>8.2f} "
+                    f"p95={endpoint['p95_ms']:>8.2f} p99={endpoint['p99_ms']:>8.2f} ms")
+            if label in baseline:
+                change = endpoint["p95_ms"] - baseline[label]["p95_ms"]
+                line += f"  (p95 {change:+.2f} ms vs baseline)"
+            print(line)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run, repeatable (default: all, in order)")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--organizer-token", help="Bearer token for the organizer routes with --base-url")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--retry-rate", type=float, default=0.1, help="Share of users who submit twice")
+    parser.add_argument("--reads-per-registration", type=float, default=1.0)
+    parser.add_argument("--catalog-events", type=int, default=200)
+    parser.add_argument("--browse-requests", type=int, default=2000)
+    parser.add_argument("--list-pages", type=int, default=3)
+    parser.add_argument("--triage-single", type=int, default=100)
+    parser.add_argument("--triage-batch", type=int, default=100)
+    parser.add_argument("--analytics-requests", type=int, default=500)
+    parser.add_argument("--exports", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated AWS latency per call (local backend)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/registration_rush-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare p95 latency against")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail when a scenario's share of transport errors and 5xx answers exceeds this")
+    args = parser.parse_args(argv)
+    args.scenario = args.scenario or list(SCENARIOS)
+    if args.base_url and not args.organizer_token and set(args.scenario) & set(ORGANIZER_SCENARIOS):
+        parser.error(f"--organizer-token is required to run {', '.join(ORGANIZER_SCENARIOS)} against --base-url")
+
+    results = asyncio.run(run_benchmark(args))
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["scenarios"]
+    print_report(results, previous)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"registration_rush-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "revision": git_revision(),
+            "created_at": datetime.now().isoformat(),
+            "config": vars(args),
+            "scenarios": results
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    failed = False
+    for name, result in results.items():
+        if result.get("registrations", {}).get("overbooked"):
+            print(f"{name}: overbooking detected")
+            failed = True
+        if result["server_errors"]:
+            print(f"{name}: {result['server_errors']} server errors")
+            failed = True
+        if result["error_rate"] > args.max_error_rate:
+            print(f"{name}: error rate {result['error_rate']:.2%} is above {args.max_error_rate:.2%}")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
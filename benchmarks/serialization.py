@@ -0,0 +1,112 @@
+"""Micro-benchmark for rendering DynamoDB items as a JSON response.
+
+Builds registration-request-shaped items with ``Decimal`` numbers, string
+sets and datetimes, then times each way of turning the list into response
+bytes:
+
+* ``jsonable_encoder``: FastAPI's path for a plain return value, the walk
+  through ``jsonable_encoder`` followed by ``JSONResponse``
+* ``json.dumps``: the standard library with ``json_default``
+* ``FastJSONResponse``: orjson, as used by the app by default
+
+    python -m benchmarks.serialization --items 10000 --repeat 20
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.responses import FastJSONResponse
+from app.utils import json_default
+
+def make_items(count: int) -> list:
+    created = datetime(2030, 1, 1)
+    return [
+        {
+            "id": f"request-{i:06d}",
+            "event_id": f"event-{i % 50:03d}",
+            "user_id": f"user-{i:06d}",
+            "status": ("PENDING", "APPROVED", "REJECTED")[i % 3],
+            "created_at": created + timedelta(seconds=i),
+            "full_name": f"User {i}",
+            "email": f"user{i}@example.com",
+            "college_name": f"College {i % 25}",
+            "year_of_study": str(1 + i % 4),
+            "phone_number": "0000000000",
+            "why_interested": "Looking forward to the tournament and meeting the other teams.",
+            "max_participants": Decimal(500),
+            "participant_count": Decimal(i % 500),
+            "rating": Decimal("4.5"),
+            "tags": {"football", "outdoor", f"group-{i % 7}"}
+        }
+        for i in range(count)
+    ]
+
+def _stdlib_default(value):
+    # json_default leaves datetimes to orjson; the standard library needs them spelled out
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return json_default(value)
+
+def _jsonable_encoder(items) -> bytes:
+    return JSONResponse(content=jsonable_encoder(items)).body
+
+def _json_dumps(items) -> bytes:
+    return json.dumps(items, default=_stdlib_default).encode("utf-8")
+
+def _fast_json(items) -> bytes:
+    return FastJSONResponse(content=items).body
+
+RENDERERS = {
+    "jsonable_encoder": _jsonable_encoder,
+    "json.dumps": _json_dumps,
+    "FastJSONResponse": _fast_json
+}
+
+def time_renderer(render, items, repeat: int) -> list:
+    render(items)  # Warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(items)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    items = make_items(args.items)
+    if json.loads(_fast_json(items)) != json.loads(_json_dumps(items)):
+        print("FastJSONResponse output differs from json.dumps")
+        return 1
+
+    results = {"items": args.items, "repeat": args.repeat, "renderers": {}}
+    for name, render in RENDERERS.items():
+        timings = time_renderer(render, items, args.repeat)
+        results["renderers"][name] = {
+            "median_ms": statistics.median(timings),
+            "min_ms": min(timings),
+            "bytes": len(render(items))
+        }
+
+    reference = results["renderers"]["jsonable_encoder"]["median_ms"]
+    print(f"{args.items} items, median of {args.repeat} runs")
+    for name, result in results["renderers"].items():
+        print(f"  {name:<18} {result['median_ms']:8.1f} ms  ({reference / result['median_ms']:.1f}x)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
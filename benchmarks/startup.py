@@ -0,0 +1,108 @@
+"""Cold-start benchmark for the Lambda entry point.
+
+Each run starts a fresh interpreter, imports ``lambda_handler`` and sends one
+API Gateway (HTTP API v2) request for ``GET /`` through the Mangum handler.
+The median import time and first-request latency are compared against a
+budget, and the script exits non-zero when either is exceeded:
+
+    python -m benchmarks.startup --runs 5 --import-budget-ms 1500 --first-request-budget-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, time
+started = time.perf_counter()
+import lambda_handler
+imported = time.perf_counter()
+
+event = {
+    "version": "2.0",
+    "routeKey": "$default",
+    "rawPath": "/",
+    "rawQueryString": "",
+    "headers": {"host": "localhost", "accept": "application/json"},
+    "requestContext": {
+        "accountId": "000000000000",
+        "apiId": "benchmark",
+        "domainName": "localhost",
+        "http": {"method": "GET", "path": "/", "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1", "userAgent": "benchmark"},
+        "requestId": "benchmark",
+        "routeKey": "$default",
+        "stage": "$default",
+        "time": "01/Jan/2024:00:00:00 +0000",
+        "timeEpoch": 1704067200000
+    },
+    "isBase64Encoded": False
+}
+
+class Context:
+    function_name = "benchmark"
+    aws_request_id = "benchmark"
+
+response = lambda_handler.handler(event, Context())
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (finished - imported) * 1000,
+    "status": response["statusCode"]
+}))
+'''
+
+def probe_once() -> dict:
+    env = dict(os.environ)
+    # Placeholder configuration: the probe must never need real AWS
+    env.setdefault("AWS_REGION", "us-east-1")
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    env.setdefault("DYNAMODB_EVENTS_TABLE", "events")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float,
+                        default=float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--first-request-budget-ms", type=float,
+                        default=float(os.getenv("STARTUP_FIRST_REQUEST_BUDGET_MS", "150")))
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    runs = [probe_once() for _ in range(args.runs)]
+    if any(run["status"] != 200 for run in runs):
+        print(f"First request failed: {runs}")
+        return 1
+
+    results = {
+        "runs": runs,
+        "import_ms_median": statistics.median(run["import_ms"] for run in runs),
+        "first_request_ms_median": statistics.median(run["first_request_ms"] for run in runs),
+        "import_budget_ms": args.import_budget_ms,
+        "first_request_budget_ms": args.first_request_budget_ms
+    }
+    print(f"import:        {results['import_ms_median']:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"first request: {results['first_request_ms_median']:.1f} ms (budget {args.first_request_budget_ms:.0f} ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    over_budget = (
+        results["import_ms_median"] > args.import_budget_ms
+        or results["first_request_ms_median"] > args.first_request_budget_ms
+    )
+    if over_budget:
+        print("Startup budget exceeded")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,21 @@
 from mangum import Mangum
-import os
-
-# Set environment variable before importing FastAPI app
-os.environ['LAMBDA_RUNTIME'] = '1'
-
 from app.main import app
+from app.metrics import flush_emf
+from app.admission import handle_sqs_event
 
 # Create handler for Lambda
-handler = Mangum(app, lifespan="off")
\ No newline at end of file
+asgi_handler = Mangum(app, lifespan="off")
+
+def handler(event, context):
+    try:
+        return asgi_handler(event, context)
+    finally:
+        # Metrics recorded during the invocation go out as EMF log lines
+        flush_emf()
+
+def admission_handler(event, context):
+    """Triggered by the admission queue; needs ReportBatchItemFailures on the event source mapping."""
+    try:
+        return handle_sqs_event(event)
+    finally:
+        flush_emf()
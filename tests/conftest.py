@@ -0,0 +1,83 @@
+import os
+
+# The tests run against the in-memory AWS stand-ins (app/local_backend.py).
+# Set before anything under app/ is imported, and before its load_dotenv().
+os.environ.update({
+    "AWS_BACKEND": "local",
+    "AWS_REGION": "us-east-1",
+    "DYNAMODB_EVENTS_TABLE": "events",
+    "COGNITO_USER_POOL_ID": "local-pool",
+    "COGNITO_USER_POOL_CLIENT_ID": "local-client",
+    "COGNITO_CLIENT_SECRET": "local-secret",
+    "SNS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:local",
+    "NOTIFICATION_PUBLISHER": "local",
+    "ADMISSION_QUEUE": "off"
+})
+
+from uuid import uuid4
+import pytest
+from botocore.exceptions import ClientError
+from app import db
+from app.local_backend import get_local_backend
+from app.db import events_table, get_dynamodb
+
+@pytest.fixture(autouse=True)
+def backend():
+    backend = get_local_backend()
+    backend.reset(latency_ms=0, jitter_ms=0)
+    return backend
+
+@pytest.fixture
+def make_event(backend):
+    def make_event(max_participants: int = 10, **attributes) -> str:
+        event_id = str(uuid4())
+        events_table.sync.put_item(Item={
+            "id": event_id,
+            "title": "Test event",
+            "description": "Test",
+            "date": "2030-01-01T10:00:00",
+            "location": "Main field",
+            "organizer_id": "organizer",
+            "max_participants": max_participants,
+            "participant_count": 0,
+            "status": "upcoming",
+            **attributes
+        })
+        return event_id
+    return make_event
+
+@pytest.fixture
+def sign_in(backend):
+    def sign_in(role: str):
+        """Sign up a user with ``role`` and return its id and a Bearer header with its ID token."""
+        email = f"{uuid4().hex}@example.com"
+        client_id = os.environ["COGNITO_USER_POOL_CLIENT_ID"]
+        backend.cognito.sign_up(
+            ClientId=client_id, Username=email, Password="Passw0rd!",
+            UserAttributes=[{"Name": "email", "Value": email}, {"Name": "custom:role", "Value": role}]
+        )
+        tokens = backend.cognito.issue_tokens(email, client_id)
+        return backend.cognito.users[email]["sub"], {"Authorization": f"Bearer {tokens['IdToken']}"}
+    return sign_in
+
+def conflict(items: int) -> ClientError:
+    return ClientError({
+        "Error": {"Code": "TransactionCanceledException", "Message": "Transaction cancelled"},
+        "CancellationReasons": [{"Code": "TransactionConflict"}] + [{"Code": "None"}] * (items - 1)
+    }, "TransactWriteItems")
+
+@pytest.fixture
+def conflicts(monkeypatch):
+    """Make the next ``conflicts.remaining`` transactions fail with TransactionConflict."""
+    client = get_dynamodb().meta.client
+    transact = client.transact_write_items
+
+    def flaky(TransactItems, **kwargs):
+        if flaky.remaining:
+            flaky.remaining -= 1
+            raise conflict(len(TransactItems))
+        return transact(TransactItems=TransactItems, **kwargs)
+    flaky.remaining = 0
+    monkeypatch.setattr(client, "transact_write_items", flaky)
+    monkeypatch.setattr(db, "conflict_delay", lambda attempt: 0)
+    return flaky
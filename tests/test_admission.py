@@ -0,0 +1,68 @@
+import asyncio
+from uuid import uuid4
+from datetime import datetime
+import pytest
+from app.db import registration_requests_table
+from app.models.models import RegistrationStatus
+from app.registrations import BulkOutcome, claim_seat
+from app.admission import admit, cancel
+from tests.test_local_backend import participant_count
+
+def add_request(event_id: str, user_id: str, status=RegistrationStatus.QUEUED) -> dict:
+    request = {
+        "id": str(uuid4()),
+        "event_id": event_id,
+        "user_id": user_id,
+        "status": status,
+        "created_at": datetime.now().isoformat(),
+        "email": f"{user_id}@example.com"
+    }
+    registration_requests_table.sync.put_item(Item=request)
+    return request
+
+def status_of(request: dict) -> str:
+    return registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]["status"]
+
+def test_admits_in_arrival_order(make_event):
+    event_id = make_event(max_participants=1)
+    first, second = add_request(event_id, "user-1"), add_request(event_id, "user-2")
+    outcomes = asyncio.run(admit(event_id, [second["id"], first["id"]]))
+    assert outcomes == {first["id"]: BulkOutcome.UPDATED, second["id"]: BulkOutcome.FULL}
+    assert [status_of(first), status_of(second)] == ["APPROVED", "WAITLISTED"]
+
+def test_rejects_a_second_request_from_one_user(make_event):
+    event_id = make_event(max_participants=5)
+    first, second = add_request(event_id, "user-1"), add_request(event_id, "user-1")
+    outcomes = asyncio.run(admit(event_id, [first["id"], second["id"]]))
+
+    assert outcomes == {first["id"]: BulkOutcome.UPDATED, second["id"]: BulkOutcome.ALREADY_REGISTERED}
+    assert [status_of(first), status_of(second)] == ["APPROVED", "REJECTED"]
+    assert participant_count(event_id) == 1
+
+def test_rejects_a_request_from_a_seated_user(make_event):
+    event_id = make_event(max_participants=5)
+    asyncio.run(claim_seat(event_id, "user-1"))
+    request = add_request(event_id, "user-1")
+    outcomes = asyncio.run(admit(event_id, [request["id"]]))
+
+    assert outcomes == {request["id"]: BulkOutcome.ALREADY_REGISTERED}
+    assert status_of(request) == "REJECTED"
+    assert participant_count(event_id) == 1
+
+def test_cancel_gives_the_seat_back(make_event):
+    event_id = make_event()
+    asyncio.run(claim_seat(event_id, "user-1"))
+    request = add_request(event_id, "user-1", RegistrationStatus.APPROVED)
+    assert asyncio.run(cancel(registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]))
+    assert status_of(request) == "CANCELLED"
+    assert participant_count(event_id) == 0
+
+def test_cancel_keeps_the_status_when_the_seat_stays(make_event, conflicts):
+    event_id = make_event()
+    asyncio.run(claim_seat(event_id, "user-1"))
+    request = add_request(event_id, "user-1", RegistrationStatus.APPROVED)
+    conflicts.remaining = 100
+    with pytest.raises(RuntimeError):
+        asyncio.run(cancel(registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]))
+    assert status_of(request) == "APPROVED"
+    assert participant_count(event_id) == 1
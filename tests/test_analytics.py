@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from app import analytics
+from app.analytics import (
+    record_registration, record_status_change, apply_deltas, get_aggregates, rebuild_aggregates,
+    report_aggregate_error, aggregate_update_errors, DIMENSION_VALUE_MAX_LENGTH
+)
+from app.db import registration_aggregates_table, registration_counters_table, registration_requests_table
+
+def registration(event_id: str, request_id: str, college: str, year: str = "2", status: str = "PENDING") -> dict:
+    return {"id": request_id, "event_id": event_id, "user_id": request_id, "status": status,
+            "college_name": college, "year_of_study": year}
+
+def test_counts_by_dimension(make_event):
+    event_id = make_event()
+    asyncio.run(record_registration(registration(event_id, "r1", "North College")))
+    asyncio.run(record_registration(registration(event_id, "r2", "  North   College ", year="3")))
+    asyncio.run(record_registration(registration(event_id, "r3", "", year="3")))
+    asyncio.run(record_status_change({"event_id": event_id}, "PENDING", "APPROVED"))
+
+    aggregates = asyncio.run(get_aggregates(event_id))
+    assert aggregates["total_registrations"] == 3
+    assert aggregates["status_distribution"] == {"PENDING": 2, "APPROVED": 1}
+    assert aggregates["college_distribution"] == {"North College": 2, "unknown": 1}
+    assert aggregates["year_distribution"] == {"2": 1, "3": 2}
+    assert asyncio.run(get_aggregates())["total_registrations"] == 3
+
+def test_free_text_values_stay_out_of_the_aggregates_item(make_event):
+    event_id = make_event()
+    for i in range(50):
+        asyncio.run(record_registration(registration(event_id, f"r{i}", f"College {i}" + "x" * 500)))
+
+    item = registration_aggregates_table.sync.get_item(Key={"id": analytics.event_scope(event_id)})["Item"]
+    assert not [attribute for attribute in item if attribute.startswith(("college#", "year#"))]
+    colleges = asyncio.run(get_aggregates(event_id))["college_distribution"]
+    assert len(colleges) == 50
+    assert max(len(college) for college in colleges) == DIMENSION_VALUE_MAX_LENGTH
+
+def test_rebuild_drops_stale_counters(make_event):
+    event_id = make_event()
+    request = registration(event_id, "r1", "North College")
+    registration_requests_table.sync.put_item(Item=request)
+    asyncio.run(record_registration(request))
+    asyncio.run(record_registration(registration(event_id, "gone", "South College")))
+
+    rebuild_aggregates()
+    aggregates = asyncio.run(get_aggregates(event_id))
+    assert aggregates["total_registrations"] == 1
+    assert aggregates["college_distribution"] == {"North College": 1}
+
+def test_failed_updates_are_reported(make_event, monkeypatch, caplog):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("table unavailable")
+    monkeypatch.setattr(registration_counters_table, "update_item", fail)
+    event_id = make_event()
+    with pytest.raises(RuntimeError):
+        asyncio.run(apply_deltas(event_id, {"college#North College": 1}))
+
+    before = sum(aggregate_update_errors._values.values())
+    report_aggregate_error(event_id, RuntimeError("table unavailable"))
+    assert sum(aggregate_update_errors._values.values()) == before + 1
+    assert event_id in caplog.text
+    assert "table unavailable" in caplog.text
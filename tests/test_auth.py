@@ -0,0 +1,38 @@
+import os
+from uuid import uuid4
+import pytest
+
+pytest.importorskip("sports_event_utils")  # Imported by app/auth.py
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+def make_user(backend, groups=()) -> dict:
+    email = f"{uuid4().hex}@example.com"
+    credentials = {"email": email, "password": "Passw0rd!"}
+    backend.cognito.sign_up(ClientId=os.environ["COGNITO_USER_POOL_CLIENT_ID"], Username=email, Password="Passw0rd!")
+    backend.cognito.admin_confirm_sign_up(UserPoolId="local-pool", Username=email)
+    for group in groups:
+        backend.cognito.admin_add_user_to_group(UserPoolId="local-pool", Username=email, GroupName=group)
+    return credentials
+
+def test_admin_signin_reads_groups_from_the_token(backend):
+    credentials = make_user(backend, groups=["organizers"])
+    response = client.post("/auth/admin/signin", json=credentials)
+    assert response.status_code == 200, response.text
+    assert response.json()["token"]
+    assert backend.calls["AdminListGroupsForUser"] == 0
+
+def test_admin_signin_rejects_users_outside_the_group(backend):
+    credentials = make_user(backend)
+    # No cognito:groups claim: the admin API is asked once, then the answer is cached
+    assert client.post("/auth/admin/signin", json=credentials).status_code == 403
+    assert client.post("/auth/admin/signin", json=credentials).status_code == 403
+    assert backend.calls["AdminListGroupsForUser"] == 1
+
+def test_admin_signin_rejects_a_wrong_password(backend):
+    credentials = make_user(backend, groups=["organizers"])
+    response = client.post("/auth/admin/signin", json={**credentials, "password": "wrong"})
+    assert response.status_code == 401
@@ -0,0 +1,99 @@
+import io
+import os
+import asyncio
+import pytest
+from starlette.datastructures import UploadFile
+from app import banners
+from app.banners import spool_banner, discard_spooled_banner
+
+def upload(size: int) -> UploadFile:
+    return UploadFile(io.BytesIO(b"x" * size), filename="banner.png")
+
+def test_spools_the_upload_to_disk(monkeypatch):
+    monkeypatch.setattr(banners, "BANNER_SPOOL_CHUNK_BYTES", 1000)
+    path = asyncio.run(spool_banner(upload(2500)))
+    try:
+        with open(path, "rb") as spooled:
+            assert spooled.read() == b"x" * 2500
+    finally:
+        discard_spooled_banner(path)
+    assert not os.path.exists(path)
+
+def test_stops_reading_past_the_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(banners, "BANNER_MAX_BYTES", 1500)
+    monkeypatch.setattr(banners, "BANNER_SPOOL_CHUNK_BYTES", 1000)
+    monkeypatch.setattr(banners.tempfile, "tempdir", str(tmp_path))
+    file = upload(10_000)
+    with pytest.raises(ValueError):
+        asyncio.run(spool_banner(file))
+    assert file.file.tell() == 2000  # Two chunks, not the whole upload
+    assert list(tmp_path.iterdir()) == []
+
+def create_event(banner: bytes):
+    pytest.importorskip("sports_event_utils")  # Imported by app/events.py
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app).post("/events/", data={
+        "title": "Banner event", "description": "Test", "date": "2030-01-01T10:00:00",
+        "location": "Main field", "max_participants": "10", "organizer_id": "organizer"
+    }, files={"banner": ("banner.png", banner, "image/png")})
+
+def test_create_event_rejects_an_oversized_banner(monkeypatch, tmp_path):
+    monkeypatch.setattr(banners, "BANNER_MAX_BYTES", 1000)
+    monkeypatch.setattr(banners.tempfile, "tempdir", str(tmp_path))
+    response = create_event(b"x" * 5000)
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+def test_create_event_renders_variants_from_the_spooled_file(monkeypatch, tmp_path):
+    from PIL import Image
+    from app.db import events_table
+    monkeypatch.setattr(banners.tempfile, "tempdir", str(tmp_path))
+    image = io.BytesIO()
+    Image.new("RGB", (1600, 900), "red").save(image, format="PNG")
+
+    response = create_event(image.getvalue())
+    assert response.status_code == 200, response.text
+    event_id = response.json()["banner_url"].split("/")[-2]
+    event = events_table.sync.get_item(Key={"id": event_id})["Item"]
+    assert set(event["banner_variants"]) == set(banners.BANNER_VARIANTS)
+    assert list(tmp_path.iterdir()) == []
+
+def test_banner_upload_requires_the_events_organizer(sign_in, make_event):
+    pytest.importorskip("sports_event_utils")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    organizer_id, owner = sign_in("organizer")
+    _, other = sign_in("organizer")
+    event_id = make_event(organizer_id=organizer_id)
+    body = {"filename": "banner.png", "content_type": "image/png"}
+
+    assert client.post(f"/events/{event_id}/banner/upload-url", json=body).status_code == 401
+    assert client.post(f"/events/{event_id}/banner/upload-url", json=body, headers=other).status_code == 403
+    assert client.post("/events/missing/banner/upload-url", json=body, headers=owner).status_code == 404
+    response = client.post(f"/events/{event_id}/banner/upload-url", json=body, headers=owner)
+    assert response.status_code == 200
+
+    confirm = {"key": response.json()["key"]}
+    assert client.post(f"/events/{event_id}/banner/confirm", json=confirm).status_code == 401
+    assert client.post(f"/events/{event_id}/banner/confirm", json=confirm, headers=other).status_code == 403
+
+def test_uploaded_banner_is_fetched_by_the_worker(make_event, monkeypatch):
+    from PIL import Image
+    from app.db import events_table, get_s3
+    monkeypatch.setenv("S3_BUCKET_NAME", "banners-test")
+    event_id = make_event()
+    image = io.BytesIO()
+    Image.new("RGB", (1600, 900), "blue").save(image, format="PNG")
+    key = f"{banners.banner_prefix(event_id)}upload.png"
+    get_s3().put_object(Bucket="banners-test", Key=key, Body=image.getvalue(), ContentType="image/png")
+
+    fetched = []
+    render = banners.render_uploaded_variants
+    monkeypatch.setattr(banners, "render_uploaded_variants", lambda *source: fetched.append(source) or render(*source))
+    asyncio.run(banners.process_uploaded_banner(event_id, key))
+
+    assert fetched == [("banners-test", key)]
+    event = events_table.sync.get_item(Key={"id": event_id})["Item"]
+    assert set(event["banner_variants"]) == set(banners.BANNER_VARIANTS)
@@ -0,0 +1,50 @@
+import asyncio
+from app import cache
+from app.cache import InMemoryCacheBackend, ReadThroughCache, get_event_item
+from app.registrations import claim_seat
+
+def test_reads_through_once(make_event, backend):
+    event_id = make_event()
+    backend.calls.clear()
+
+    async def read_many():
+        await asyncio.gather(*(get_event_item(event_id) for _ in range(5)))  # Concurrent misses share a load
+        return await get_event_item(event_id)
+
+    assert asyncio.run(read_many())["id"] == event_id
+    assert backend.calls["GetItem"] == 1
+
+def test_seat_claims_invalidate_the_event(make_event):
+    event_id = make_event()
+    assert asyncio.run(get_event_item(event_id))["participant_count"] == 0
+    asyncio.run(claim_seat(event_id, "user-1"))
+    assert asyncio.run(get_event_item(event_id))["participant_count"] == 1
+
+def test_unknown_events_are_not_cached(backend):
+    backend.calls.clear()
+    assert asyncio.run(get_event_item("missing")) is None
+    assert asyncio.run(get_event_item("missing")) is None
+    assert backend.calls["GetItem"] == 2
+
+def test_entries_expire_and_the_size_is_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    loads = []
+
+    async def loader(key):
+        loads.append(key)
+        return {"id": key}
+
+    read_through = ReadThroughCache(InMemoryCacheBackend(maxsize=2), ttl=30)
+
+    async def get(key):
+        return await read_through.get(key, loader)
+
+    for key in ("a", "b", "a", "c", "b"):  # c evicts b, the least recently used
+        asyncio.run(get(key))
+    assert loads == ["a", "b", "c", "b"]
+
+    now[0] += 31
+    asyncio.run(get("c"))
+    assert loads[-1] == "c"
+    assert read_through.stats()["hits"] == 1
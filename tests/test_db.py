@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app import db
+from app.db import events_table, get_dynamodb
+
+def test_aws_calls_do_not_block_the_event_loop(make_event, backend):
+    backend.reset(latency_ms=50, jitter_ms=0)
+    event_id = make_event()
+
+    async def scenario():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(events_table.get_item(Key={"id": event_id}) for _ in range(10)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ticking
+        return responses, elapsed, ticks
+
+    responses, elapsed, ticks = asyncio.run(scenario())
+    assert all(response["Item"]["id"] == event_id for response in responses)
+    # Ten 50 ms calls overlap on the I/O pool instead of running back to back
+    assert elapsed < 0.3
+    # and the loop kept running other tasks meanwhile
+    assert ticks >= 5
+
+def event_item(i: int) -> dict:
+    return {"id": f"event-{i}", "title": f"Event {i}"}
+
+def test_batch_put_retries_unprocessed_items(monkeypatch, backend):
+    monkeypatch.setattr(db.time, "sleep", lambda seconds: None)
+    dynamodb = get_dynamodb()
+    write = dynamodb.batch_write_item
+    calls = []
+
+    def flaky(RequestItems):
+        calls.append(len(RequestItems[events_table.name]))
+        if len(calls) == 1:
+            # Leave the last five for a retry, as DynamoDB does under load
+            write(RequestItems={events_table.name: RequestItems[events_table.name][:-5]})
+            return {"UnprocessedItems": {events_table.name: RequestItems[events_table.name][-5:]}}
+        return write(RequestItems=RequestItems)
+    monkeypatch.setattr(dynamodb, "batch_write_item", flaky)
+
+    failed = asyncio.run(db.batch_put_items(events_table.name, [event_item(i) for i in range(20)]))
+    assert failed == {}
+    assert calls == [20, 5]
+    assert all("Item" in events_table.sync.get_item(Key={"id": f"event-{i}"}) for i in range(20))
+
+def test_batch_put_reports_items_left_unprocessed(monkeypatch):
+    monkeypatch.setattr(db.time, "sleep", lambda seconds: None)
+    dynamodb = get_dynamodb()
+    monkeypatch.setattr(dynamodb, "batch_write_item", lambda RequestItems: {"UnprocessedItems": RequestItems})
+
+    items = [event_item(i) for i in range(30)]
+    failed = asyncio.run(db.batch_put_items(events_table.name, items))
+    assert set(failed) == {item["id"] for item in items}
+    assert set(failed.values()) == {"Unprocessed after retries"}
+
+def test_lazy_client_is_built_once_across_threads():
+    built = []
+
+    @db.lazy_client
+    def get_client():
+        time.sleep(0.01)
+        built.append(1)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = set(pool.map(lambda _: get_client(), range(16)))
+    assert len(clients) == 1
+    assert built == [1]
+
+# Imports the Lambda entry point with boto3's factories replaced by counters
+IMPORT_PROBE = """
+import boto3
+created = []
+boto3.client = lambda *args, **kwargs: created.append(args)
+boto3.resource = lambda *args, **kwargs: created.append(args)
+import lambda_handler
+print(len(created))
+"""
+
+def test_cold_start_builds_no_aws_clients():
+    pytest.importorskip("sports_event_utils")  # Imported by app/events.py
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "AWS_BACKEND": "aws", "PYTHONPATH": os.pathsep.join([root] + sys.path)}
+    env.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=root, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "0"
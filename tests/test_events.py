@@ -0,0 +1,132 @@
+import json
+import pytest
+
+pytest.importorskip("sports_event_utils")  # Imported by app/events.py
+
+from fastapi.testclient import TestClient
+from app import local_backend
+from app.main import app
+
+client = TestClient(app)
+
+def test_pages_events_with_a_cursor(make_event):
+    created = {make_event() for _ in range(5)}
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/events/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(created)
+
+def test_unpaged_list_follows_every_scan_page(make_event, monkeypatch, backend):
+    monkeypatch.setattr(local_backend, "PAGE_SIZE_BYTES", 300)  # A couple of events per page
+    created = {make_event() for _ in range(6)}
+    response = client.get("/events/")
+    assert response.status_code == 200
+    assert {item["id"] for item in response.json()} == created
+    assert backend.calls["Scan"] > 1
+
+def test_streams_events_as_ndjson(make_event, monkeypatch):
+    monkeypatch.setattr(local_backend, "PAGE_SIZE_BYTES", 300)
+    created = {make_event() for _ in range(4)}
+    response = client.get("/events/", params={"stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert {json.loads(line)["id"] for line in response.text.splitlines()} == created
+
+REGISTRATION = {"full_name": "Test User", "email": "user@example.com", "college_name": "North College",
+                "year_of_study": "2", "phone_number": "0000000000", "why_interested": "Testing"}
+
+def register(event_id: str, headers: dict):
+    return client.post(f"/events/{event_id}/register-request", json=REGISTRATION, headers=headers)
+
+def test_registration_claims_the_seat_in_one_transaction(make_event, sign_in, backend):
+    from app.db import events_table, event_participants_table
+    event_id = make_event(max_participants=2)
+    user_id, headers = sign_in("participant")
+
+    assert register(event_id, headers).status_code == 200
+    assert backend.calls["TransactWriteItems"] == 1
+    assert events_table.sync.get_item(Key={"id": event_id})["Item"]["participant_count"] == 1
+    assert "Item" in event_participants_table.sync.get_item(Key={"event_id": event_id, "user_id": user_id})
+
+def test_registration_rejects_a_second_request_and_a_full_event(make_event, sign_in):
+    event_id = make_event(max_participants=1)
+    headers = sign_in("participant")[1]
+    assert register(event_id, headers).status_code == 200
+    assert register(event_id, headers).status_code == 409
+    response = register(event_id, sign_in("participant")[1])
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Event is full"
+    assert register("missing", headers).status_code == 404
+
+EVENT_ROW = {"title": "Imported", "description": "Test", "date": "2030-01-01T10:00:00",
+             "location": "Main field", "max_participants": 10, "organizer_id": "organizer"}
+
+def test_bulk_import_reports_every_row():
+    from app.db import events_table
+    rows = [EVENT_ROW, {**EVENT_ROW, "max_participants": "many"}, {**EVENT_ROW, "title": "Second"}]
+    response = client.post("/events/bulk", json=rows)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 1)
+    assert [result["status"] for result in body["results"]] == ["created", "invalid", "created"]
+    assert events_table.sync.get_item(Key={"id": body["results"][2]["id"]})["Item"]["title"] == "Second"
+
+def test_bulk_import_reads_csv():
+    header = ",".join(EVENT_ROW)
+    lines = [header] + [",".join(str(value) for value in {**EVENT_ROW, "title": f"Row {i}"}.values()) for i in range(30)]
+    response = client.post("/events/bulk", content="\n".join(lines), headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 30
+
+def test_upcoming_pages_a_date_range_without_scanning(make_event, backend):
+    in_range = {make_event(date=f"2030-01-0{day}T10:00:00") for day in range(1, 6)}
+    make_event(date="2030-02-01T10:00:00")
+    make_event(date="2030-01-03T10:00:00", status="completed")
+    backend.calls.clear()
+
+    seen, cursor = [], None
+    while True:
+        params = {"from": "2030-01-01T00:00:00", "to": "2030-01-31T00:00:00", "limit": 2,
+                  **({"cursor": cursor} if cursor else {})}
+        response = client.get("/events/upcoming", params=params)
+        assert response.status_code == 200, response.text
+        seen.extend(item["id"] for item in response.json()["items"])
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            break
+    assert set(seen) == in_range
+    assert backend.calls["Scan"] == 0
+
+def test_nearby_matches_the_normalised_location(make_event):
+    event_id = make_event(location="North Field", location_key="north field")
+    make_event(location="South Field", location_key="south field")
+    response = client.get("/events/nearby", params={"location": "north-field", "from": "2029-01-01T00:00:00"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [event_id]
+    assert client.get("/events/nearby", params={"location": "!!"}).status_code == 400
+
+def test_event_list_projects_fields(make_event):
+    make_event()
+    response = client.get("/events/", params={"fields": "title,date", "limit": 10})
+    assert response.status_code == 200
+    assert [sorted(item) for item in response.json()["items"]] == [["date", "id", "title"]]
+
+def test_organizer_events_project_fields(make_event, sign_in):
+    sub, headers = sign_in("organizer")
+    make_event(organizer_id=sub)
+    response = client.get(f"/events/events/organizer/{sub}", params={"fields": "status"}, headers=headers)
+    assert response.status_code == 200
+    assert [sorted(item) for item in response.json()] == [["id", "status"]]
+
+def test_unknown_fields_are_rejected():
+    response = client.get("/events/", params={"fields": "title,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
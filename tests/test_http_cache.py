@@ -0,0 +1,79 @@
+import gzip
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.http_cache import CompressionMiddleware, cached_json, negotiate_encoding, COMPRESSION_MIN_BYTES
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware)
+
+LARGE = {"items": ["x" * 64] * (COMPRESSION_MIN_BYTES // 32)}
+SMALL = {"items": []}
+
+@app.get("/large")
+async def large(request: Request):
+    return cached_json(request, LARGE, "no-cache")
+
+@app.get("/small")
+async def small(request: Request):
+    return cached_json(request, SMALL, "no-cache")
+
+@app.get("/stream")
+async def stream():
+    async def lines():
+        for i in range(3):
+            yield b'{"n": %d}\n' % i
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+client = TestClient(app)
+
+def get(path: str, encoding: str, etag: str = None):
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(path, headers=headers)
+
+def test_compressed_response_revalidates_with_its_own_etag():
+    response = get("/large", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.endswith('-gzip"')
+
+    revalidated = get("/large", "gzip", etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert "Accept-Encoding" in revalidated.headers["vary"]
+
+def test_identity_response_revalidates_with_the_plain_etag():
+    response = get("/large", "identity")
+    assert "content-encoding" not in response.headers
+    etag = response.headers["etag"]
+    assert not etag.endswith('-gzip"')
+
+    revalidated = get("/large", "identity", etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+def test_either_representation_matches():
+    plain = get("/large", "identity").headers["etag"]
+    assert get("/large", "gzip", plain).status_code == 304
+    assert get("/large", "gzip", '"other"').status_code == 200
+
+def test_small_bodies_are_not_compressed():
+    response = get("/small", "gzip")
+    assert "content-encoding" not in response.headers
+    etag = response.headers["etag"]
+    assert get("/small", "gzip", etag).headers["etag"] == etag
+
+def test_streams_are_compressed_chunk_by_chunk():
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        body = gzip.decompress(b"".join(response.iter_raw()))
+    assert body.splitlines() == [b'{"n": 0}', b'{"n": 1}', b'{"n": 2}']
+
+def test_negotiates_by_quality():
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding("*") is not None
+    assert negotiate_encoding("") is None
@@ -0,0 +1,235 @@
+import asyncio
+from uuid import uuid4
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+from app import throttling
+from app.db import events_table, registration_requests_table
+from app.models.models import RegistrationStatus
+from app.registrations import (
+    SeatOutcome, BulkOutcome, claim_seat, release_seat, list_participants, bulk_update_event_status
+)
+from app.utils import encode_cursor, decode_cursor
+from app.cache import get_event_item
+
+def add_request(event_id: str, user_id: str, status=RegistrationStatus.PENDING) -> dict:
+    request_id = str(uuid4())
+    registration_requests_table.sync.put_item(Item={
+        "id": request_id,
+        "event_id": event_id,
+        "user_id": user_id,
+        "status": status,  # The routers write the enum member itself
+        "created_at": datetime.now().isoformat()
+    })
+    return registration_requests_table.sync.get_item(Key={"id": request_id})["Item"]
+
+def participant_count(event_id: str) -> int:
+    return int(events_table.sync.get_item(Key={"id": event_id})["Item"]["participant_count"])
+
+def test_str_enums_are_stored_by_value(make_event):
+    event_id = make_event()
+    request = add_request(event_id, "user-1", RegistrationStatus.APPROVED)
+    assert request["status"] == "APPROVED"
+
+    response = registration_requests_table.sync.query(
+        IndexName="event-status-index",
+        KeyConditionExpression=Key("event_id").eq(event_id) & Key("status").eq("APPROVED")
+    )
+    assert [item["id"] for item in response["Items"]] == [request["id"]]
+
+def test_claim_seat(make_event):
+    event_id = make_event(max_participants=2)
+    outcome, event = asyncio.run(claim_seat(event_id, "user-1"))
+    assert outcome == SeatOutcome.CLAIMED
+    assert event is None
+    assert participant_count(event_id) == 1
+    items, _ = asyncio.run(list_participants(event_id, 10))
+    assert [item["user_id"] for item in items] == ["user-1"]
+
+def test_claim_seat_event_full(make_event):
+    event_id = make_event(max_participants=1)
+    assert asyncio.run(claim_seat(event_id, "user-1"))[0] == SeatOutcome.CLAIMED
+    outcome, event = asyncio.run(claim_seat(event_id, "user-2"))
+    assert outcome == SeatOutcome.FULL
+    assert event["participant_count"] == 1
+    assert participant_count(event_id) == 1
+
+def test_claim_seat_already_registered(make_event):
+    event_id = make_event()
+    asyncio.run(claim_seat(event_id, "user-1"))
+    outcome, _ = asyncio.run(claim_seat(event_id, "user-1"))
+    assert outcome == SeatOutcome.ALREADY_REGISTERED
+    assert participant_count(event_id) == 1
+
+def test_claim_seat_unknown_event():
+    assert asyncio.run(claim_seat("missing", "user-1"))[0] == SeatOutcome.NOT_FOUND
+
+def test_bulk_approve_stops_at_capacity(make_event):
+    event_id = make_event(max_participants=2)
+    requests = [add_request(event_id, f"user-{i}") for i in range(3)]
+    outcomes = asyncio.run(bulk_update_event_status(event_id, requests, RegistrationStatus.APPROVED))
+
+    assert [outcomes[request["id"]] for request in requests] == [
+        BulkOutcome.UPDATED, BulkOutcome.UPDATED, BulkOutcome.FULL
+    ]
+    assert participant_count(event_id) == 2
+    statuses = [registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]["status"]
+                for request in requests]
+    assert statuses == ["APPROVED", "APPROVED", "PENDING"]
+
+def test_bulk_approve_one_seat_per_user(make_event):
+    event_id = make_event(max_participants=5)
+    asyncio.run(claim_seat(event_id, "user-0"))
+    first = add_request(event_id, "user-1")
+    second = add_request(event_id, "user-1")
+    seated = add_request(event_id, "user-0")
+    outcomes = asyncio.run(bulk_update_event_status(event_id, [first, second, seated], RegistrationStatus.APPROVED))
+
+    assert outcomes == {
+        first["id"]: BulkOutcome.UPDATED,
+        second["id"]: BulkOutcome.ALREADY_REGISTERED,
+        seated["id"]: BulkOutcome.ALREADY_REGISTERED
+    }
+    assert participant_count(event_id) == 2
+    statuses = [registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]["status"]
+                for request in (first, second, seated)]
+    assert statuses == ["APPROVED", "PENDING", "PENDING"]
+
+def test_bulk_approve_rereads_a_stale_count(make_event):
+    event_id = make_event(max_participants=2)
+    requests = [add_request(event_id, f"user-{i}") for i in range(2)]
+    # Warm the event cache with a full event, then free the seats behind its back
+    events_table.sync.update_item(
+        Key={"id": event_id}, UpdateExpression="SET participant_count = :n", ExpressionAttributeValues={":n": 2}
+    )
+    asyncio.run(get_event_item(event_id))
+    events_table.sync.update_item(
+        Key={"id": event_id}, UpdateExpression="SET participant_count = :n", ExpressionAttributeValues={":n": 0}
+    )
+    outcomes = asyncio.run(bulk_update_event_status(event_id, requests, RegistrationStatus.APPROVED))
+    assert set(outcomes.values()) == {BulkOutcome.UPDATED}
+    assert participant_count(event_id) == 2
+
+def test_bulk_reject_releases_seats(make_event):
+    event_id = make_event(max_participants=2)
+    # As written by POST /{event_id}/register-request: seat first, then an APPROVED request
+    approved = []
+    for i in range(2):
+        asyncio.run(claim_seat(event_id, f"user-{i}"))
+        approved.append(add_request(event_id, f"user-{i}", RegistrationStatus.APPROVED))
+    assert participant_count(event_id) == 2
+
+    outcomes = asyncio.run(bulk_update_event_status(event_id, approved, RegistrationStatus.REJECTED))
+    assert set(outcomes.values()) == {BulkOutcome.UPDATED}
+    assert participant_count(event_id) == 0
+    items, _ = asyncio.run(list_participants(event_id, 10))
+    assert items == []
+
+def test_bulk_unchanged(make_event):
+    event_id = make_event()
+    request = add_request(event_id, "user-1", RegistrationStatus.REJECTED)
+    outcomes = asyncio.run(bulk_update_event_status(event_id, [request], RegistrationStatus.REJECTED))
+    assert outcomes == {request["id"]: BulkOutcome.UNCHANGED}
+
+def test_participant_cursor_paging(make_event):
+    event_id = make_event(max_participants=5)
+    for i in range(5):
+        asyncio.run(claim_seat(event_id, f"user-{i}"))
+
+    seen, cursor = [], None
+    while True:
+        start_key = decode_cursor(cursor, keys=("event_id", "user_id")) if cursor else None
+        items, last_key = asyncio.run(list_participants(event_id, 2, start_key))
+        assert len(items) <= 2
+        seen.extend(item["user_id"] for item in items)
+        cursor = encode_cursor(last_key)
+        if not cursor:
+            break
+    assert sorted(seen) == [f"user-{i}" for i in range(5)]
+
+def test_status_index_cursor_paging(make_event):
+    event_id = make_event()
+    other_event_id = make_event()
+    approved = {add_request(event_id, f"user-{i}", RegistrationStatus.APPROVED)["id"] for i in range(5)}
+    add_request(event_id, "user-pending")
+    add_request(other_event_id, "user-other", RegistrationStatus.APPROVED)
+
+    query_kwargs = {
+        "IndexName": "event-status-index",
+        "KeyConditionExpression": Key("event_id").eq(event_id) & Key("status").eq("APPROVED"),
+        "Limit": 2
+    }
+    seen = []
+    while True:
+        response = registration_requests_table.sync.query(**query_kwargs)
+        seen.extend(item["id"] for item in response["Items"])
+        cursor = encode_cursor(response.get("LastEvaluatedKey"))
+        if not cursor:
+            break
+        query_kwargs["ExclusiveStartKey"] = decode_cursor(cursor, keys=("id", "event_id", "status"))
+    assert len(seen) == 5
+    assert set(seen) == approved
+
+@pytest.mark.parametrize("key", [{"a": 1}, {"id": 1}, {"id": "1", "extra": "x"}, ["id"]])
+def test_cursor_must_hold_the_expected_key(key):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(key), keys=("id",))
+    assert decode_cursor(encode_cursor({"id": "1"}), keys=("id",)) == {"id": "1"}
+
+def test_claim_seat_retries_conflicts(make_event, conflicts):
+    event_id = make_event()
+    conflicts.remaining = 2
+    assert asyncio.run(claim_seat(event_id, "user-1"))[0] == SeatOutcome.CLAIMED
+    assert participant_count(event_id) == 1
+
+def test_claim_seat_busy_after_retries(make_event, conflicts):
+    event_id = make_event()
+    conflicts.remaining = throttling.TRANSACTION_CONFLICT_MAX_ATTEMPTS
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(claim_seat(event_id, "user-1"))
+    assert raised.value.status_code == 503
+    assert participant_count(event_id) == 0
+
+def test_release_seat_retries_conflicts(make_event, conflicts):
+    event_id = make_event()
+    asyncio.run(claim_seat(event_id, "user-1"))
+    conflicts.remaining = 2
+    asyncio.run(release_seat(event_id, "user-1"))
+    assert participant_count(event_id) == 0
+
+def test_release_seat_without_a_seat_is_a_no_op(make_event):
+    event_id = make_event()
+    asyncio.run(release_seat(event_id, "user-1"))
+    assert participant_count(event_id) == 0
+
+def test_release_seat_raises_on_lasting_conflict(make_event, conflicts):
+    event_id = make_event()
+    asyncio.run(claim_seat(event_id, "user-1"))
+    conflicts.remaining = throttling.TRANSACTION_CONFLICT_MAX_ATTEMPTS
+    with pytest.raises(ClientError):
+        asyncio.run(release_seat(event_id, "user-1"))
+    assert participant_count(event_id) == 1
+
+def test_seats_live_in_the_participants_table(make_event):
+    from app.db import event_participants_table
+    event_id = make_event()
+    asyncio.run(claim_seat(event_id, "user-1"))
+    event = events_table.sync.get_item(Key={"id": event_id})["Item"]
+    assert "participants" not in event
+    assert event_participants_table.sync.get_item(Key={"event_id": event_id, "user_id": "user-1"})["Item"]
+
+def test_migrate_participants_moves_legacy_lists(make_event, monkeypatch):
+    from app import migrate_participants
+    from app.db import get_dynamodb
+    monkeypatch.setattr(migrate_participants.boto3, "resource", lambda *args, **kwargs: get_dynamodb())
+    event_id = make_event(participants=["user-1", "user-2", "user-1"], participant_count=0)
+
+    for _ in range(2):  # Safe to re-run
+        migrate_participants.migrate_participants()
+        event = events_table.sync.get_item(Key={"id": event_id})["Item"]
+        assert "participants" not in event
+        assert participant_count(event_id) == 2
+        items, _ = asyncio.run(list_participants(event_id, 10))
+        assert sorted(item["user_id"] for item in items) == ["user-1", "user-2"]
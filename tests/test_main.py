@@ -0,0 +1,18 @@
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("sports_event_utils")  # Imported by app/auth.py and app/events.py
+
+from app.main import app
+from app.notifications import notification_outbox
+from app.admission import admission_worker
+from app.metrics import event_loop_monitor
+
+def test_lifespan_starts_and_stops_workers():
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        assert notification_outbox._task is not None
+        assert event_loop_monitor._task is not None
+    assert notification_outbox._task is None
+    assert admission_worker._task is None
+    assert event_loop_monitor._task is None
@@ -0,0 +1,91 @@
+import pytest
+from app import middleware
+from app.middleware import CognitoKeyStore, VerifiedTokenCache
+from app.local_backend import get_local_backend, LocalCognito
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Counts JWKS fetches; the keys come from the local user pool."""
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return get_local_backend().cognito.jwks()
+    monkeypatch.setattr(middleware, "get_cognito_public_keys", fetch)
+    return fetches
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"monotonic": 1000.0, "time": 1_700_000_000.0}
+    monkeypatch.setattr(middleware.time, "monotonic", lambda: now["monotonic"])
+    monkeypatch.setattr(middleware.time, "time", lambda: now["time"])
+
+    def advance(seconds: float):
+        now["monotonic"] += seconds
+        now["time"] += seconds
+    return advance
+
+class InlineThread:
+    """Runs the background refresh on start(), so the test can see its result."""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+def test_unknown_kid_refetches_at_most_once_per_interval(fetches, clock):
+    store = CognitoKeyStore(ttl=3600, min_refetch_interval=30)
+    assert store.get_key("rotated") is None
+    assert store.get_key("rotated") is None
+    assert len(fetches) == 1
+
+    clock(31)
+    assert store.get_key("rotated") is None
+    assert len(fetches) == 2
+
+def test_known_kid_is_served_from_the_cache(fetches, clock):
+    store = CognitoKeyStore(ttl=3600, min_refetch_interval=30)
+    assert store.get_key(LocalCognito.KEY_ID) is not None
+    clock(60)
+    assert store.get_key(LocalCognito.KEY_ID) is not None
+    assert len(fetches) == 1
+
+def test_refreshes_in_the_background_after_the_ttl(fetches, clock, monkeypatch):
+    monkeypatch.setattr(middleware.threading, "Thread", InlineThread)
+    store = CognitoKeyStore(ttl=10, min_refetch_interval=30)
+    key = store.get_key(LocalCognito.KEY_ID)
+
+    clock(11)
+    # The stale key is still returned while the refresh runs
+    assert store.get_key(LocalCognito.KEY_ID) is key
+    assert len(fetches) == 2
+    clock(5)
+    store.get_key(LocalCognito.KEY_ID)
+    assert len(fetches) == 2
+
+def test_token_cache_evicts_the_least_recently_used(clock):
+    cache = VerifiedTokenCache(maxsize=2)
+    exp = middleware.time.time() + 3600
+    cache.put("a", "aud", {"sub": "a", "exp": exp})
+    cache.put("b", "aud", {"sub": "b", "exp": exp})
+    assert cache.get("a", "aud") == {"sub": "a", "exp": exp}  # Now the most recent
+    cache.put("c", "aud", {"sub": "c", "exp": exp})
+
+    assert cache.get("b", "aud") is None
+    assert cache.get("a", "aud") is not None
+    assert cache.get("c", "aud") is not None
+
+def test_token_cache_entries_expire_at_exp(clock):
+    cache = VerifiedTokenCache(maxsize=10)
+    cache.put("token", "aud", {"sub": "user", "exp": middleware.time.time() + 10})
+    assert cache.get("token", "aud") is not None
+    assert cache.get("token", "other-aud") is None
+
+    clock(10)
+    assert cache.get("token", "aud") is None
+
+def test_token_cache_skips_tokens_without_exp():
+    cache = VerifiedTokenCache(maxsize=10)
+    cache.put("token", "aud", {"sub": "user"})
+    assert cache.get("token", "aud") is None
@@ -0,0 +1,131 @@
+import json
+import asyncio
+import pytest
+from app import notifications
+from app.db import get_sqs
+from app.metrics import registry
+from app.notifications import NotificationOutbox, LocalPublisher, SQSOutboxStore, SNS_BATCH_SIZE
+
+def stats(outbox) -> dict:
+    return asyncio.run(outbox.stats())
+
+class RecordingPublisher(LocalPublisher):
+    def __init__(self, always_fail: bool = False):
+        super().__init__()
+        self.batches = []
+        self.always_fail = always_fail
+
+    async def publish_batch(self, records):
+        self.batches.append([record['message'] for record in records])
+        if self.always_fail:
+            raise RuntimeError("SNS unavailable")
+        return await super().publish_batch(records)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Stand-in for time.monotonic that only moves when a test advances it."""
+    now = [1000.0]
+    monkeypatch.setattr(notifications.time, "monotonic", lambda: now[0])
+
+    def advance(seconds: float):
+        now[0] += seconds
+    return advance
+
+def test_publishes_in_batches_of_ten():
+    publisher = RecordingPublisher()
+    outbox = NotificationOutbox(publisher)
+    for i in range(25):
+        asyncio.run(outbox.enqueue({"n": i}))
+    asyncio.run(outbox.flush())
+
+    assert [len(batch) for batch in publisher.batches] == [SNS_BATCH_SIZE, SNS_BATCH_SIZE, 5]
+    assert publisher.published == [{"n": i} for i in range(25)]
+    assert stats(outbox)["published"] == 25
+    assert stats(outbox)["queue_depth"] == 0
+
+def test_retries_after_backoff(clock):
+    publisher = RecordingPublisher()
+    publisher.fail_next = 1
+    outbox = NotificationOutbox(publisher)
+    asyncio.run(outbox.enqueue({"n": 1}))
+
+    asyncio.run(outbox.flush())
+    assert publisher.published == []
+    assert stats(outbox)["retry_depth"] == 1
+    assert stats(outbox)["failed_attempts"] == 1
+
+    # Not due yet: the backoff for the first retry is at least 0.5 s
+    asyncio.run(outbox.flush())
+    assert len(publisher.batches) == 1
+
+    clock(60)
+    asyncio.run(outbox.flush())
+    assert publisher.published == [{"n": 1}]
+    assert stats(outbox)["retry_depth"] == 0
+    assert list(outbox.store.dead_letters) == []
+
+def test_dead_letters_after_max_attempts(clock):
+    publisher = RecordingPublisher(always_fail=True)
+    outbox = NotificationOutbox(publisher, max_attempts=3)
+    asyncio.run(outbox.enqueue({"n": 1}))
+
+    for _ in range(3):
+        asyncio.run(outbox.flush())
+        clock(60)
+    asyncio.run(outbox.flush())
+
+    assert len(publisher.batches) == 3
+    assert stats(outbox)["retry_depth"] == 0
+    [record] = outbox.store.dead_letters
+    assert record["message"] == {"n": 1}
+    assert record["attempts"] == 3
+    assert record["last_error"] == "SNS unavailable"
+
+QUEUE_URL = "local://test-notifications"
+DEAD_LETTER_QUEUE_URL = "local://test-notification-dead-letters"
+
+def sqs_outbox(publisher, **kwargs):
+    return NotificationOutbox(publisher, SQSOutboxStore(QUEUE_URL, DEAD_LETTER_QUEUE_URL), **kwargs)
+
+def test_sqs_outbox_survives_a_restart():
+    asyncio.run(sqs_outbox(RecordingPublisher()).enqueue({"n": 1}))
+    # A new instance, e.g. after a restart or on another host, delivers it
+    publisher = RecordingPublisher()
+    outbox = sqs_outbox(publisher)
+    asyncio.run(outbox.flush())
+
+    assert publisher.published == [{"n": 1}]
+    assert stats(outbox)["queue_depth"] == 0
+    assert stats(outbox)["retry_depth"] == 0
+
+def test_sqs_outbox_retries_then_dead_letters(clock):
+    publisher = RecordingPublisher(always_fail=True)
+    outbox = sqs_outbox(publisher, max_attempts=2)
+    asyncio.run(outbox.enqueue({"n": 1}))
+
+    asyncio.run(outbox.flush())
+    assert stats(outbox)["retry_depth"] == 1
+    asyncio.run(outbox.flush())  # Hidden until its backoff is over
+    assert len(publisher.batches) == 1
+
+    clock(60)
+    asyncio.run(outbox.flush())
+    assert len(publisher.batches) == 2
+    assert stats(outbox)["retry_depth"] == 0
+    [message] = get_sqs().receive_message(QueueUrl=DEAD_LETTER_QUEUE_URL)["Messages"]
+    record = json.loads(message["Body"])
+    assert record["message"] == {"n": 1}
+    assert record["last_error"] == "SNS unavailable"
+
+def test_queue_depth_and_latency_are_in_the_registry():
+    outbox = sqs_outbox(RecordingPublisher())
+    asyncio.run(outbox.enqueue({"n": 1}))
+    asyncio.run(outbox.depth())
+    metrics = registry.render_prometheus()
+    assert 'notification_queue_depth{state="queued"} 1' in metrics
+
+    asyncio.run(outbox.flush())
+    metrics = registry.render_prometheus()
+    assert 'notification_queue_depth{state="queued"} 0' in metrics
+    assert "notification_publish_duration_seconds_count" in metrics
+    assert "notification_delivery_latency_seconds_count" in metrics
@@ -0,0 +1,65 @@
+import json
+import asyncio
+from uuid import uuid4
+from datetime import datetime
+import pytest
+from app import registration_analytics
+from app.db import registration_requests_table
+from app.models.models import RegistrationStatus
+from app.registrations import bulk_update_event_status
+
+def add_request(event_id: str, status: str) -> dict:
+    request = {"id": str(uuid4()), "event_id": event_id, "user_id": str(uuid4()), "status": status,
+               "college_name": "North College", "year_of_study": "2", "created_at": datetime.now().isoformat()}
+    registration_requests_table.sync.put_item(Item=request)
+    return request
+
+def run(**event) -> dict:
+    response = registration_analytics.lambda_handler(event, None)
+    assert response["statusCode"] == 200, response["body"]
+    return json.loads(response["body"])
+
+@pytest.fixture(autouse=True)
+def snapshot_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(registration_analytics, "SNAPSHOT_PATH", str(tmp_path / "snapshot.npz"))
+
+def test_counts_registrations(make_event):
+    event_id = make_event(max_participants=4, participant_count=1)
+    add_request(event_id, "APPROVED")
+    add_request(event_id, "REJECTED")
+    analytics = run()
+    assert analytics["total_registrations"] == 2
+    assert analytics["per_event"][event_id]["approval_rate"] == 0.5
+    assert analytics["per_event"][event_id]["fill_rate"] == 0.25
+
+def test_snapshot_picks_up_status_changes(make_event):
+    event_id = make_event()
+    request = add_request(event_id, "PENDING")
+    run(use_snapshot=True)  # Leaves a snapshot behind
+    asyncio.run(bulk_update_event_status(event_id, [request], RegistrationStatus.REJECTED))
+    add_request(event_id, "PENDING")
+
+    expected = {"REJECTED": 1, "PENDING": 1}
+    assert run()["status_distribution"] == expected
+    analytics = run(use_snapshot=True)
+    assert analytics["status_distribution"] == expected
+    assert analytics["total_registrations"] == 2
+
+def test_snapshot_skips_unchanged_records(make_event, monkeypatch):
+    event_id = make_event()
+    add_request(event_id, "PENDING")
+    run(use_snapshot=True)
+    scanned = []
+    upsert = registration_analytics.RegistrationColumns.upsert
+    monkeypatch.setattr(registration_analytics.RegistrationColumns, "upsert",
+                        lambda columns, items: scanned.extend(items) or upsert(columns, items))
+    monkeypatch.setattr(registration_analytics, "SNAPSHOT_OVERLAP_SECONDS", -60)
+
+    assert run(use_snapshot=True)["status_distribution"] == {"PENDING": 1}
+    assert scanned == []
+
+def test_categorical_encoding_is_stable():
+    encoder = registration_analytics.Categorical()
+    assert encoder.encode(["b", "a", "b"]).tolist() == [1, 0, 1]
+    assert encoder.encode(["a", "c"]).tolist() == [0, 2]
+    assert encoder.code("c") == 2 and encoder.code("d") is None
@@ -0,0 +1,186 @@
+import os
+import asyncio
+from uuid import uuid4
+from datetime import datetime
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from botocore.exceptions import ClientError
+
+pytest.importorskip("sports_event_utils")  # Imported by app/events.py
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db import registration_requests_table, events_table
+from app import throttling
+from app.local_backend import LocalCognito
+from app.analytics import record_registration
+from app.models.models import RegistrationStatus
+from app.registrations import claim_seat
+
+client = TestClient(app)
+
+def add_request(event_id: str, status: RegistrationStatus) -> dict:
+    request = {
+        "id": str(uuid4()),
+        "event_id": event_id,
+        "user_id": str(uuid4()),
+        "status": status,
+        "created_at": datetime.now().isoformat(),
+        "full_name": "Test User",
+        "email": "user@example.com",
+        "college_name": "Test College",
+        "year_of_study": "2",
+        "phone_number": "0000000000",
+        "why_interested": "Testing"
+    }
+    registration_requests_table.sync.put_item(Item=request)
+    asyncio.run(record_registration(request))
+    return request
+
+def test_requires_a_token(make_event):
+    response = client.get(f"/events/{make_event()}/registration-requests")
+    assert response.status_code == 401
+
+def test_rejects_a_participant_token(sign_in, make_event):
+    response = client.get(
+        f"/events/{make_event()}/registration-requests", headers=sign_in("participant")[1]
+    )
+    assert response.status_code == 403
+
+def test_rejects_a_forged_token(make_event):
+    # Right key id, wrong key
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    token = jwt.encode(
+        {"sub": "forged", "email": "forged@example.com", "custom:role": "organizer",
+         "aud": os.environ["COGNITO_USER_POOL_CLIENT_ID"], "exp": datetime.now().timestamp() + 3600},
+        key, algorithm="RS256", headers={"kid": LocalCognito.KEY_ID}
+    )
+    response = client.get(
+        f"/events/{make_event()}/registration-requests", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 401
+
+def test_rejects_another_organizer(sign_in, make_event):
+    sub, _ = sign_in("organizer")
+    response = client.get(
+        f"/events/{make_event(organizer_id=sub)}/registration-requests", headers=sign_in("organizer")[1]
+    )
+    assert response.status_code == 403
+
+def test_unknown_event_is_404(sign_in):
+    response = client.get("/events/missing/registration-requests", headers=sign_in("organizer")[1])
+    assert response.status_code == 404
+
+def test_lists_one_status_page_by_page(sign_in, make_event):
+    sub, headers = sign_in("organizer")
+    event_id = make_event(organizer_id=sub)
+    approved = {add_request(event_id, RegistrationStatus.APPROVED)["id"] for _ in range(3)}
+    add_request(event_id, RegistrationStatus.REJECTED)
+    add_request(make_event(), RegistrationStatus.APPROVED)
+
+    seen, cursor = [], None
+    while True:
+        params = {"status": "APPROVED", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"/events/{event_id}/registration-requests", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert page["count"] == 3
+        assert page["status_counts"] == {"APPROVED": 3, "REJECTED": 1}
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(approved)
+
+def test_projects_fields(sign_in, make_event):
+    sub, headers = sign_in("organizer")
+    event_id = make_event(organizer_id=sub)
+    add_request(event_id, RegistrationStatus.APPROVED)
+    response = client.get(
+        f"/events/{event_id}/registration-requests", params={"fields": "status"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert [sorted(item) for item in response.json()["items"]] == [["id", "status"]]
+
+def test_export_requires_an_organizer(sign_in, make_event):
+    assert client.get("/events/registration-requests/export").status_code == 401
+    response = client.get(
+        "/events/registration-requests/export", headers=sign_in("participant")[1]
+    )
+    assert response.status_code == 403
+
+def test_export_csv(sign_in, make_event):
+    event_id = make_event()
+    requests = [add_request(event_id, RegistrationStatus.APPROVED) for _ in range(3)]
+    response = client.get(
+        "/events/registration-requests/export", params={"format": "csv", "segments": 2},
+        headers=sign_in("organizer")[1]
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,event_id,user_id,status")
+    assert sorted(line.split(",")[0] for line in lines[1:]) == sorted(request["id"] for request in requests)
+
+def test_throttled_scan_gives_429(monkeypatch):
+    def throttle(**kwargs):
+        raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "Scan")
+    monkeypatch.setattr(throttling.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(registration_requests_table.sync, "scan", throttle)
+    response = client.get("/events/registration-requests")
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+def set_status(request_id: str, status: str, headers: dict):
+    return client.put(f"/events/registration-requests/{request_id}", params={"status": status}, headers=headers)
+
+def test_single_approval_matches_bulk_for_a_seated_user(sign_in, make_event):
+    event_id = make_event()
+    _, headers = sign_in("organizer")
+    request = add_request(event_id, RegistrationStatus.PENDING)
+    asyncio.run(claim_seat(event_id, request["user_id"]))
+
+    response = set_status(request["id"], "APPROVED", headers)
+    assert response.status_code == 409
+    assert registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]["status"] == "PENDING"
+
+    bulk = client.put("/events/registration-requests/bulk-status", headers=headers,
+                      json={"request_ids": [request["id"]], "status": "APPROVED"})
+    assert bulk.json()["results"] == [{"id": request["id"], "outcome": "already_registered"}]
+
+def test_single_update_is_guarded_on_the_status_read(sign_in, make_event, monkeypatch):
+    event_id = make_event()
+    _, headers = sign_in("organizer")
+    request = add_request(event_id, RegistrationStatus.PENDING)
+    get_item = registration_requests_table.get_item
+
+    async def stale_read(**kwargs):
+        response = await get_item(**kwargs)
+        # Someone else decides between our read and our write
+        registration_requests_table.sync.put_item(Item={**response["Item"], "status": "REJECTED"})
+        return response
+    monkeypatch.setattr(registration_requests_table, "get_item", stale_read)
+
+    assert set_status(request["id"], "APPROVED", headers).status_code == 409
+    assert registration_requests_table.sync.get_item(Key={"id": request["id"]})["Item"]["status"] == "REJECTED"
+    assert int(events_table.sync.get_item(Key={"id": event_id})["Item"]["participant_count"]) == 0
+
+def test_single_rejection_releases_the_seat(sign_in, make_event):
+    event_id = make_event()
+    _, headers = sign_in("organizer")
+    request = add_request(event_id, RegistrationStatus.PENDING)
+    assert set_status(request["id"], "APPROVED", headers).status_code == 200
+    assert int(events_table.sync.get_item(Key={"id": event_id})["Item"]["participant_count"]) == 1
+    assert set_status(request["id"], "REJECTED", headers).status_code == 200
+    assert int(events_table.sync.get_item(Key={"id": event_id})["Item"]["participant_count"]) == 0
+
+def test_event_list_rejects_a_foreign_cursor():
+    # Valid base64 JSON, but {"a": 1} is not an events table key
+    assert client.get("/events/", params={"cursor": "eyJhIjoxfQ"}).status_code == 400
+
+@pytest.mark.parametrize("path", ["/events/cache/stats", "/events/notifications/stats",
+                                  "/events/admission/stats", "/events/search/stats"])
+def test_stats_require_an_organizer(sign_in, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=sign_in("participant")[1]).status_code == 403
+    assert client.get(path, headers=sign_in("organizer")[1]).status_code == 200
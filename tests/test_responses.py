@@ -0,0 +1,24 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from app.responses import FastJSONResponse, dumps
+from app.utils import json_default, iter_ndjson
+
+def test_decimals_render_as_ints_or_floats():
+    body = json.loads(dumps({"count": Decimal("3"), "rate": Decimal("0.25"), "big": Decimal("12345678901234567890")}))
+    assert body == {"count": 3, "rate": 0.25, "big": 12345678901234567890}
+    assert isinstance(body["count"], int)
+
+def test_sets_and_datetimes():
+    body = json.loads(dumps({"tags": {"b", "a"}, "at": datetime(2030, 1, 1, 10, 0), 1: "key"}))
+    assert body == {"tags": ["a", "b"], "at": "2030-01-01T10:00:00", "1": "key"}
+
+def test_unknown_types_still_fail():
+    with pytest.raises(TypeError):
+        json_default(object())
+
+def test_response_class_and_ndjson_agree():
+    item = {"id": "1", "max_participants": Decimal("10")}
+    assert json.loads(FastJSONResponse(item).body) == {"id": "1", "max_participants": 10}
+    assert b"".join(iter_ndjson([[item], [], [item]])) == b'{"id":"1","max_participants":10}\n' * 2
@@ -0,0 +1,39 @@
+import asyncio
+from app.search import EventSearchIndex, location_key
+
+def event(event_id: str, title: str, description: str = "", date: str = "2030-01-01T10:00:00") -> dict:
+    return {"id": event_id, "title": title, "description": description, "date": date, "location": "Main field"}
+
+def test_matches_every_term_title_first():
+    index = EventSearchIndex()
+    index.add(event("1", "City marathon", "A run through the old town", date="2030-03-01"))
+    index.add(event("2", "Charity run", "Marathon relay for the city", date="2030-01-01"))
+    index.add(event("3", "Chess open", "Rapid games"))
+
+    assert [result["id"] for result in index.search("city marathon", 10)] == ["1", "2"]
+    assert [result["id"] for result in index.search("run", 10)] == ["2", "1"]
+    assert index.search("the", 10) == []  # Only stop words
+    assert index.search("swimming", 10) == []
+
+def test_updates_and_removals_replace_the_postings():
+    index = EventSearchIndex()
+    index.add(event("1", "Football cup"))
+    index.add(event("1", "Hockey cup"))
+    assert index.search("football", 10) == []
+    assert [result["id"] for result in index.search("hockey", 10)] == ["1"]
+
+    index.remove("1")
+    assert index.search("cup", 10) == []
+    assert index.stats()["terms"] == 0
+
+def test_builds_from_one_scan(make_event, backend):
+    make_event(title="Night swim", description="Open water")
+    index = EventSearchIndex()
+    backend.calls.clear()
+    asyncio.run(index.ensure_fresh())
+    asyncio.run(index.ensure_fresh())
+    assert backend.calls["Scan"] == 1
+    assert [result["title"] for result in index.search("swim", 10)] == ["Night swim"]
+
+def test_location_key_ignores_case_and_punctuation():
+    assert location_key("  Main Field, North-Campus ") == "main field north campus"
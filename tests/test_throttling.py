@@ -0,0 +1,75 @@
+import pytest
+from botocore.exceptions import ClientError
+from app import throttling
+from app.throttling import CapacityExhausted, capacity_tracker, background_work, retry_throttled
+from app.utils import collect_pages
+
+def throttle():
+    raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "Query")
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(throttling.time, "sleep", sleeps.append)
+    return sleeps
+
+def test_exhausted_retries_give_429(sleeps):
+    with pytest.raises(CapacityExhausted) as raised:
+        retry_throttled("test-exhausted", throttle)
+    assert raised.value.status_code == 429
+    assert int(raised.value.headers["Retry-After"]) >= 1
+    assert len(sleeps) == throttling.THROTTLE_MAX_ATTEMPTS - 1
+    assert capacity_tracker.blocked_for(["test-exhausted"]) > 0
+
+def test_block_does_not_hold_back_interactive_calls(sleeps):
+    capacity_tracker.block("test-interactive", 10)
+    assert retry_throttled("test-interactive", lambda: "item") == "item"
+    assert sleeps == []
+
+def test_block_pauses_background_work(sleeps):
+    capacity_tracker.block("test-background", 10)
+    with background_work():
+        assert retry_throttled("test-background", lambda: "page") == "page"
+    assert len(sleeps) == 1
+    assert 9 < sleeps[0] <= 10
+
+class FlakyTable:
+    name = "test-scan"
+
+    def __init__(self, throttles: int):
+        self.throttles = throttles
+
+    def scan(self, **kwargs):
+        if self.throttles:
+            self.throttles -= 1
+            throttle()
+        return {"Items": [{"id": "1"}]}
+
+def test_scan_pages_retries_throttles(sleeps):
+    assert collect_pages(FlakyTable(throttles=1)) == [{"id": "1"}]
+    assert len(sleeps) == 1
+
+def test_scan_pages_gives_429_past_the_retry_budget(sleeps):
+    with pytest.raises(CapacityExhausted):
+        collect_pages(FlakyTable(throttles=throttling.THROTTLE_MAX_ATTEMPTS))
+
+@pytest.fixture
+def described(monkeypatch):
+    tables = {}
+    monkeypatch.setattr(capacity_tracker, "_describe", tables.__getitem__)
+    monkeypatch.setattr(capacity_tracker, "_provisioned", {})
+    return tables
+
+def test_on_demand_tables_are_not_paced(described):
+    described["test-on-demand"] = {"BillingModeSummary": {"BillingMode": "PAY_PER_REQUEST"},
+                                   "ProvisionedThroughput": {"ReadCapacityUnits": 0, "WriteCapacityUnits": 0}}
+    assert throttling.BackgroundBudget("test-on-demand").rate() is None
+
+def test_background_pacing_follows_described_capacity(described):
+    described["test-provisioned"] = {"ProvisionedThroughput": {"ReadCapacityUnits": 1000, "WriteCapacityUnits": 10}}
+    assert throttling.BackgroundBudget("test-provisioned").rate() == pytest.approx(1000 * throttling.BACKGROUND_CAPACITY_SHARE)
+    assert throttling.BackgroundBudget("test-provisioned", 50).rate() == 50
+
+def test_explicit_budget_paces_unknown_tables(described):
+    assert throttling.BackgroundBudget("test-unknown").rate() is None
+    assert throttling.BackgroundBudget("test-unknown", 20).rate() == 20